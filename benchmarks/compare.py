@@ -0,0 +1,76 @@
+# benchmarks/compare.py
+# Compare two benchmarks.throughput JSON files; exit code 1 when a configuration regressed.
+#
+#   python -m benchmarks.compare results/bench/throughput-<old>.json results/bench/throughput-<new>.json
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+
+def load(path: str | Path) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]:
+    data = json.loads(Path(path).read_text())
+    return data["meta"], {r["name"]: r for r in data["results"]}
+
+
+def compare(
+    old: Dict[str, Dict[str, Any]],
+    new: Dict[str, Dict[str, Any]],
+    *,
+    tolerance: float = 0.1,
+) -> List[Dict[str, Any]]:
+    """
+    One row per configuration present in both runs.
+    - throughput ratio new/old (< 1 - tolerance: regression)
+    - p99 latency ratio new/old (> 1 + tolerance: regression)
+    """
+    rows: List[Dict[str, Any]] = []
+    for name in old.keys() & new.keys():
+        a, b = old[name], new[name]
+        thr = b["sims_per_s"] / a["sims_per_s"] if a["sims_per_s"] > 0 else float("nan")
+        p99 = b["p99_ms"] / a["p99_ms"] if a["p99_ms"] > 0 else float("nan")
+        rows.append(
+            {
+                "name": name,
+                "sims_per_s_old": a["sims_per_s"],
+                "sims_per_s_new": b["sims_per_s"],
+                "throughput_ratio": thr,
+                "p99_ratio": p99,
+                "regression": thr < 1 - tolerance or p99 > 1 + tolerance,
+            }
+        )
+    return sorted(rows, key=lambda r: r["name"])
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Compare two throughput benchmark runs")
+    ap.add_argument("old")
+    ap.add_argument("new")
+    ap.add_argument("--tolerance", type=float, default=0.1, help="relative change tolerated (default 10 %%)")
+    args = ap.parse_args()
+
+    meta_old, old = load(args.old)
+    meta_new, new = load(args.new)
+    for key in ("backend", "cpu_count", "analytic"):
+        if meta_old.get(key) != meta_new.get(key):
+            print(f"[WARN] {key} differs: {meta_old.get(key)} vs {meta_new.get(key)}", flush=True)
+
+    rows = compare(old, new, tolerance=args.tolerance)
+    print(f"{meta_old.get('commit')} -> {meta_new.get('commit')}")
+    for r in rows:
+        flag = "  REGRESSION" if r["regression"] else ""
+        print(
+            f"{r['name']:<58} {r['sims_per_s_old']:9.1f} -> {r['sims_per_s_new']:9.1f} sims/s "
+            f"(x{r['throughput_ratio']:.2f}), p99 x{r['p99_ratio']:.2f}{flag}"
+        )
+    only = sorted((old.keys() ^ new.keys()))
+    if only:
+        print(f"{len(only)} configurations in only one run: {', '.join(only)}")
+    sys.exit(1 if any(r["regression"] for r in rows) else 0)
+
+
+if __name__ == "__main__":
+    main()
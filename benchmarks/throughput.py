@@ -0,0 +1,430 @@
+# benchmarks/throughput.py
+# sims/s, p50/p99 call latency and RSS/PSS of every simulation backend and pool, as JSON.
+#
+#   IA_SPICE_BACKEND=analytic python -m benchmarks.throughput            # no ngspice/PDK needed
+#   python -m benchmarks.throughput --only pool --workers 1,2,4,8
+#   python -m benchmarks.compare results/bench/throughput-<old>.json results/bench/throughput-<new>.json
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from main.inverter_spice import INV_CHAR_NETLIST, MEASURES, InverterSpiceRunner
+from main.pools import ParallelPool, SequentialPool
+from main.sim_cache import PROJECT_ROOT
+from main.spice_backend import LATENCY_ENV, LOAD_LATENCY_ENV, SPIN_ENV, backend_name
+from main.spice_pool import PyngsWorkerPool
+from main.spice_worker import PyngsWorker
+from main.zygote import shutdown_zygotes
+
+DEFAULT_OUT_DIR = PROJECT_ROOT / "results" / "bench"
+
+Point = Tuple[float, float]
+
+
+@dataclass
+class BenchResult:
+    name: str
+    target: str
+    params: Dict[str, Any]
+    n_points: int
+    points_per_call: int
+    startup_s: float
+    wall_s: float
+    sims_per_s: float
+    p50_ms: float
+    p99_ms: float
+    rss_parent_mb: float
+    rss_children_mb: float
+    # proportional set size: pages shared by the children (zygote forks) counted once
+    pss_children_mb: float = float("nan")
+    errors: int = 0
+
+
+# ---------------------------------------------------------------------- helpers
+
+
+def _proc_kb(path: str, field: str) -> float:
+    try:
+        with open(path) as f:
+            for line in f:
+                if line.startswith(field):
+                    return float(line.split()[1])
+    except OSError:
+        pass
+    return float("nan")
+
+
+def _rss_mb(pid: int) -> float:
+    return _proc_kb(f"/proc/{pid}/status", "VmRSS:") / 1024
+
+
+def _pss_mb(pid: int) -> float:
+    return _proc_kb(f"/proc/{pid}/smaps_rollup", "Pss:") / 1024
+
+
+def _children(pid: int) -> List[int]:
+    """Every live descendant of `pid` (Linux /proc; empty elsewhere)."""
+    parents: Dict[int, List[int]] = {}
+    for entry in os.listdir("/proc") if os.path.isdir("/proc") else []:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # pid (comm) state ppid ...; comm may contain spaces
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        parents.setdefault(ppid, []).append(int(entry))
+    out: List[int] = []
+    todo = [pid]
+    while todo:
+        kids = parents.get(todo.pop(), [])
+        out.extend(kids)
+        todo.extend(kids)
+    return out
+
+
+def _rss() -> Tuple[float, float, float]:
+    """RSS of this process, RSS and PSS summed over its descendants, in MB."""
+    me = os.getpid()
+    kids = _children(me)
+    # a child that exits between the listing and the read gives NaN: leave it out of the sums
+    return _rss_mb(me), float(np.nansum([_rss_mb(p) for p in kids])), float(np.nansum([_pss_mb(p) for p in kids]))
+
+
+def make_points(n: int, seed: int = 0) -> List[Point]:
+    """Log-uniform (wn, wp) over the InverterEnv action box; distinct points, so no run hits a cache."""
+    rng = np.random.default_rng(seed)
+    wn = np.exp(rng.uniform(np.log(0.24), np.log(5.0), n))
+    wp = np.exp(rng.uniform(np.log(0.48), np.log(10.0), n))
+    return [(float(a), float(b)) for a, b in zip(wn, wp)]
+
+
+def _chunks(points: Sequence[Point], size: int) -> List[Sequence[Point]]:
+    return [points[i : i + size] for i in range(0, len(points), size)]
+
+
+def _bench(
+    name: str,
+    target: str,
+    params: Dict[str, Any],
+    setup: Callable[[], Any],
+    call: Callable[[Any, Sequence[Point]], int],
+    teardown: Callable[[Any], None],
+    points: Sequence[Point],
+    per_call: int,
+) -> BenchResult:
+    """
+    setup() -> obj, then one warm-up call (process start, netlist/PDK load: `startup_s`),
+    then call(obj, chunk) -> n_errors over `points` in chunks of `per_call`.
+    """
+    t0 = time.perf_counter()
+    obj = setup()
+    chunks = _chunks(points[per_call:], per_call)
+    lat: List[float] = []
+    try:
+        errors = call(obj, points[:per_call])
+        startup = time.perf_counter() - t0
+
+        t_run = time.perf_counter()
+        for chunk in chunks:
+            t = time.perf_counter()
+            errors += call(obj, chunk)
+            lat.append(time.perf_counter() - t)
+        wall = time.perf_counter() - t_run
+        rss_parent, rss_children, pss_children = _rss()
+    finally:
+        teardown(obj)
+
+    n = sum(len(c) for c in chunks)
+    lat_ms = np.asarray(lat) * 1e3 if lat else np.array([float("nan")])
+    return BenchResult(
+        name=name,
+        target=target,
+        params=params,
+        n_points=n,
+        points_per_call=per_call,
+        startup_s=startup,
+        wall_s=wall,
+        sims_per_s=n / wall if wall > 0 else float("nan"),
+        p50_ms=float(np.percentile(lat_ms, 50)),
+        p99_ms=float(np.percentile(lat_ms, 99)),
+        rss_parent_mb=rss_parent,
+        rss_children_mb=rss_children,
+        pss_children_mb=pss_children,
+        errors=int(errors),
+    )
+
+
+def _count_errors(results: Sequence[Any]) -> int:
+    return sum(isinstance(r, Exception) for r in results)
+
+
+def _close(obj: Any) -> None:
+    obj.close()
+    # start_method="zygote": the next configuration pays its own zygote start
+    shutdown_zygotes()
+
+
+# ---------------------------------------------------------------------- targets
+
+
+def _recycle_tag(recycle: str, restart_every: Optional[int]) -> str:
+    # "restart=N" keeps the names of runs made before health-driven recycling comparable
+    return f"restart={restart_every}" if recycle == "count" else f"recycle={recycle}"
+
+
+def bench_runner(points: Sequence[Point], restart_every: Optional[int], recycle: str = "count") -> BenchResult:
+    def call(r: InverterSpiceRunner, chunk: Sequence[Point]) -> int:
+        for wn, wp in chunk:
+            r.measure(wn, wp)
+        return 0
+
+    return _bench(
+        f"runner[{_recycle_tag(recycle, restart_every)}]",
+        "InverterSpiceRunner",
+        {"restart_every": restart_every, "recycle": recycle},
+        lambda: InverterSpiceRunner(restart_every=restart_every, recycle=recycle),
+        call,
+        lambda r: r.close(),
+        points,
+        1,
+    )
+
+
+def bench_worker(
+    points: Sequence[Point],
+    start_method: str,
+    restart_every: Optional[int],
+    batch: int,
+    recycle: str = "count",
+) -> BenchResult:
+    def call(w: PyngsWorker, chunk: Sequence[Point]) -> int:
+        if batch <= 1:
+            for wn, wp in chunk:
+                w.measure(wn, wp)
+            return 0
+        return _count_errors(w.measure_batch(chunk, chunk_size=batch, return_exceptions=True))
+
+    return _bench(
+        f"worker[{start_method},{_recycle_tag(recycle, restart_every)},batch={batch}]",
+        "PyngsWorker",
+        {"start_method": start_method, "restart_every": restart_every, "recycle": recycle, "batch": batch},
+        lambda: PyngsWorker(restart_every=restart_every, start_method=start_method, recycle=recycle),
+        call,
+        _close,
+        points,
+        max(1, batch),
+    )
+
+
+def bench_worker_pool(
+    points: Sequence[Point],
+    n_workers: int,
+    start_method: str,
+    restart_every: int,
+    batch: int,
+    round_size: int,
+    hedge: bool = True,
+) -> BenchResult:
+    # one call = one RL step of `round_size` envs, like InverterVecEnv
+    def call(pool: PyngsWorkerPool, chunk: Sequence[Point]) -> int:
+        return _count_errors(pool.measure_many(list(chunk), batch_size=batch, return_exceptions=True))
+
+    return _bench(
+        f"worker_pool[{start_method},workers={n_workers},restart={restart_every},batch={batch}{'' if hedge else ',nohedge'}]",
+        "PyngsWorkerPool",
+        {"n_workers": n_workers, "start_method": start_method, "restart_every": restart_every, "batch": batch, "hedge": hedge},
+        lambda: PyngsWorkerPool(
+            n_workers, restart_every=restart_every, start_method=start_method, recycle="count", hedge=hedge
+        ),
+        call,
+        _close,
+        points,
+        round_size,
+    )
+
+
+def _frame(chunk: Sequence[Point]) -> pd.DataFrame:
+    return pd.DataFrame({"wn": [p[0] for p in chunk], "wp": [p[1] for p in chunk]})
+
+
+def _run_frame(pool: Any, chunk: Sequence[Point]) -> int:
+    # run_iter keeps the instances loaded between calls (SequentialPool.run() stops them)
+    out = pd.concat(list(pool.run_iter(_frame(chunk), chunk_size=len(chunk))))
+    return int(out[list(MEASURES)].isna().any(axis=1).sum())
+
+
+def bench_sequential_pool(points: Sequence[Point], round_size: int) -> BenchResult:
+    def call(pool: SequentialPool, chunk: Sequence[Point]) -> int:
+        return _run_frame(pool, chunk)
+
+    return _bench(
+        "sequential_pool",
+        "SequentialPool",
+        {},
+        lambda: SequentialPool([INV_CHAR_NETLIST], list(MEASURES)),
+        call,
+        lambda p: p.close(),
+        points,
+        round_size,
+    )
+
+
+def bench_parallel_pool(points: Sequence[Point], processes: int, start_method: str, round_size: int) -> BenchResult:
+    def call(pool: ParallelPool, chunk: Sequence[Point]) -> int:
+        return _run_frame(pool, chunk)
+
+    return _bench(
+        f"parallel_pool[{start_method},processes={processes}]",
+        "ParallelPool",
+        {"processes": processes, "start_method": start_method},
+        lambda: ParallelPool([INV_CHAR_NETLIST], list(MEASURES), processes=processes, start_method=start_method),
+        call,
+        lambda p: p.close(),
+        points,
+        round_size,
+    )
+
+
+# ---------------------------------------------------------------------- suite
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, capture_output=True, text=True, timeout=10
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def metadata() -> Dict[str, Any]:
+    backend = backend_name()
+    meta: Dict[str, Any] = {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "backend": backend,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+    if backend == "analytic":
+        meta["analytic"] = {k: os.environ.get(k) for k in (LATENCY_ENV, LOAD_LATENCY_ENV, SPIN_ENV)}
+    return meta
+
+
+def run_suite(
+    *,
+    only: Sequence[str],
+    n_points: int,
+    workers: Sequence[int],
+    start_methods: Sequence[str],
+    restarts: Sequence[int],
+    batches: Sequence[int],
+    round_size: int,
+    recycles: Sequence[str] = (),
+    hedges: Sequence[bool] = (True,),
+) -> List[BenchResult]:
+    points = make_points(n_points)
+    results: List[BenchResult] = []
+
+    def log(r: BenchResult) -> None:
+        results.append(r)
+        print(
+            f"{r.name:<58} {r.sims_per_s:9.1f} sims/s  p50 {r.p50_ms:8.2f} ms  p99 {r.p99_ms:8.2f} ms  "
+            f"rss {r.rss_parent_mb:6.0f}+{r.rss_children_mb:6.0f} MB (pss {r.pss_children_mb:6.0f})  err {r.errors}",
+            flush=True,
+        )
+
+    # process-based targets first: with ngspice, fork is only safe before libngspice is loaded in this process
+    if "worker" in only:
+        for sm in start_methods:
+            for re_ in restarts:
+                for b in batches:
+                    log(bench_worker(points, sm, re_, b))
+            # health-driven recycling against the fixed counts above
+            # no restart_every: it would cap the instance life in these modes
+            for mode in recycles:
+                for b in batches:
+                    log(bench_worker(points, sm, None, b, mode))
+    if "pool" in only:
+        for sm in start_methods:
+            for n in workers:
+                for b in batches:
+                    for h in hedges:
+                        log(bench_worker_pool(points, n, sm, restarts[-1], b, round_size, h))
+    if "parallel" in only:
+        # ParallelPool only takes multiprocessing start methods
+        for sm in (s for s in start_methods if s != "zygote"):
+            for n in workers:
+                log(bench_parallel_pool(points, n, sm, round_size))
+    if "runner" in only:
+        for re_ in restarts:
+            log(bench_runner(points, re_))
+        for mode in recycles:
+            log(bench_runner(points, None, mode))
+    if "sequential" in only:
+        log(bench_sequential_pool(points, round_size))
+    return results
+
+
+def _ints(text: str) -> List[int]:
+    return [int(x) for x in text.split(",") if x.strip()]
+
+
+def main() -> None:
+    targets = ("worker", "pool", "parallel", "runner", "sequential")
+    ap = argparse.ArgumentParser(description="Throughput / latency / RSS of the simulation backends and pools")
+    ap.add_argument("--only", default=",".join(targets), help=f"comma-separated subset of {targets}")
+    ap.add_argument("-n", "--points", type=int, default=200, help="points per configuration")
+    ap.add_argument("--workers", default=f"1,2,4,{os.cpu_count() or 1}", help="worker/process counts")
+    ap.add_argument("--start-methods", default="spawn,fork,zygote", help="PyngsWorker start methods")
+    ap.add_argument("--restart-every", default="0,25", help="fixed recycling intervals (recycle=count)")
+    ap.add_argument("--recycle", default="health,auto", help="health-driven recycling modes to compare with them")
+    ap.add_argument("--batch", default="1,8,32", help="points per pipe message (PyngsWorker/PyngsWorkerPool)")
+    ap.add_argument("--hedge", default="1", help="PyngsWorkerPool hedging, 0/1 (0,1 compares both)")
+    ap.add_argument("--round", type=int, default=16, help="points per call for pools (n_envs of one RL step)")
+    ap.add_argument("--out", default=None, help="JSON path (default results/bench/throughput-<commit>.json)")
+    args = ap.parse_args()
+
+    only = [t.strip() for t in args.only.split(",") if t.strip()]
+    unknown = set(only) - set(targets)
+    if unknown:
+        ap.error(f"unknown targets {sorted(unknown)}")
+
+    meta = metadata()
+    print(f"backend = {meta['backend']}, commit = {meta['commit']}, cpus = {meta['cpu_count']}", flush=True)
+    results = run_suite(
+        only=only,
+        n_points=args.points,
+        workers=sorted(set(_ints(args.workers))),
+        start_methods=[s.strip() for s in args.start_methods.split(",") if s.strip()],
+        restarts=_ints(args.restart_every),
+        batches=_ints(args.batch),
+        round_size=max(1, args.round),
+        recycles=[m.strip() for m in args.recycle.split(",") if m.strip() and m.strip() != "count"],
+        hedges=[bool(h) for h in _ints(args.hedge)],
+    )
+
+    out = Path(args.out) if args.out else DEFAULT_OUT_DIR / f"throughput-{meta['commit'] or 'nocommit'}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps({"meta": meta, "results": [asdict(r) for r in results]}, indent=2))
+    print(f"\n{len(results)} configurations -> {out}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
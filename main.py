@@ -24,7 +24,11 @@ def main() -> None:
     pool = create_pool(mode, ["spice/rc_filter.cir"], measure_name="fcut")
 
     # Lancement des simulations
-    result = pool.run(values)
+    try:
+        result = pool.run(values)
+    finally:
+        # Arrêt des processus fils (mode parallèle)
+        pool.close()
 
     # Affichage des résultats
     print(result)
@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .inverter_spice import INV_CHAR_NETLIST, InverterSpiceRunner
+from .netlist import render_variant
+from .sim_cache import SimCache
+from .worker_health import merge_stats
+
+# input edges of inv_char.cir, kept identical in every window (delay depends on slew)
+EDGE_S = 50e-12
+
+
+@dataclass(frozen=True)
+class TranWindow:
+    """Stimulus half-period and max timestep of one transient window bucket."""
+
+    half_period_s: float
+    tmax_s: float
+
+    @property
+    def td_s(self) -> float:
+        return self.half_period_s / 10.0
+
+    @property
+    def tstop_s(self) -> float:
+        # rising edge at td, falling edge at td + edge + half_period, then one more half_period
+        return self.td_s + 2.0 * (EDGE_S + self.half_period_s)
+
+    @property
+    def name(self) -> str:
+        return f"w{self.half_period_s * 1e12:g}p"
+
+
+def _ps(x: float) -> str:
+    return f"{x * 1e12:g}p"
+
+
+# smallest first; past the last bucket the netlist is run as written (2 ns half period)
+WINDOW_BUCKETS: Tuple[TranWindow, ...] = (
+    TranWindow(250e-12, 0.5e-12),
+    TranWindow(500e-12, 1e-12),
+    TranWindow(1e-9, 1e-12),
+)
+
+
+class AdaptiveWindowRunner:
+    """
+    InverterSpiceRunner front-end that sizes the transient from an estimated delay.
+    - the delay of a new point is extrapolated from the nearest simulated widths
+      (same vdd/lch): tphl ~ 1 + wp/wn, tplh ~ 1 + wn/wp
+    - the smallest bucket whose half period covers `safety` x the estimate is used
+    - results are checked: both delays measured, settled well inside the half period
+      and spanning at least `min_steps` max timesteps; otherwise the point is re-run
+      in the next bucket, up to the netlist as written
+    - one InverterSpiceRunner (own variant netlist, same SimCache) per bucket, lazily
+    """
+
+    def __init__(
+        self,
+        netlist_path: Path = INV_CHAR_NETLIST,
+        *,
+        restart_every: Optional[int] = None,
+        recycle: str = "health",
+        cache: Optional[SimCache] = None,
+        buckets: Tuple[TranWindow, ...] = WINDOW_BUCKETS,
+        safety: float = 8.0,
+        settle_fraction: float = 0.25,
+        min_steps: int = 5,
+        radius: float = 0.5,
+        history: int = 256,
+    ) -> None:
+        self.netlist_path = Path(netlist_path)
+        self.restart_every = restart_every
+        self.recycle = recycle
+        self.cache = cache
+        self.buckets = tuple(buckets)
+        self.safety = float(safety)
+        self.settle_fraction = float(settle_fraction)
+        self.min_steps = int(min_steps)
+        self.radius = float(radius)
+        self.history = int(history)
+
+        # index len(buckets) = netlist as written
+        self._runners: Dict[int, InverterSpiceRunner] = {}
+        # (vdd, lch, log wn, log wp, tphl, tplh) of recent resolved sims
+        self._known: List[Tuple[float, float, float, float, float, float]] = []
+        self.runs = [0] * (len(self.buckets) + 1)
+        self.escalations = 0
+
+    def _runner(self, i: int) -> InverterSpiceRunner:
+        runner = self._runners.get(i)
+        if runner is None:
+            path = self.netlist_path
+            if i < len(self.buckets):
+                w = self.buckets[i]
+                path = render_variant(
+                    self.netlist_path,
+                    w.name,
+                    tstep=_ps(w.tmax_s),
+                    tstop=_ps(w.tstop_s),
+                    tmax=_ps(w.tmax_s),
+                    pulse={"td": _ps(w.td_s), "pw": _ps(w.half_period_s), "per": _ps(2.0 * w.half_period_s)},
+                )
+            runner = InverterSpiceRunner(
+                path, restart_every=self.restart_every, recycle=self.recycle, cache=self.cache
+            )
+            self._runners[i] = runner
+        return runner
+
+    def estimate_delay(self, wn_um: float, wp_um: float, *, vdd: float, lch_um: float) -> Optional[Tuple[float, float]]:
+        """(tphl, tplh) extrapolated from the nearest known point, None if none is close enough."""
+        x, y = math.log(wn_um), math.log(wp_um)
+        best: Optional[Tuple[float, Tuple[float, float, float, float, float, float]]] = None
+        for k in self._known:
+            if k[0] != vdd or k[1] != lch_um:
+                continue
+            d = math.hypot(k[2] - x, k[3] - y)
+            if d <= self.radius and (best is None or d < best[0]):
+                best = (d, k)
+        if best is None:
+            return None
+
+        _, (_, _, x0, y0, tphl0, tplh0) = best
+        wn0, wp0 = math.exp(x0), math.exp(y0)
+        tphl = tphl0 * (1.0 + wp_um / wn_um) / (1.0 + wp0 / wn0)
+        tplh = tplh0 * (1.0 + wn_um / wp_um) / (1.0 + wn0 / wp0)
+        return tphl, tplh
+
+    def choose_bucket(self, est: Optional[Tuple[float, float]]) -> int:
+        if est is None:
+            return len(self.buckets)
+        for i, w in enumerate(self.buckets):
+            if self.safety * max(est) <= w.half_period_s and min(est) >= 2 * self.min_steps * w.tmax_s:
+                return i
+        return len(self.buckets)
+
+    def resolved(self, res: Dict[str, Any], i: int) -> bool:
+        """Delay .meas results are usable in bucket i (the netlist as written is always trusted)."""
+        if i >= len(self.buckets):
+            return True
+        w = self.buckets[i]
+        delays = (float(res["tphl"]), float(res["tplh"]))
+        if not all(math.isfinite(t) and t > 0.0 for t in delays):
+            return False
+        return max(delays) <= self.settle_fraction * w.half_period_s and min(delays) >= self.min_steps * w.tmax_s
+
+    def measure(
+        self,
+        wn_um: float,
+        wp_um: float,
+        *,
+        vdd: float = 1.8,
+        lch_um: float = 0.15,
+        k_area: float = 1.0,
+    ) -> Dict[str, Any]:
+        i = self.choose_bucket(self.estimate_delay(wn_um, wp_um, vdd=vdd, lch_um=lch_um))
+        while True:
+            self.runs[i] += 1
+            try:
+                res = self._runner(i).measure(wn_um, wp_um, vdd=vdd, lch_um=lch_um, k_area=k_area)
+            except Exception:
+                if i >= len(self.buckets):
+                    raise
+                res = None
+            if res is not None and self.resolved(res, i):
+                break
+            self.escalations += 1
+            i += 1
+
+        self._known.append((float(vdd), float(lch_um), math.log(wn_um), math.log(wp_um), res["tphl"], res["tplh"]))
+        if len(self._known) > self.history:
+            self._known.pop(0)
+        res["tran_window"] = self.buckets[i].name if i < len(self.buckets) else "netlist"
+        return res
+
+    def stats(self) -> Dict[str, float]:
+        out = {f"runs_{w.name}": float(n) for w, n in zip(self.buckets, self.runs)}
+        out["runs_netlist"] = float(self.runs[-1])
+        out["escalations"] = float(self.escalations)
+        return out
+
+    def health_stats(self) -> Optional[Dict[str, Any]]:
+        return merge_stats([r.health_stats() for r in self._runners.values()])
+
+    def close(self) -> None:
+        for runner in self._runners.values():
+            runner.close()
+        self._runners.clear()
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import math
+from typing import Optional
+
+import numpy as np
+
+from .design_eval import DesignEvaluator, SearchTracker
+from .rl_env import WN_BOUNDS, WP_BOUNDS
+from .surrogate import GaussianProcess
+
+_LO = np.array([WN_BOUNDS[0], WP_BOUNDS[0]])
+_SPAN = np.array([WN_BOUNDS[1] - WN_BOUNDS[0], WP_BOUNDS[1] - WP_BOUNDS[0]])
+
+_erf = np.vectorize(math.erf, otypes=[np.float64])
+
+
+def expected_improvement(mean: np.ndarray, std: np.ndarray, best: float, xi: float = 1e-3) -> np.ndarray:
+    """EI of a maximisation problem for Gaussian predictions."""
+    std = np.maximum(std, 1e-12)
+    imp = mean - best - xi
+    z = imp / std
+    cdf = 0.5 * (1.0 + _erf(z / math.sqrt(2.0)))
+    pdf = np.exp(-0.5 * z * z) / math.sqrt(2.0 * math.pi)
+    return np.maximum(imp * cdf + std * pdf, 0.0)
+
+
+def latin_hypercube(n: int, rng: np.random.Generator) -> np.ndarray:
+    """n points in [0, 1]^2, one per row and column stratum."""
+    cols = [(rng.permutation(n) + rng.random(n)) / n for _ in range(2)]
+    return np.stack(cols, axis=1)
+
+
+class BatchBayesOpt:
+    """
+    GP-based Bayesian optimisation over the InverterEnv action box.
+    - inputs scaled to [0, 1]^2, GP on the reward (surrogate.GaussianProcess)
+    - q points per round by constant-liar q-EI: after each pick the GP is refit with a
+      pessimistic fantasy (worst observed reward) at that point, which pushes the next
+      picks away from it
+    - acquisition maximised over random candidates plus local perturbations of the best
+    - failed simulations are kept out of the GP (they would flatten the model)
+    """
+
+    def __init__(
+        self,
+        *,
+        q: int = 4,
+        n_init: int = 8,
+        n_candidates: int = 2048,
+        max_train: int = 300,
+        seed: Optional[int] = None,
+    ) -> None:
+        self.q = max(1, int(q))
+        self.n_init = int(n_init)
+        self.n_candidates = int(n_candidates)
+        self.max_train = int(max_train)
+        self.rng = np.random.default_rng(seed)
+
+        self.X = np.empty((0, 2))
+        self.y = np.empty(0)
+
+    def tell(self, points: np.ndarray, rewards: np.ndarray, ok: np.ndarray) -> None:
+        x = (np.asarray(points, dtype=np.float64) - _LO) / _SPAN
+        self.X = np.vstack([self.X, x[ok]])
+        self.y = np.concatenate([self.y, np.asarray(rewards, dtype=np.float64)[ok]])
+
+    def _train_set(self):
+        if len(self.y) <= self.max_train:
+            return self.X, self.y
+        keep = np.argsort(self.y)[-self.max_train :]
+        return self.X[keep], self.y[keep]
+
+    def ask(self) -> np.ndarray:
+        """Next batch of widths (µm), shape (q, 2)."""
+        if len(self.y) < self.n_init:
+            x = latin_hypercube(max(self.n_init - len(self.y), self.q), self.rng)
+            return _LO + x * _SPAN
+
+        X, y = self._train_set()
+        gp = GaussianProcess().fit(X, y)
+        # refits with a fixed length scale: the fantasies must not change the model shape
+        liar = GaussianProcess(length_scales=(gp.length_scale,), noise=gp.noise)
+
+        best_x = X[int(np.argmax(y))]
+        cands = np.vstack(
+            [
+                self.rng.random((self.n_candidates, 2)),
+                np.clip(best_x + 0.05 * self.rng.normal(size=(self.n_candidates // 4, 2)), 0.0, 1.0),
+            ]
+        )
+
+        picks = []
+        Xf, yf = X, y
+        for _ in range(self.q):
+            mean, std = gp.predict(cands)
+            k = int(np.argmax(expected_improvement(mean, std, float(yf.max()))))
+            picks.append(cands[k])
+            Xf = np.vstack([Xf, cands[k]])
+            yf = np.append(yf, y.min())
+            cands = np.delete(cands, k, axis=0)
+            gp = liar.fit(Xf, yf)
+
+        return _LO + np.asarray(picks) * _SPAN
+
+
+def run_bo(
+    evaluator: DesignEvaluator,
+    tracker: SearchTracker,
+    *,
+    max_evals: int,
+    q: Optional[int] = None,
+    n_init: int = 8,
+    seed: Optional[int] = None,
+) -> BatchBayesOpt:
+    """Rounds of q parallel simulations until the budget or an early stop is hit."""
+    bo = BatchBayesOpt(q=q or evaluator.n_workers, n_init=max(n_init, 2), seed=seed)
+    tracker.start()
+    while evaluator.n_sims < max_evals and not tracker.expired():
+        points = evaluator.clip(bo.ask())
+        rewards, records = evaluator.evaluate(points)
+        bo.tell(points, rewards, np.array([r["ppa"]["sim_ok"] > 0.5 for r in records]))
+        if tracker.record(evaluator.n_sims, evaluator.best):
+            break
+    return bo
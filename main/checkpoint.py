@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import io
+import os
+import pickle
+import random
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as np
+import torch
+from stable_baselines3.common.base_class import BaseAlgorithm
+from stable_baselines3.common.callbacks import BaseCallback
+
+from .design_eval import SearchTracker
+from .sim_cache import PROJECT_ROOT
+
+DEFAULT_CHECKPOINT_PATH = PROJECT_ROOT / "results" / "checkpoints" / "last.ckpt"
+
+CHECKPOINT_VERSION = 1
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    """Write to a temp file in the same directory, fsync, then rename over `path`."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=path.name + ".", suffix=".tmp", dir=str(path.parent))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+class AsyncCheckpointWriter:
+    """
+    Writes checkpoints from a background thread.
+    - one pending slot: a checkpoint submitted while the previous one is still on disk
+      replaces the pending one instead of queueing (only the latest matters)
+    - close() waits for the last write
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self.n_written = 0
+        self.last_error: Optional[BaseException] = None
+        self._pending: Optional[bytes] = None
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="checkpoint-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, data: bytes) -> None:
+        with self._cond:
+            self._pending = data
+            self._cond.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                if self._pending is None:
+                    return
+                data, self._pending = self._pending, None
+            try:
+                _atomic_write(self.path, data)
+                self.n_written += 1
+            except Exception as exc:
+                # a full disk must not kill the run; the previous checkpoint stays valid
+                self.last_error = exc
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+
+
+def load_checkpoint(path: str | Path) -> Dict[str, Any]:
+    with open(path, "rb") as f:
+        ckpt = pickle.load(f)
+    if ckpt.get("version") != CHECKPOINT_VERSION:
+        raise ValueError(f"unsupported checkpoint version {ckpt.get('version')!r} in {path}")
+    return ckpt
+
+
+def check_resume_config(ckpt: Dict[str, Any], config: Dict[str, Any], path: str | Path) -> None:
+    """Raise if the run being resumed was started with another configuration (weights, env layout)."""
+    saved = ckpt.get("config") or {}
+
+    def norm(v: Any) -> Any:
+        return tuple(float(x) for x in v) if isinstance(v, (list, tuple)) else v
+
+    changed = [f"{k}: {saved[k]!r} -> {v!r}" for k, v in config.items() if k in saved and norm(saved[k]) != norm(v)]
+    if changed:
+        raise ValueError(f"{path} was saved by a run with another configuration ({'; '.join(changed)})")
+
+
+def load_model(ckpt: Dict[str, Any], cls: type, env: Any) -> BaseAlgorithm:
+    """Model (policy + optimizer state, num_timesteps) of a checkpoint, attached to `env`."""
+    return cls.load(io.BytesIO(ckpt["model"]), env=env, device="cpu")
+
+
+class RunCheckpointCallback(BaseCallback):
+    """
+    Periodic checkpoints of a PPO run (at rollout boundaries, every `interval` timesteps), and resume.
+    - checkpoint: model zip (policy, optimizer), SearchTracker state, per-env episode state
+      (RNG, widths, normalisation references, best point, last obs) and the global RNGs
+    - the rollout thread only serialises to memory; the disk write + fsync happen in an
+      AsyncCheckpointWriter thread
+    - resume: must come after BestTrainCallback in the callback list, so the tracker clock
+      is restored after BestTrainCallback started it
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        tracker: SearchTracker,
+        *,
+        interval: int = 1000,
+        resume: Optional[Dict[str, Any]] = None,
+        config: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        super().__init__()
+        self.path = Path(path)
+        self.tracker = tracker
+        self.interval = int(interval)
+        self.resume = resume
+        self.config = dict(config or {})
+        self.writer = AsyncCheckpointWriter(self.path)
+        self.save_time_s = 0.0
+        self._last_save = 0
+
+    def _restore(self, ckpt: Dict[str, Any]) -> None:
+        rng = ckpt["rng"]
+        random.setstate(rng["python"])
+        np.random.set_state(rng["numpy"])
+        torch.set_rng_state(rng["torch"])
+        self.tracker.load_state_dict(ckpt["tracker"])
+
+        env = self.training_env
+        states = ckpt["envs"]
+        if len(states) != env.num_envs:
+            print(
+                f"[WARN] checkpoint has {len(states)} envs, run has {env.num_envs}; episodes restart from reset",
+                flush=True,
+            )
+            return
+        obs = [env.env_method("set_state", s, indices=i)[0] for i, s in enumerate(states)]
+        if all(o is not None for o in obs):
+            self.model._last_obs = np.stack(obs)
+            self.model._last_episode_starts = np.asarray(ckpt["episode_starts"], dtype=bool)
+
+    def _payload(self) -> bytes:
+        buf = io.BytesIO()
+        self.model.save(buf)
+        ckpt = {
+            "version": CHECKPOINT_VERSION,
+            "saved_at": time.time(),
+            "num_timesteps": int(self.num_timesteps),
+            "config": self.config,
+            "model": buf.getvalue(),
+            "tracker": self.tracker.state_dict(),
+            "envs": self.training_env.env_method("get_state"),
+            "episode_starts": np.asarray(self.model._last_episode_starts, dtype=bool).copy(),
+            "rng": {"python": random.getstate(), "numpy": np.random.get_state(), "torch": torch.get_rng_state()},
+        }
+        return pickle.dumps(ckpt, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def save(self) -> None:
+        t0 = time.perf_counter()
+        self.writer.submit(self._payload())
+        self.save_time_s += time.perf_counter() - t0
+        self._last_save = self.num_timesteps
+
+    def _on_training_start(self) -> None:
+        if self.resume is not None:
+            self._restore(self.resume)
+            self.resume = None
+        self._last_save = self.num_timesteps
+
+    def _on_rollout_start(self) -> None:
+        # between PPO updates: model, last obs and env episodes are consistent with each other
+        if self.interval > 0 and self.num_timesteps - self._last_save >= self.interval:
+            self.save()
+
+    def _on_step(self) -> bool:
+        return True
+
+    def _on_training_end(self) -> None:
+        self.save()
+
+    def close(self) -> None:
+        self.writer.close()
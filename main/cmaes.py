@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import math
+from typing import Optional
+
+import numpy as np
+
+from .design_eval import REFERENCE_DESIGN, DesignEvaluator, SearchTracker
+from .rl_env import WN_BOUNDS, WP_BOUNDS
+
+_LO = np.array([WN_BOUNDS[0], WP_BOUNDS[0]])
+_SPAN = np.array([WN_BOUNDS[1] - WN_BOUNDS[0], WP_BOUNDS[1] - WP_BOUNDS[0]])
+
+
+class CMAES:
+    """
+    (mu/mu_w, lambda)-CMA-ES maximising the reward over the InverterEnv action box.
+    - search space scaled to [0, 1]^2; samples outside are clipped before evaluation
+      and their fitness gets a quadratic penalty on the clipping distance
+    - standard default weights and learning rates (Hansen, "The CMA Evolution Strategy: A Tutorial")
+    - ask() returns one generation, evaluated as a single batch on the pool
+    """
+
+    def __init__(
+        self,
+        x0: np.ndarray,
+        sigma0: float = 0.3,
+        *,
+        popsize: Optional[int] = None,
+        seed: Optional[int] = None,
+    ) -> None:
+        n = len(x0)
+        self.n = n
+        self.lam = int(popsize or 4 + int(3 * math.log(n)))
+        self.mu = self.lam // 2
+        w = math.log(self.mu + 0.5) - np.log(np.arange(1, self.mu + 1))
+        self.weights = w / w.sum()
+        self.mueff = 1.0 / float(np.sum(self.weights**2))
+
+        self.cc = (4 + self.mueff / n) / (n + 4 + 2 * self.mueff / n)
+        self.cs = (self.mueff + 2) / (n + self.mueff + 5)
+        self.c1 = 2 / ((n + 1.3) ** 2 + self.mueff)
+        self.cmu = min(1 - self.c1, 2 * (self.mueff - 2 + 1 / self.mueff) / ((n + 2) ** 2 + self.mueff))
+        self.damps = 1 + 2 * max(0.0, math.sqrt((self.mueff - 1) / (n + 1)) - 1) + self.cs
+        self.chin = math.sqrt(n) * (1 - 1 / (4 * n) + 1 / (21 * n * n))
+
+        self.mean = np.asarray(x0, dtype=np.float64).copy()
+        self.sigma = float(sigma0)
+        self.C = np.eye(n)
+        self.pc = np.zeros(n)
+        self.ps = np.zeros(n)
+        self.generation = 0
+        self.rng = np.random.default_rng(seed)
+
+        self._B = np.eye(n)
+        self._D = np.ones(n)
+        self._y: Optional[np.ndarray] = None
+
+    @property
+    def spread(self) -> float:
+        """Largest standard deviation of the sampling distribution."""
+        return self.sigma * float(self._D.max())
+
+    def ask(self) -> np.ndarray:
+        """One generation in the unit box (lambda, n), before clipping."""
+        z = self.rng.standard_normal((self.lam, self.n))
+        self._y = (z * self._D) @ self._B.T
+        return self.mean + self.sigma * self._y
+
+    def tell(self, x: np.ndarray, fitness: np.ndarray) -> None:
+        """Update from the generation returned by ask() and its fitness (higher is better)."""
+        assert self._y is not None
+        x = np.asarray(x, dtype=np.float64)
+        # out-of-box samples: rank by the fitness of the clipped point minus the clipping distance
+        fit = np.asarray(fitness, dtype=np.float64) - np.sum((x - np.clip(x, 0.0, 1.0)) ** 2, axis=1)
+        order = np.argsort(-fit)[: self.mu]
+        y_sel = self._y[order]
+        y_w = self.weights @ y_sel
+
+        self.mean = self.mean + self.sigma * y_w
+
+        inv_sqrt_c = self._B @ np.diag(1.0 / self._D) @ self._B.T
+        self.ps = (1 - self.cs) * self.ps + math.sqrt(self.cs * (2 - self.cs) * self.mueff) * (inv_sqrt_c @ y_w)
+        self.generation += 1
+        ps_norm = np.linalg.norm(self.ps) / math.sqrt(1 - (1 - self.cs) ** (2 * self.generation))
+        hsig = ps_norm / self.chin < 1.4 + 2 / (self.n + 1)
+        self.pc = (1 - self.cc) * self.pc + hsig * math.sqrt(self.cc * (2 - self.cc) * self.mueff) * y_w
+
+        rank_mu = (y_sel.T * self.weights) @ y_sel
+        self.C = (
+            (1 - self.c1 - self.cmu) * self.C
+            + self.c1 * (np.outer(self.pc, self.pc) + (1 - hsig) * self.cc * (2 - self.cc) * self.C)
+            + self.cmu * rank_mu
+        )
+        self.sigma *= math.exp((self.cs / self.damps) * (np.linalg.norm(self.ps) / self.chin - 1))
+
+        self.C = (self.C + self.C.T) / 2
+        d2, self._B = np.linalg.eigh(self.C)
+        self._D = np.sqrt(np.maximum(d2, 1e-20))
+        self._y = None
+
+
+def run_cmaes(
+    evaluator: DesignEvaluator,
+    tracker: SearchTracker,
+    *,
+    max_evals: int,
+    popsize: Optional[int] = None,
+    sigma0: float = 0.3,
+    seed: Optional[int] = None,
+) -> CMAES:
+    """One pool batch per generation until the budget, an early stop or sigma collapses."""
+    x0 = (np.array(REFERENCE_DESIGN) - _LO) / _SPAN
+    es = CMAES(x0, sigma0, popsize=popsize or max(6, evaluator.n_workers), seed=seed)
+    tracker.start()
+    while evaluator.n_sims < max_evals and not tracker.expired():
+        x = es.ask()
+        rewards, _ = evaluator.evaluate(_LO + np.clip(x, 0.0, 1.0) * _SPAN)
+        es.tell(x, rewards)
+        if tracker.record(evaluator.n_sims, evaluator.best) or es.spread < 1e-6:
+            break
+    return es
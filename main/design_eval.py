@@ -0,0 +1,267 @@
+from __future__ import annotations
+
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .pareto import ParetoArchive
+from .quarantine import FailureQuarantine
+from .rl_env import WN_BOUNDS, WP_BOUNDS, normalize_weights, ppa_reward
+from .sim_cache import SimCache
+from .spice_pool import PyngsWorkerPool
+
+# InverterEnv start point, used as the normalisation reference of the black-box optimizers
+REFERENCE_DESIGN = (0.42, 0.84)
+
+
+@dataclass
+class TrainingSnapshot:
+    step: int
+    reward: float
+    wn_um: float
+    wp_um: float
+    tpavg_s: float
+    pstatic_w: float
+    area_um: float
+    elapsed_s: float
+
+
+class SearchTracker:
+    """
+    Best-so-far bookkeeping shared by every optimizer (PPO callback, BO, CMA-ES).
+    - record() turns the current best design into a TrainingSnapshot and streams it
+    - early stop on target reward, plateau (min_delta / patience after warmup) or walltime
+    """
+
+    def __init__(
+        self,
+        *,
+        min_delta: float = 1e-3,
+        patience_snapshots: int = 8,
+        warmup_snapshots: int = 3,
+        target_reward: float | None = None,
+        max_walltime_s: float | None = None,
+        on_snapshot: Callable[[TrainingSnapshot, Dict[str, Any]], None] | None = None,
+    ) -> None:
+        self.min_delta = float(min_delta)
+        self.patience_snapshots = int(patience_snapshots)
+        self.warmup_snapshots = int(warmup_snapshots)
+        self.target_reward = None if target_reward is None else float(target_reward)
+        self.max_walltime_s = None if max_walltime_s is None else float(max_walltime_s)
+        self._on_snapshot = on_snapshot
+
+        self.history: List[TrainingSnapshot] = []
+        self.best: Dict[str, Any] | None = None
+        self.stop = False
+
+        self._t0_wall = time.time()
+        self._snap_idx = 0
+        self._last_best = -1e30
+        self._last_improve_snap_idx = 0
+
+    def start(self) -> None:
+        self._t0_wall = time.time()
+
+    def state_dict(self) -> Dict[str, Any]:
+        """Everything record() depends on, elapsed walltime included (for checkpoints)."""
+        return {
+            "history": list(self.history),
+            "best": self.best,
+            "elapsed_s": time.time() - self._t0_wall,
+            "snap_idx": self._snap_idx,
+            "last_best": self._last_best,
+            "last_improve_snap_idx": self._last_improve_snap_idx,
+        }
+
+    def load_state_dict(self, state: Dict[str, Any]) -> None:
+        """Continue from state_dict(): the walltime budget counts the time already spent."""
+        self.history = list(state["history"])
+        self.best = state["best"]
+        self._t0_wall = time.time() - float(state["elapsed_s"])
+        self._snap_idx = int(state["snap_idx"])
+        self._last_best = float(state["last_best"])
+        self._last_improve_snap_idx = int(state["last_improve_snap_idx"])
+
+    def expired(self) -> bool:
+        if self.max_walltime_s is not None and (time.time() - self._t0_wall) >= self.max_walltime_s:
+            self.stop = True
+        return self.stop
+
+    def record(self, step: int, b: Dict[str, Any] | None) -> bool:
+        """Snapshot best design `b` at `step`; returns True when the search should stop."""
+        if b is None:
+            return self.stop
+
+        ppa = b.get("ppa", {})
+        snap = TrainingSnapshot(
+            step=int(step),
+            reward=float(b["reward"]),
+            wn_um=float(b["wn_um"]),
+            wp_um=float(b["wp_um"]),
+            tpavg_s=float(ppa.get("tpavg", float("nan"))),
+            pstatic_w=float(ppa.get("pstatic", float("nan"))),
+            area_um=float(ppa.get("area_um", float("nan"))),
+            elapsed_s=float(time.time() - self._t0_wall),
+        )
+        self.history.append(snap)
+        self._snap_idx += 1
+
+        if self.best is None or float(b["reward"]) > float(self.best["reward"]):
+            self.best = b
+
+        if self._on_snapshot is not None:
+            try:
+                self._on_snapshot(snap, b)
+            except Exception:
+                # UI callbacks should not break training
+                pass
+
+        # stop if target reached
+        if self.target_reward is not None and snap.reward >= self.target_reward:
+            self.stop = True
+            return True
+
+        # plateau stop
+        improved = (snap.reward - self._last_best) >= self.min_delta
+        if improved:
+            self._last_best = snap.reward
+            self._last_improve_snap_idx = self._snap_idx
+
+        if self._snap_idx >= self.warmup_snapshots:
+            no_improve = self._snap_idx - self._last_improve_snap_idx
+            if no_improve >= self.patience_snapshots:
+                self.stop = True
+        return self.stop
+
+
+class DesignEvaluator:
+    """
+    Scores batches of (wn, wp) with the InverterEnv reward on a PyngsWorkerPool.
+    - widths are clipped to the InverterEnv action bounds
+    - metrics are normalised by one reference design (InverterEnv start point)
+    - failed sims get `sim_fail_penalty`, like InverterEnv; with a FailureQuarantine, points in a
+      known failure region get it without a simulation
+    - counts simulations and keeps the best design (InverterEnv.get_best layout)
+    """
+
+    def __init__(
+        self,
+        w_delay: float = 1.0,
+        w_power: float = 1.0,
+        w_area: float = 1.0,
+        *,
+        pool: Optional[PyngsWorkerPool] = None,
+        n_workers: Optional[int] = None,
+        cache_path: Optional[str] = None,
+        start_method: str = "spawn",
+        sim_fail_penalty: float = -1_000.0,
+        reference: Tuple[float, float] = REFERENCE_DESIGN,
+        archive_path: Optional[str] = None,
+        quarantine_path: Optional[str] = None,
+        source: str = "",
+    ) -> None:
+        self.weights = normalize_weights(w_delay, w_power, w_area)
+        self.sim_fail_penalty = float(sim_fail_penalty)
+        self.reference = (float(reference[0]), float(reference[1]))
+
+        self._owns_pool = pool is None
+        if pool is None:
+            cache = SimCache(cache_path) if cache_path is not None else None
+            pool = PyngsWorkerPool(int(n_workers or os.cpu_count() or 1), start_method=start_method, cache=cache)
+        self.pool = pool
+        self.archive = ParetoArchive(archive_path) if archive_path is not None else None
+        self.quarantine = FailureQuarantine(quarantine_path) if quarantine_path is not None else None
+        self.source = source
+
+        self.n_sims = 0
+        self.best: Dict[str, Any] | None = None
+        self._refs: Optional[np.ndarray] = None
+
+    @property
+    def n_workers(self) -> int:
+        return len(self.pool.workers)
+
+    @staticmethod
+    def clip(points: np.ndarray) -> np.ndarray:
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        return np.stack([np.clip(points[:, 0], *WN_BOUNDS), np.clip(points[:, 1], *WP_BOUNDS)], axis=1)
+
+    def _ensure_refs(self) -> np.ndarray:
+        if self._refs is None:
+            wn, wp = self.reference
+            data = self.pool.measure(wn, wp)
+            self.n_sims += 1
+            # a cache hit was archived by the run that simulated it
+            if self.archive is not None and float(data.get("cached", 0.0)) < 0.5:
+                self.archive.add(wn, wp, {**data, "area_um": wn + wp}, source=self.source)
+            self._refs = np.array(
+                [max(float(data["tpavg"]), 1e-15), max(float(data["pstatic"]), 1e-15), max(wn + wp, 1e-6)]
+            )
+        return self._refs
+
+    def evaluate(self, points: Sequence[Tuple[float, float]] | np.ndarray) -> Tuple[np.ndarray, List[Dict[str, Any]]]:
+        """Rewards and best-style records ({"reward", "wn_um", "wp_um", "ppa"}) for each point."""
+        pts = self.clip(np.asarray(points))
+        refs = self._ensure_refs()
+        q = self.quarantine
+        run = [j for j, (wn, wp) in enumerate(pts.tolist()) if q is None or not q.check(wn, wp)]
+        results: List[Any] = [RuntimeError("quarantined: known failure region")] * len(pts)
+        for j, r in zip(run, self.pool.measure_many([tuple(pts[j]) for j in run], return_exceptions=True)):
+            results[j] = r
+            if q is not None:
+                if isinstance(r, Exception):
+                    q.record(pts[j, 0], pts[j, 1], False, error=f"{type(r).__name__}: {r}")
+                elif float(r.get("cached", 0.0)) < 0.5:
+                    q.record(pts[j, 0], pts[j, 1], True)
+        self.n_sims += len(run)
+
+        rewards = np.empty(len(pts))
+        records: List[Dict[str, Any]] = []
+        for j, (r, (wn, wp)) in enumerate(zip(results, pts.tolist())):
+            area = wn + wp
+            if isinstance(r, Exception):
+                ppa = {
+                    "tphl": 1.0,
+                    "tplh": 1.0,
+                    "tpavg": 1.0,
+                    "pstatic": 1.0,
+                    "area_um": area,
+                    "delay_norm": 1.0,
+                    "power_norm": 1.0,
+                    "area_norm": 1.0,
+                    "sim_ok": 0.0,
+                }
+                rewards[j] = self.sim_fail_penalty
+            else:
+                norm = np.array([float(r["tpavg"]), float(r["pstatic"]), area]) / refs
+                ppa = {
+                    "tphl": float(r["tphl"]),
+                    "tplh": float(r["tplh"]),
+                    "tpavg": float(r["tpavg"]),
+                    "pstatic": float(r["pstatic"]),
+                    "area_um": area,
+                    "delay_norm": float(norm[0]),
+                    "power_norm": float(norm[1]),
+                    "area_norm": float(norm[2]),
+                    "sim_ok": 1.0,
+                }
+                rewards[j] = float(ppa_reward(norm[0], norm[1], norm[2], self.weights))
+                if self.archive is not None and float(r.get("cached", 0.0)) < 0.5:
+                    self.archive.add(wn, wp, ppa, source=self.source)
+
+            rec = {"reward": float(rewards[j]), "wn_um": float(wn), "wp_um": float(wp), "ppa": ppa}
+            records.append(rec)
+            if ppa["sim_ok"] > 0.5 and (self.best is None or rec["reward"] > float(self.best["reward"])):
+                self.best = rec
+        return rewards, records
+
+    def close(self) -> None:
+        if self._owns_pool:
+            self.pool.close()
+        if self.archive is not None:
+            self.archive.close()
+        if self.quarantine is not None:
+            self.quarantine.close()
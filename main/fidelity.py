@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+# objectives compared by the promotion policy (all minimised)
+PROMOTION_OBJECTIVES = ("tpavg", "pstatic", "area_um")
+
+
+class MultiFidelityRunner:
+    """
+    Screens candidates with a cheap runner and re-runs promising ones at full fidelity.
+    - every point is first simulated by `coarse` (relaxed tolerances, shorter window)
+    - with `weights` (delay, power, area), a point is promoted to `full` when its weighted
+      log cost is within `margin` (relative) of the best coarse point seen so far
+    - without weights, when it lies within `margin` of the coarse Pareto front of
+      (tpavg, pstatic, area), i.e. near the best design for some weighting
+    - the first `warmup` points are always promoted, and again after `weights` changes: the best
+      cost restarts then, since costs under other weights are not comparable
+    - results keep the "fidelity" tag of the runner that produced them
+    """
+
+    def __init__(
+        self,
+        coarse: Any,
+        full: Any,
+        *,
+        weights: Optional[Tuple[float, float, float]] = None,
+        margin: float = 0.1,
+        warmup: int = 5,
+    ) -> None:
+        self.coarse = coarse
+        self.full = full
+        self.margin = float(margin)
+        self.warmup = int(warmup)
+
+        self._front: List[Tuple[float, ...]] = []
+        self._weights: Optional[Tuple[float, ...]] = None
+        self._best_cost = math.inf
+        # points screened since the last change of weights (warmup)
+        self._screened = 0
+        self.coarse_calls = 0
+        self.full_calls = 0
+        self.weights = weights
+
+    @property
+    def weights(self) -> Optional[Tuple[float, ...]]:
+        return self._weights
+
+    @weights.setter
+    def weights(self, value: Optional[Tuple[float, ...]]) -> None:
+        value = None if value is None else tuple(float(w) for w in value)
+        if value == self._weights:
+            return
+        self._weights = value
+        self._best_cost = math.inf
+        self._screened = 0
+
+    @property
+    def cache(self) -> Any:
+        return getattr(self.full, "cache", None)
+
+    def _objectives(self, res: Dict[str, Any]) -> Tuple[float, ...]:
+        return tuple(float(res[k]) for k in PROMOTION_OBJECTIVES)
+
+    def _cost(self, y: Tuple[float, ...]) -> float:
+        assert self.weights is not None
+        return sum(w * math.log(max(v, 1e-30)) for w, v in zip(self.weights, y))
+
+    def _near_front(self, y: Tuple[float, ...]) -> bool:
+        # promote unless some front point beats y by more than `margin` on every objective
+        slack = 1.0 + self.margin
+        return not any(all(q * slack <= v for q, v in zip(f, y)) for f in self._front)
+
+    def _update_front(self, y: Tuple[float, ...]) -> None:
+        if self.weights is not None:
+            self._best_cost = min(self._best_cost, self._cost(y))
+            return
+        if any(all(q <= v for q, v in zip(f, y)) for f in self._front):
+            return
+        self._front = [f for f in self._front if not all(v <= q for q, v in zip(f, y))]
+        self._front.append(y)
+
+    def should_promote(self, coarse_res: Dict[str, Any]) -> bool:
+        if self._screened <= self.warmup:
+            return True
+        y = self._objectives(coarse_res)
+        if self.weights is not None:
+            return self._cost(y) <= self._best_cost + math.log1p(self.margin)
+        return self._near_front(y)
+
+    def measure(self, wn_um: float, wp_um: float, *, fidelity: str | None = None, **kwargs) -> Dict[str, Any]:
+        """fidelity="full"/"coarse" forces a level, None applies the promotion policy."""
+        if fidelity == "full":
+            self.full_calls += 1
+            return self.full.measure(wn_um, wp_um, **kwargs)
+
+        self.coarse_calls += 1
+        res = self.coarse.measure(wn_um, wp_um, **kwargs)
+        if fidelity == "coarse":
+            return res
+
+        self._screened += 1
+        promote = self.should_promote(res)
+        self._update_front(self._objectives(res))
+        if not promote:
+            return res
+        self.full_calls += 1
+        return self.full.measure(wn_um, wp_um, **kwargs)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "coarse_calls": float(self.coarse_calls),
+            "full_calls": float(self.full_calls),
+            "promotion_rate": float(self.full_calls / self.coarse_calls) if self.coarse_calls else 0.0,
+            "front_size": float(len(self._front)),
+            "best_cost": float(self._best_cost),
+        }
+
+    def close(self) -> None:
+        self.coarse.close()
+        self.full.close()
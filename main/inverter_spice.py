@@ -1,42 +1,94 @@
 from __future__ import annotations
 
 import contextlib
+import math
 import os
 import tempfile
+import time
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Dict, Optional
 
-from pyngs.core import NGSpiceInstance
+from . import tracing
+from .netlist import render_variant
+from .pdk_slim import outside_extract, slim_netlist
+from .sim_cache import SimCache
+from .spice_backend import NGSpiceInstance
+from .worker_health import HealthMonitor, HealthPolicy, count_warnings, current_rss_mb
 
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 INV_CHAR_NETLIST = PROJECT_ROOT / "spice" / "inv_char.cir"
 MEASURES = ("tphl", "tplh", "tpavg", "ileak", "pstatic")
 
 
+@dataclass(frozen=True)
+class Fidelity:
+    """Transient setup of one fidelity level (None = keep the netlist value)."""
+
+    tstep: Optional[str] = None
+    tstop: Optional[str] = None
+    tmax: Optional[str] = None
+    reltol: Optional[float] = None
+    abstol: Optional[float] = None
+
+
+# "full" is the netlist as written (.tran 1p 5n, reltol=1e-3 abstol=1e-12).
+# abstol stays tight in "coarse": the DC leakage currents are in the pA range.
+FIDELITIES: Dict[str, Fidelity] = {
+    "coarse": Fidelity(tstep="10p", tmax="20p", reltol=1e-2),
+    "full": Fidelity(),
+}
+
+
+def fidelity_netlist(netlist_path: Path, fidelity: str) -> Path:
+    """Netlist to load for a fidelity level (rendered variant unless the level changes nothing)."""
+    if fidelity not in FIDELITIES:
+        raise ValueError(f"unknown fidelity {fidelity!r} (expected one of {sorted(FIDELITIES)})")
+    fid = FIDELITIES[fidelity]
+    options = {k: v for k, v in (("reltol", fid.reltol), ("abstol", fid.abstol)) if v is not None}
+    if fid.tstep is None and fid.tstop is None and fid.tmax is None and not options:
+        return Path(netlist_path)
+    return render_variant(netlist_path, fidelity, tstep=fid.tstep, tstop=fid.tstop, tmax=fid.tmax, options=options)
+
+
 class InverterSpiceRunner:
     """
     In-process runner, compatible SubprocVecEnv.
     Improvements:
     - dedicated temp dir per process (no shared raw/tmp collisions)
     - avoids leaking CWD/TMPDIR outside ngspice calls
-    - auto-restarts on corruption or after N jobs
+    - auto-restarts on corruption; otherwise recycles libngspice when its health degrades
+      (recycle="health": latency drift, RSS growth, NaN measures, warnings; see HealthMonitor),
+      on a self-tuned interval (recycle="auto") or every restart_every jobs (recycle="count")
     - detects post-fork reuse and re-initialises cleanly
+    - optional SimCache: repeated (wn, wp, vdd, lch) never reach ngspice
+    - fidelity level (FIDELITIES): results carry the "fidelity" that produced them
+    - loads the slim PDK extract of the netlist (main/pdk_slim.py) unless IA_SLIM_PDK=0, and the
+      full library once a point leaves the W/L ranges of the extract
     """
 
     def __init__(
         self,
         netlist_path: Path = INV_CHAR_NETLIST,
         *,
-        restart_every: int = 25,
+        restart_every: Optional[int] = None,
         debug: bool = False,
+        cache: Optional[SimCache] = None,
+        fidelity: str = "full",
+        recycle: str = "health",
+        health_policy: Optional[HealthPolicy] = None,
     ) -> None:
-        self.netlist_path = Path(netlist_path)
-        self.restart_every = int(restart_every)
+        self.fidelity = fidelity
+        self.netlist_path = fidelity_netlist(Path(netlist_path), fidelity)
+        self.restart_every = restart_every
         self.debug = bool(debug)
+        self.cache = cache
+        self.health = HealthMonitor(recycle, self.restart_every, health_policy)
 
         self._tmp: Optional[tempfile.TemporaryDirectory] = None
         self._workdir: Optional[Path] = None
         self._inst: Optional[NGSpiceInstance] = None
+        self._full_lib = False
         self._jobs = 0
         self._pid = os.getpid()
 
@@ -53,42 +105,47 @@ class InverterSpiceRunner:
         prev_cwd = os.getcwd()
         prev_tmpdir = os.environ.get("TMPDIR")
         assert self._workdir is not None
-        os.chdir(self._workdir)
-        os.environ["TMPDIR"] = str(self._workdir)
+        with tracing.span("workdir.enter"):
+            os.chdir(self._workdir)
+            os.environ["TMPDIR"] = str(self._workdir)
         try:
             yield
         finally:
-            os.chdir(prev_cwd)
-            if prev_tmpdir is None:
-                os.environ.pop("TMPDIR", None)
-            else:
-                os.environ["TMPDIR"] = prev_tmpdir
-
-    def _init(self) -> None:
+            with tracing.span("workdir.exit"):
+                os.chdir(prev_cwd)
+                if prev_tmpdir is None:
+                    os.environ.pop("TMPDIR", None)
+                else:
+                    os.environ["TMPDIR"] = prev_tmpdir
+
+    def _init(self, reason: str = "start") -> None:
         self._make_workdir()
         if self.debug:
             print(f"[DEBUG] CWD={os.getcwd()}")
             print(f"[DEBUG] workdir={self._workdir}")
             print(f"[DEBUG] Loading netlist: {self.netlist_path}")
-        with self._in_workdir():
+        t0 = time.perf_counter()
+        with self._in_workdir(), tracing.span("ngspice.load"):
             self._inst = NGSpiceInstance()
-            self._inst.load(self.netlist_path)
+            self._inst.load(self.netlist_path if self._full_lib else slim_netlist(self.netlist_path))
+        self.health.record_restart(time.perf_counter() - t0, reason)
         self._jobs = 0
         self._pid = os.getpid()
 
-    def _restart(self) -> None:
-        try:
-            if self._inst is not None:
-                self._inst.stop()
-        except Exception:
-            pass
-        self._inst = None
-        self._init()
+    def _restart(self, reason: str = "error") -> None:
+        with tracing.span("ngspice.restart", jobs=self._jobs, reason=reason):
+            try:
+                if self._inst is not None:
+                    self._inst.stop()
+            except Exception:
+                pass
+            self._inst = None
+            self._init(reason)
 
     def _ensure_proc_safe(self) -> None:
         if os.getpid() != self._pid:
             # We have been forked: never reuse the old libngspice handle
-            self._restart()
+            self._restart("fork")
 
     def measure(
         self,
@@ -99,43 +156,81 @@ class InverterSpiceRunner:
         lch_um: float = 0.15,
         k_area: float = 1.0,
     ) -> Dict[str, Any]:
+        params = {"wn": float(wn_um), "wp": float(wp_um), "vdd": float(vdd), "lch": float(lch_um)}
+
+        cached = False
+        with tracing.span("spice.measure", cat="runner"):
+            if self.cache is not None:
+                key = self.cache.key(self.netlist_path, params)
+                hit = self.cache.get(key)
+                cached = hit is not None
+                data = hit if hit is not None else self._simulate(params)
+                if not cached:
+                    self.cache.put(key, data)
+            else:
+                data = self._simulate(params)
+
+        out: Dict[str, Any] = {m: float(data[m]) for m in MEASURES}
+        out["area_um"] = float(k_area * (float(wn_um) + float(wp_um)))
+        out["wn_um"] = float(wn_um)
+        out["wp_um"] = float(wp_um)
+        out["fidelity"] = self.fidelity
+        if cached:
+            # no simulation ran: consumers that learn from outcomes (quarantine) skip it
+            out["cached"] = 1.0
+        return out
+
+    def _simulate(self, params: Dict[str, float]) -> Dict[str, float]:
         self._ensure_proc_safe()
 
+        if not self._full_lib and outside_extract(self.netlist_path, params):
+            # no bin of the slim extract may cover this point: full library from now on
+            self._full_lib = True
+            self._restart("full_lib")
+
         if self._inst is None:
-            self._init()
+            self._init("reload")
 
-        if self.restart_every > 0 and self._jobs >= self.restart_every:
-            self._restart()
+        reason = self.health.restart_reason()
+        if reason is not None:
+            self._restart(reason)
 
-        def _run_once() -> Dict[str, Any]:
+        def _run_once() -> Dict[str, float]:
             assert self._inst is not None
-            with self._in_workdir():
-                self._inst.set_parameter("wn", float(wn_um))
-                self._inst.set_parameter("wp", float(wp_um))
-                self._inst.set_parameter("vdd", float(vdd))
-                self._inst.set_parameter("lch", float(lch_um))
-
-                self._inst.run()
-
-                out: Dict[str, Any] = {}
-                for m in MEASURES:
-                    out[m] = float(self._inst.get_measure(m))
-
-            out["area_um"] = float(k_area * (float(wn_um) + float(wp_um)))
-            out["wn_um"] = float(wn_um)
-            out["wp_um"] = float(wp_um)
+            with self._in_workdir(), count_warnings() as caught:
+                t0 = time.perf_counter()
+                with tracing.span("set_parameter"):
+                    for name, value in params.items():
+                        self._inst.set_parameter(name, value)
+
+                with tracing.span("ngspice.run", fidelity=self.fidelity):
+                    self._inst.run()
+
+                with tracing.span("get_measure"):
+                    out = {m: float(self._inst.get_measure(m)) for m in MEASURES}
+                latency = time.perf_counter() - t0
+            self.health.record_run(
+                latency,
+                nan=any(math.isnan(v) for v in out.values()),
+                warnings=len(caught),
+                rss_mb=current_rss_mb() if self.health.wants_rss() else float("nan"),
+            )
             return out
 
         try:
             res = _run_once()
         except Exception:
             # hard reset + retry once
-            self._restart()
+            self._restart("error")
             res = _run_once()
 
         self._jobs += 1
         return res
 
+    def health_stats(self) -> Dict[str, Any]:
+        """Rolling health record and restart statistics of the libngspice instance (HealthMonitor.stats())."""
+        return self.health.stats()
+
     def close(self) -> None:
         try:
             if self._inst is not None:
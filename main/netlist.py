@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional, Tuple
+
+# .lib "/abs/path/tt.lib.spice" tt   (quotes optional)
+_LIB_RE = re.compile(r"""^\s*\.lib\s+(?:"([^"]+)"|'([^']+)'|(\S+))\s+(\S+)""", re.IGNORECASE)
+
+# .meas tran tphl ...  /  .measure ac fcut ...
+_MEAS_RE = re.compile(r"^\s*\.meas(?:ure)?\s+\w+\s+(\w+)", re.IGNORECASE)
+
+# .tran tstep tstop [tstart [tmax]]
+_TRAN_RE = re.compile(r"^\s*\.tran\s+(\S+)\s+(\S+)", re.IGNORECASE)
+
+# .option reltol = 1e-3 abstol = 1e-12   (one or several name=value pairs)
+_OPTION_RE = re.compile(r"^\s*\.options?\s", re.IGNORECASE)
+_OPTION_PAIR_RE = re.compile(r"(\w+)\s*=\s*(\S+)")
+
+# PULSE(V1 V2 TD TR TF PW PER)
+_PULSE_RE = re.compile(r"PULSE\s*\(([^)]*)\)", re.IGNORECASE)
+_PULSE_TIMING = ("td", "tr", "tf", "pw", "per")
+
+# FROM=30n / TO=40n time windows of .meas statements
+_WINDOW_RE = re.compile(r"\b(FROM|TO)\s*=\s*([0-9.eE+-]+[a-zA-Z]*)", re.IGNORECASE)
+
+_SUFFIXES = {"f": 1e-15, "p": 1e-12, "n": 1e-9, "u": 1e-6, "m": 1e-3, "k": 1e3, "meg": 1e6, "g": 1e9, "t": 1e12}
+
+# (resolved path, mtime_ns, size) -> sha256, so repeated lookups do not re-hash the PDK
+_DIGESTS: Dict[Tuple[str, int, int], str] = {}
+
+
+def file_digest(path: str | Path) -> str:
+    """sha256 of a file, memoised on (path, mtime, size). Missing files hash their path."""
+    p = Path(path).expanduser()
+    try:
+        st = p.stat()
+    except OSError:
+        return "missing:" + hashlib.sha256(str(p).encode()).hexdigest()
+
+    key = (str(p.resolve()), st.st_mtime_ns, st.st_size)
+    digest = _DIGESTS.get(key)
+    if digest is None:
+        h = hashlib.sha256()
+        with open(p, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        digest = h.hexdigest()
+        _DIGESTS[key] = digest
+    return digest
+
+
+def lib_references(netlist_path: str | Path) -> List[Tuple[Path, str]]:
+    """Return the (library path, corner) pairs pulled in by `.lib` lines of a netlist."""
+    netlist_path = Path(netlist_path)
+    refs: List[Tuple[Path, str]] = []
+    for line in netlist_path.read_text(errors="replace").splitlines():
+        m = _LIB_RE.match(line)
+        if m is None:
+            continue
+        raw = m.group(1) or m.group(2) or m.group(3)
+        lib = Path(raw).expanduser()
+        if not lib.is_absolute():
+            lib = netlist_path.parent / lib
+        refs.append((lib, m.group(4)))
+    return refs
+
+
+def measure_names(netlist_path: str | Path) -> List[str]:
+    """Names of every `.meas` statement of a netlist, in file order (lowercase, like ngspice)."""
+    names: List[str] = []
+    for line in Path(netlist_path).read_text(errors="replace").splitlines():
+        m = _MEAS_RE.match(line)
+        if m is not None and m.group(1).lower() not in names:
+            names.append(m.group(1).lower())
+    return names
+
+
+def netlist_fingerprint(netlist_path: str | Path) -> Dict[str, str]:
+    """
+    Content identity of a netlist: its own hash, the hash of every referenced
+    PDK library and the selected corners.
+    """
+    refs = lib_references(netlist_path)
+    lib_h = hashlib.sha256()
+    for lib, _ in refs:
+        lib_h.update(file_digest(lib).encode())
+    return {
+        "netlist": file_digest(netlist_path),
+        "lib": lib_h.hexdigest(),
+        "corner": ",".join(corner.lower() for _, corner in refs),
+    }
+
+
+def spice_value(text: str) -> float:
+    """Parse a SPICE number with an optional scale suffix ("40n", "1.5meg", "2e-9s")."""
+    m = re.match(r"^\s*([+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)([a-zA-Z]*)", text)
+    if m is None:
+        raise ValueError(f"not a SPICE number: {text!r}")
+    suffix = m.group(2).lower()
+    scale = 1.0
+    if suffix.startswith("meg"):
+        scale = _SUFFIXES["meg"]
+    elif suffix[:1] in _SUFFIXES:
+        scale = _SUFFIXES[suffix[:1]]
+    return float(m.group(1)) * scale
+
+
+def _retime_pulse(args: str, timing: Mapping[str, str]) -> str:
+    fields = args.split()
+    for i, name in enumerate(_PULSE_TIMING, start=2):
+        if name in timing and i < len(fields):
+            fields[i] = timing[name]
+    return "PULSE(" + " ".join(fields) + ")"
+
+
+def render_variant(
+    netlist_path: str | Path,
+    name: str,
+    *,
+    tstep: Optional[str] = None,
+    tstop: Optional[str] = None,
+    tmax: Optional[str] = None,
+    options: Optional[Mapping[str, float]] = None,
+    pulse: Optional[Mapping[str, str]] = None,
+    out_dir: str | Path | None = None,
+) -> Path:
+    """
+    Write a copy of a netlist with a different transient setup and return its path.
+    - `.tran` gets the new tstep/tstop (and tmax, the max internal step, if given)
+    - `.option` values listed in `options` are overwritten
+    - PULSE sources get the timings listed in `pulse` (td, tr, tf, pw, per)
+    - `.meas FROM=/TO=` windows are scaled with tstop, so they stay at the same
+      fraction of the simulated window
+    The file name carries a digest of its content: identical variants are written once
+    and SimCache keys of different variants never collide.
+    """
+    netlist_path = Path(netlist_path)
+    options = {k.lower(): v for k, v in (options or {}).items()}
+    lines = netlist_path.read_text(errors="replace").splitlines()
+
+    scale = 1.0
+    out: List[str] = []
+    for line in lines:
+        m = _TRAN_RE.match(line)
+        if m is not None:
+            old_step, old_stop = m.group(1), m.group(2)
+            new_stop = tstop or old_stop
+            scale = spice_value(new_stop) / spice_value(old_stop)
+            line = f".tran {tstep or old_step} {new_stop}" + (f" 0 {tmax}" if tmax else "")
+        elif _OPTION_RE.match(line) and options:
+            line = _OPTION_PAIR_RE.sub(
+                lambda o: f"{o.group(1)} = {options[o.group(1).lower()]:g}"
+                if o.group(1).lower() in options
+                else o.group(0),
+                line,
+            )
+        if pulse and not line.lstrip().startswith("*"):
+            line = _PULSE_RE.sub(lambda p: _retime_pulse(p.group(1), pulse), line)
+        out.append(line)
+
+    if scale != 1.0:
+        out = [
+            _WINDOW_RE.sub(lambda w: f"{w.group(1)}={spice_value(w.group(2)) * scale:.6g}", line)
+            if _MEAS_RE.match(line)
+            else line
+            for line in out
+        ]
+
+    text = "\n".join(out) + "\n"
+    digest = hashlib.sha256(text.encode()).hexdigest()[:12]
+    out_dir = Path(out_dir) if out_dir is not None else Path(tempfile.gettempdir()) / "ia_netlist_variants"
+    out_dir.mkdir(parents=True, exist_ok=True)
+    path = out_dir / f"{netlist_path.stem}.{name}.{digest}{netlist_path.suffix}"
+    if not path.exists():
+        # atomic: concurrent SubprocVecEnv children may render the same variant
+        fd, tmp = tempfile.mkstemp(dir=out_dir, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            f.write(text)
+        os.replace(tmp, path)
+    return path
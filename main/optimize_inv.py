@@ -4,27 +4,26 @@ from __future__ import annotations
 import __main__
 import multiprocessing as mp
 import os
+import sys
 import time
-from dataclasses import dataclass
 from typing import Any, Callable, Dict, List, Optional
 
 from stable_baselines3 import PPO
 from stable_baselines3.common.callbacks import BaseCallback
 from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv, VecEnv
 
+from . import tracing
+from .bo import run_bo
+from .checkpoint import DEFAULT_CHECKPOINT_PATH, RunCheckpointCallback, check_resume_config, load_checkpoint, load_model
+from .cmaes import run_cmaes
+from .design_eval import DesignEvaluator, SearchTracker, TrainingSnapshot
+from .policy import DEFAULT_POLICY_PATH
 from .rl_env import InverterEnv
-
-
-@dataclass
-class TrainingSnapshot:
-    step: int
-    reward: float
-    wn_um: float
-    wp_um: float
-    tpavg_s: float
-    pstatic_w: float
-    area_um: float
-    elapsed_s: float
+from .pareto import DEFAULT_ARCHIVE_PATH, ParetoArchive
+from .quarantine import DEFAULT_QUARANTINE_PATH
+from .sim_cache import DEFAULT_CACHE_PATH
+from .vec_env import InverterVecEnv
+from .worker_health import merge_stats
 
 
 def _make_env_factory(
@@ -32,6 +31,14 @@ def _make_env_factory(
     w_power: float,
     w_area: float,
     max_steps: int,
+    cache_path: str | None = None,
+    surrogate: bool = False,
+    surrogate_threshold: float = 0.05,
+    multi_fidelity: bool = False,
+    adaptive_window: bool = False,
+    archive_path: str | None = None,
+    weight_conditioned: bool = False,
+    quarantine_path: str | None = None,
 ) -> Callable[[], InverterEnv]:
     def _init() -> InverterEnv:
         return InverterEnv(
@@ -39,6 +46,14 @@ def _make_env_factory(
             w_power=w_power,
             w_area=w_area,
             max_steps=max_steps,
+            cache_path=cache_path,
+            surrogate=surrogate,
+            surrogate_threshold=surrogate_threshold,
+            multi_fidelity=multi_fidelity,
+            adaptive_window=adaptive_window,
+            archive_path=archive_path,
+            weight_conditioned=weight_conditioned,
+            quarantine_path=quarantine_path,
         )
 
     return _init
@@ -82,6 +97,60 @@ def _pick_start_method(start_method: str) -> str:
     return "spawn"
 
 
+def _collect_surrogate_stats(vec_env: VecEnv) -> Dict[str, float] | None:
+    """Sum surrogate counters over envs (validation error is averaged)."""
+    try:
+        per_env = [s for s in vec_env.env_method("get_surrogate_stats") if s is not None]
+    except Exception:
+        return None
+    if not per_env:
+        return None
+
+    out = {k: float(sum(s[k] for s in per_env)) for k in ("surrogate_hits", "spice_calls", "validations", "n_train")}
+    total = out["surrogate_hits"] + out["spice_calls"]
+    out["hit_rate"] = out["surrogate_hits"] / total if total else 0.0
+    errs = [s["validation_error_mean"] for s in per_env if s["validations"] > 0]
+    out["validation_error_mean"] = float(sum(errs) / len(errs)) if errs else float("nan")
+    return out
+
+
+def _collect_fidelity_stats(vec_env: VecEnv) -> Dict[str, float] | None:
+    """Sum multi-fidelity counters over envs."""
+    try:
+        per_env = [s for s in vec_env.env_method("get_fidelity_stats") if s is not None]
+    except Exception:
+        return None
+    if not per_env:
+        return None
+
+    out = {k: float(sum(s[k] for s in per_env)) for k in ("coarse_calls", "full_calls")}
+    out["promotion_rate"] = out["full_calls"] / out["coarse_calls"] if out["coarse_calls"] else 0.0
+    return out
+
+
+def _collect_health_stats(vec_env: VecEnv) -> Dict[str, Any] | None:
+    """Simulator recycling totals over envs (restarts by reason, time per simulation)."""
+    try:
+        return merge_stats(vec_env.env_method("get_health_stats"))
+    except Exception:
+        return None
+
+
+def _collect_quarantine_stats(vec_env: VecEnv) -> Dict[str, float] | None:
+    """Sum quarantine counters over envs (each process counts its own checks and records)."""
+    try:
+        per_env = [s for s in vec_env.env_method("get_quarantine_stats") if s is not None]
+    except Exception:
+        return None
+    if not per_env:
+        return None
+
+    out = {k: float(sum(s[k] for s in per_env)) for k in ("blocked", "probes", "failures", "successes")}
+    # the failure region itself is shared through the store: the largest local view
+    out["failure_cells"] = max(s["failure_cells"] for s in per_env)
+    return out
+
+
 class BestTrainCallback(BaseCallback):
     """
     Tracks best point seen during TRAINING only (no extra eval env).
@@ -102,21 +171,22 @@ class BestTrainCallback(BaseCallback):
     ) -> None:
         super().__init__()
         self.snapshot_interval = int(snapshot_interval)
+        self.tracker = SearchTracker(
+            min_delta=min_delta,
+            patience_snapshots=patience_snapshots,
+            warmup_snapshots=warmup_snapshots,
+            target_reward=target_reward,
+            max_walltime_s=max_walltime_s,
+            on_snapshot=on_snapshot,
+        )
 
-        self.min_delta = float(min_delta)
-        self.patience_snapshots = int(patience_snapshots)
-        self.warmup_snapshots = int(warmup_snapshots)
-        self.target_reward = None if target_reward is None else float(target_reward)
-        self.max_walltime_s = None if max_walltime_s is None else float(max_walltime_s)
-        self._on_snapshot = on_snapshot
-
-        self.history: List[TrainingSnapshot] = []
-        self.best: Dict[str, Any] | None = None
+    @property
+    def history(self) -> List[TrainingSnapshot]:
+        return self.tracker.history
 
-        self._t0_wall = 0.0
-        self._snap_idx = 0
-        self._last_best = -1e30
-        self._last_improve_snap_idx = 0
+    @property
+    def best(self) -> Dict[str, Any] | None:
+        return self.tracker.best
 
     @staticmethod
     def _pick_best_from_envs(vec_env: VecEnv) -> Optional[Dict[str, Any]]:
@@ -134,56 +204,15 @@ class BestTrainCallback(BaseCallback):
         return best_global
 
     def _snapshot(self) -> None:
-        b = self._pick_best_from_envs(self.training_env)
-        if b is None:
-            return
-
-        ppa = b.get("ppa", {})
-        snap = TrainingSnapshot(
-            step=int(self.num_timesteps),
-            reward=float(b["reward"]),
-            wn_um=float(b["wn_um"]),
-            wp_um=float(b["wp_um"]),
-            tpavg_s=float(ppa.get("tpavg", float("nan"))),
-            pstatic_w=float(ppa.get("pstatic", float("nan"))),
-            area_um=float(ppa.get("area_um", float("nan"))),
-            elapsed_s=float(time.time() - self._t0_wall),
-        )
-        self.history.append(snap)
-        self._snap_idx += 1
-
-        if self.best is None or float(b["reward"]) > float(self.best["reward"]):
-            self.best = b
-
-        if self._on_snapshot is not None:
-            try:
-                self._on_snapshot(snap, b)
-            except Exception:
-                # UI callbacks should not break training
-                pass
-
-        # stop if target reached
-        if self.target_reward is not None and snap.reward >= self.target_reward:
+        if self.tracker.record(self.num_timesteps, self._pick_best_from_envs(self.training_env)):
             self.model.stop_training = True
-            return
-
-        # plateau stop
-        improved = (snap.reward - self._last_best) >= self.min_delta
-        if improved:
-            self._last_best = snap.reward
-            self._last_improve_snap_idx = self._snap_idx
-
-        if self._snap_idx >= self.warmup_snapshots:
-            no_improve = self._snap_idx - self._last_improve_snap_idx
-            if no_improve >= self.patience_snapshots:
-                self.model.stop_training = True
 
     def _on_training_start(self) -> None:
-        self._t0_wall = time.time()
+        self.tracker.start()
 
     def _on_step(self) -> bool:
         # walltime stop
-        if self.max_walltime_s is not None and (time.time() - self._t0_wall) >= self.max_walltime_s:
+        if self.tracker.expired():
             self.model.stop_training = True
             return False
 
@@ -195,6 +224,134 @@ class BestTrainCallback(BaseCallback):
         self._snapshot()
 
 
+class TraceCallback(BaseCallback):
+    """PPO phases as trace spans: rollout collection, then the gradient update that follows it."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._rollout_t0: Optional[int] = None
+        self._update_t0: Optional[int] = None
+
+    def _close_update(self) -> None:
+        if self._update_t0 is not None:
+            tracing.record("ppo.update", self._update_t0, time.perf_counter_ns(), "ppo")
+            self._update_t0 = None
+
+    def _on_rollout_start(self) -> None:
+        self._close_update()
+        self._rollout_t0 = time.perf_counter_ns()
+
+    def _on_rollout_end(self) -> None:
+        now = time.perf_counter_ns()
+        if self._rollout_t0 is not None:
+            tracing.record("ppo.rollout", self._rollout_t0, now, "ppo", timesteps=self.num_timesteps)
+        self._update_t0 = now
+
+    def _on_step(self) -> bool:
+        return True
+
+    def _on_training_end(self) -> None:
+        self._close_update()
+
+
+def _finish_trace(trace_dir: str | None) -> Dict[str, Any] | None:
+    """Stop tracing; Chrome trace, per-span summary and TensorBoard scalars of the run."""
+    if trace_dir is None:
+        return None
+    tracing.disable()
+    spans = tracing.summarize(trace_dir)
+    tb = tracing.write_tensorboard(spans)
+    return {
+        "chrome_trace": str(tracing.export_chrome_trace(trace_dir)),
+        "tensorboard": None if tb is None else str(tb),
+        "spans": spans,
+    }
+
+
+def _archive_front(archive_path: str | None) -> List[Dict[str, float]] | None:
+    """Trade-off front of the archive after a run (every run sharing the store contributes)."""
+    if archive_path is None:
+        return None
+    archive = ParetoArchive(archive_path)
+    try:
+        return archive.front()
+    finally:
+        archive.close()
+
+
+def _optimize_blackbox(
+    method: str,
+    w_delay: float,
+    w_power: float,
+    w_area: float,
+    *,
+    total_timesteps: int,
+    n_sim_workers: int,
+    seed: int | None,
+    start_method: str,
+    cache_path: str | None,
+    archive_path: str | None,
+    tracker: SearchTracker,
+    quarantine_path: str | None = None,
+) -> Dict[str, Any]:
+    """
+    Black-box optimizers: batches of designs evaluated in parallel on a PyngsWorkerPool.
+    total_timesteps is the simulation budget; one snapshot per batch (BO round / CMA-ES generation).
+    """
+    if method not in ("bo", "cmaes"):
+        raise ValueError(f"unknown method {method!r} (expected 'ppo', 'bo' or 'cmaes')")
+
+    evaluator = DesignEvaluator(
+        w_delay,
+        w_power,
+        w_area,
+        n_workers=n_sim_workers,
+        cache_path=cache_path,
+        start_method=start_method,
+        archive_path=archive_path,
+        quarantine_path=quarantine_path,
+        source=method,
+    )
+    t0 = time.perf_counter()
+    try:
+        if method == "bo":
+            batch = run_bo(evaluator, tracker, max_evals=total_timesteps, seed=seed).q
+        else:
+            batch = run_cmaes(evaluator, tracker, max_evals=total_timesteps, seed=seed).lam
+        health_stats = evaluator.pool.stats()["health"]
+        quarantine_stats = None if evaluator.quarantine is None else evaluator.quarantine.stats()
+    finally:
+        evaluator.close()
+    t1 = time.perf_counter()
+
+    best = tracker.best or {"reward": float("nan"), "wn_um": float("nan"), "wp_um": float("nan"), "ppa": {}}
+
+    return {
+        "best": best,
+        "history": tracker.history,
+        "training_time_s": t1 - t0,
+        "n_envs_requested": n_sim_workers,
+        "n_envs_used": n_sim_workers,
+        "total_timesteps": total_timesteps,
+        "n_steps": batch,
+        "batch_size": batch,
+        "start_method": start_method,
+        "weights": {"delay": w_delay, "power": w_power, "area": w_area},
+        "surrogate": None,
+        "vec_env": None,
+        "fidelity": None,
+        "health": health_stats,
+        "quarantine": quarantine_stats,
+        "method": method,
+        "n_simulations": evaluator.n_sims,
+        "pareto_front": _archive_front(archive_path),
+        "weight_conditioned": False,
+        "policy_path": None,
+        "checkpoint_path": None,
+        "resumed_from_timestep": None,
+    }
+
+
 def optimize_inverter(
     w_delay: float,
     w_power: float,
@@ -213,49 +370,163 @@ def optimize_inverter(
     target_reward: float | None = None,
     max_walltime_s: float | None = None,
     on_snapshot: Callable[[TrainingSnapshot, Dict[str, Any]], None] | None = None,
+    # persistent simulation cache (None = disabled)
+    cache_path: str | None = None,
+    # GP surrogate: skip SPICE when the model is confident
+    surrogate: bool = False,
+    surrogate_threshold: float = 0.05,
+    # "subproc": one InverterEnv per process, "batched": InverterVecEnv on a shared simulator pool
+    vec_env: str = "subproc",
+    n_sim_workers: int | None = None,
+    # coarse transient screening, full fidelity only near the Pareto front
+    multi_fidelity: bool = False,
+    # transient window sized from the estimated delay of each point
+    adaptive_window: bool = False,
+    # "ppo" (RL), "bo" (batch Bayesian optimisation) or "cmaes" (one generation per pool batch)
+    method: str = "ppo",
+    # Pareto archive of every simulated point (None = disabled)
+    archive_path: str | None = None,
+    # one PPO policy for every weight vector (weights sampled per episode, part of the observation)
+    weight_conditioned: bool = False,
+    # where to save the trained policy (default results/ppo_weight_conditioned.zip when weight_conditioned)
+    policy_path: str | None = None,
+    # periodic checkpoints (None = disabled) every checkpoint_interval timesteps; resume_from continues a run
+    checkpoint_path: str | None = None,
+    checkpoint_interval: int = 1000,
+    resume_from: str | None = None,
+    # span tracing of the simulation hot path and PPO phases (None = disabled)
+    trace_dir: str | None = None,
+    # store of failing points: known failure regions get sim_fail_penalty without a simulation (None = disabled)
+    quarantine_path: str | None = None,
 ) -> Dict[str, Any]:
     _limit_threading()
+    if trace_dir is not None:
+        # before any worker/env process starts: children inherit it through the environment
+        tracing.enable(trace_dir)
     resolved_start = _pick_start_method(start_method)
     requested_envs = int(max(1, n_envs))
+    if weight_conditioned and policy_path is None:
+        policy_path = str(DEFAULT_POLICY_PATH)
 
-    factory = _make_env_factory(w_delay, w_power, w_area, max_steps)
+    if method != "ppo":
+        if weight_conditioned or checkpoint_path is not None or resume_from is not None:
+            print(
+                "[WARN] weight_conditioned/checkpoint_path/resume_from only apply to method='ppo'; ignoring them",
+                flush=True,
+            )
+        summary = _optimize_blackbox(
+            method,
+            w_delay,
+            w_power,
+            w_area,
+            total_timesteps=total_timesteps,
+            n_sim_workers=n_sim_workers or requested_envs,
+            seed=seed,
+            start_method=resolved_start,
+            cache_path=cache_path,
+            archive_path=archive_path,
+            quarantine_path=quarantine_path,
+            tracker=SearchTracker(
+                min_delta=min_delta,
+                patience_snapshots=patience_snapshots,
+                warmup_snapshots=warmup_snapshots,
+                target_reward=target_reward,
+                max_walltime_s=max_walltime_s,
+                on_snapshot=on_snapshot,
+            ),
+        )
+        summary["trace"] = _finish_trace(trace_dir)
+        return summary
+
+    # what a checkpoint must match to be resumed by this run
+    run_config = {"weights": (w_delay, w_power, w_area), "vec_env": vec_env, "weight_conditioned": weight_conditioned}
+    resume = load_checkpoint(resume_from) if resume_from is not None else None
+    if resume is not None:
+        check_resume_config(resume, run_config, resume_from)
+
+    factory = _make_env_factory(
+        w_delay,
+        w_power,
+        w_area,
+        max_steps,
+        cache_path,
+        surrogate,
+        surrogate_threshold,
+        multi_fidelity,
+        adaptive_window,
+        archive_path,
+        weight_conditioned,
+        quarantine_path,
+    )
     env: VecEnv
     effective_envs = requested_envs
 
-    if requested_envs > 1 and resolved_start != "spawn":
-        print(
-            f"[WARN] start_method={resolved_start} is not spawn; forcing n_envs=1 to avoid libngspice fork issues",
-            flush=True,
+    if vec_env == "batched":
+        if surrogate or multi_fidelity or adaptive_window:
+            print(
+                "[WARN] surrogate/multi_fidelity/adaptive_window are not supported by the batched env; ignoring them",
+                flush=True,
+            )
+            surrogate = multi_fidelity = adaptive_window = False
+        # the simulators live in pool workers, the main process never loads libngspice
+        env = InverterVecEnv(
+            requested_envs,
+            w_delay,
+            w_power,
+            w_area,
+            max_steps,
+            n_workers=n_sim_workers,
+            cache_path=cache_path,
+            start_method=resolved_start,
+            archive_path=archive_path,
+            quarantine_path=quarantine_path,
+            weight_conditioned=weight_conditioned,
         )
-        effective_envs = 1
-
-    if effective_envs > 1:
-        try:
-            env = SubprocVecEnv([factory for _ in range(effective_envs)], start_method=resolved_start)
-        except Exception as exc:
+    else:
+        if resolved_start == "zygote":
+            # the SubprocVecEnv envs simulate in-process (InverterSpiceRunner): no PyngsWorker to fork
+            resolved_start = "spawn"
+        if requested_envs > 1 and resolved_start != "spawn":
             print(
-                f"[WARN] Failed to start SubprocVecEnv ({exc}); falling back to DummyVecEnv (n_envs=1)",
+                f"[WARN] start_method={resolved_start} is not spawn; forcing n_envs=1 to avoid libngspice fork issues",
                 flush=True,
             )
-            env = DummyVecEnv([factory])
             effective_envs = 1
+
+        if effective_envs > 1:
+            try:
+                env = SubprocVecEnv([factory for _ in range(effective_envs)], start_method=resolved_start)
+            except Exception as exc:
+                print(
+                    f"[WARN] Failed to start SubprocVecEnv ({exc}); falling back to DummyVecEnv (n_envs=1)",
+                    flush=True,
+                )
+                env = DummyVecEnv([factory])
+                effective_envs = 1
+        else:
+            env = DummyVecEnv([factory])
+
+    if resume is not None:
+        # same hyperparameters, optimizer state and timestep counter as the interrupted run
+        model = load_model(resume, PPO, env)
+        n_steps, batch_size = int(model.n_steps), int(model.batch_size)
+        if checkpoint_path is None:
+            checkpoint_path = resume_from
     else:
-        env = DummyVecEnv([factory])
-
-    n_steps = _choose_n_steps(effective_envs)
-    rollout_size = n_steps * max(1, effective_envs)
-    batch_size = _choose_batch_size(rollout_size)
-
-    model = PPO(
-        "MlpPolicy",
-        env,
-        verbose=1,
-        device="cpu",
-        n_steps=n_steps,
-        batch_size=batch_size,
-        learning_rate=3e-4,
-        seed=seed,
-    )
+        n_steps = _choose_n_steps(effective_envs)
+        rollout_size = n_steps * max(1, effective_envs)
+        batch_size = _choose_batch_size(rollout_size)
+
+        model = PPO(
+            "MlpPolicy",
+            env,
+            verbose=1,
+            device="cpu",
+            n_steps=n_steps,
+            batch_size=batch_size,
+            learning_rate=3e-4,
+            seed=seed,
+        )
 
     callback = BestTrainCallback(
         snapshot_interval=snapshot_interval,
@@ -267,10 +538,51 @@ def optimize_inverter(
         on_snapshot=on_snapshot,
     )
 
+    checkpointer: RunCheckpointCallback | None = None
+    if checkpoint_path is not None:
+        # after `callback`: restoring the tracker must follow BestTrainCallback's clock start
+        checkpointer = RunCheckpointCallback(
+            checkpoint_path,
+            callback.tracker,
+            interval=checkpoint_interval,
+            resume=resume,
+            config=run_config,
+        )
+
+    surrogate_stats: Dict[str, float] | None = None
+    fidelity_stats: Dict[str, float] | None = None
+    health_stats: Dict[str, Any] | None = None
+    quarantine_stats: Dict[str, float] | None = None
+    # total_timesteps is the budget of the whole run, the resumed part included
+    remaining = total_timesteps - (int(model.num_timesteps) if resume is not None else 0)
     t0 = time.perf_counter()
     try:
-        model.learn(total_timesteps=total_timesteps, callback=callback, progress_bar=True)
+        callbacks: List[BaseCallback] = [callback]
+        if checkpointer is not None:
+            callbacks.append(checkpointer)
+        if trace_dir is not None:
+            callbacks.append(TraceCallback())
+        if remaining > 0:
+            model.learn(
+                total_timesteps=remaining,
+                callback=callbacks if len(callbacks) > 1 else callback,
+                progress_bar=True,
+                reset_num_timesteps=resume is None,
+            )
+        elif resume is not None:
+            callback.tracker.load_state_dict(resume["tracker"])
+        if surrogate:
+            surrogate_stats = _collect_surrogate_stats(env)
+        if multi_fidelity:
+            fidelity_stats = _collect_fidelity_stats(env)
+        health_stats = _collect_health_stats(env)
+        quarantine_stats = _collect_quarantine_stats(env)
+        if policy_path is not None:
+            os.makedirs(os.path.dirname(os.path.abspath(policy_path)), exist_ok=True)
+            model.save(policy_path)
     finally:
+        if checkpointer is not None:
+            checkpointer.close()
         env.close()
     t1 = time.perf_counter()
 
@@ -287,6 +599,19 @@ def optimize_inverter(
         "batch_size": batch_size,
         "start_method": resolved_start,
         "weights": {"delay": w_delay, "power": w_power, "area": w_area},
+        "surrogate": surrogate_stats,
+        "vec_env": vec_env,
+        "fidelity": fidelity_stats,
+        "health": health_stats,
+        "quarantine": quarantine_stats,
+        "method": method,
+        "n_simulations": None,
+        "pareto_front": _archive_front(archive_path),
+        "weight_conditioned": weight_conditioned,
+        "policy_path": policy_path,
+        "checkpoint_path": checkpoint_path,
+        "resumed_from_timestep": int(resume["num_timesteps"]) if resume is not None else None,
+        "trace": _finish_trace(trace_dir),
     }
 
 
@@ -306,6 +631,12 @@ def main() -> None:
         # stop after 30 minutes max
         max_walltime_s=30 * 60,
         start_method="spawn",
+        cache_path=str(DEFAULT_CACHE_PATH),
+        archive_path=str(DEFAULT_ARCHIVE_PATH),
+        quarantine_path=str(DEFAULT_QUARANTINE_PATH),
+        checkpoint_path=str(DEFAULT_CHECKPOINT_PATH),
+        # `python -m main.optimize_inv --resume` continues the last interrupted run
+        resume_from=str(DEFAULT_CHECKPOINT_PATH) if "--resume" in sys.argv[1:] else None,
     )
 
     best = summary["best"]
@@ -328,6 +659,14 @@ def main() -> None:
     print(f"batch_size      = {summary['batch_size']}")
     print(f"total_timesteps = {summary['total_timesteps']}")
 
+    front = summary.get("pareto_front") or []
+    print(f"\n=== Pareto front ({len(front)} points, results/pareto.sqlite) ===")
+    for pt in front:
+        print(
+            f"Wn = {pt['wn_um']:.3f} µm  Wp = {pt['wp_um']:.3f} µm  "
+            f"tpavg = {pt['tpavg'] * 1e12:.3f} ps  pstatic = {pt['pstatic'] * 1e12:.6f} pW  area = {pt['area_um']:.3f} µm"
+        )
+
 
 if __name__ == "__main__":
     # IMPORTANT: force spawn (libngspice is NOT fork-safe)
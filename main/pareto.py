@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import bisect
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from .inverter_spice import INV_CHAR_NETLIST
+from .sim_cache import PROJECT_ROOT, design_scope
+from .sqlite_store import SQLiteStore
+
+DEFAULT_ARCHIVE_PATH = PROJECT_ROOT / "results" / "pareto.sqlite"
+
+# minimised objectives of the front
+OBJECTIVES = ("tpavg", "pstatic", "area_um")
+
+# (tpavg, pstatic, area_um, wn, wp)
+_Entry = Tuple[float, float, float, float, float]
+
+
+class ParetoArchive(SQLiteStore):
+    """
+    Every simulated design point, plus the non-dominated front over (tpavg, pstatic, area).
+    - points are appended to SQLite (SQLiteStore: WAL, one connection per process), so
+      SubprocVecEnv children, pools and later runs share one store
+    - the front is kept in memory sorted by tpavg: an insertion bisects to the only
+      slices that can dominate it (tpavg <= new) or be dominated by it (tpavg >= new)
+    - only full-fidelity SPICE results enter the front; other points are stored with their tag
+    - one row per (wn, wp, fidelity): a repeated measurement is ignored, callers skip cache hits
+    - refresh() folds in the points other processes wrote since the last call
+    - one scope per netlist/PDK/corner, bias point and backend (design_scope): stand-in
+      backend results and points of older decks are stored apart and never reach the front
+    """
+
+    def __init__(
+        self,
+        path: str | Path | None = DEFAULT_ARCHIVE_PATH,
+        *,
+        netlist_path: str | Path = INV_CHAR_NETLIST,
+        vdd: float = 1.8,
+        lch_um: float = 0.15,
+    ) -> None:
+        super().__init__(path)
+        self.scope = design_scope(netlist_path, vdd=vdd, lch_um=lch_um)
+
+        self._front: List[_Entry] = []
+        self._keys: List[float] = []
+        self._last_id = 0
+        self._n_points = 0
+        # points of an archive without store (path=None), same columns as points()
+        self._mem: List[Tuple[float, float, float, float, float]] = []
+        self._mem_keys: Set[Tuple[float, float, str]] = set()
+
+    def _fresh_state(self) -> Dict[str, Any]:
+        return {"_front": [], "_keys": [], "_last_id": 0, "_n_points": 0}
+
+    def _schema(self, conn: sqlite3.Connection) -> None:
+        # "designs" replaces the unscoped "points" table of earlier stores (left unread)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS designs ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, scope TEXT NOT NULL, wn REAL NOT NULL, wp REAL NOT NULL, "
+            "tpavg REAL NOT NULL, pstatic REAL NOT NULL, area_um REAL NOT NULL, "
+            "fidelity TEXT NOT NULL, source TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS designs_scope ON designs (scope, id)")
+        # one row per design and fidelity: re-measuring a point (cache bypass, reference
+        # re-evaluated by each run) must not count it twice in points() and the support
+        conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS designs_key ON designs (scope, wn, wp, fidelity)")
+
+    # ------------------------------------------------------------------ front
+
+    def _insert(self, e: _Entry) -> bool:
+        """Insert into the in-memory front; False if an existing point dominates (or equals) it."""
+        t, p, a = e[0], e[1], e[2]
+        hi = bisect.bisect_right(self._keys, t)
+        for q in self._front[:hi]:
+            if q[1] <= p and q[2] <= a:
+                return False
+
+        lo = bisect.bisect_left(self._keys, t)
+        keep = [q for q in self._front[lo:] if not (q[1] >= p and q[2] >= a)]
+        self._front[lo:] = keep
+        self._keys[lo:] = [q[0] for q in keep]
+
+        i = bisect.bisect_right(self._keys, t)
+        self._front.insert(i, e)
+        self._keys.insert(i, t)
+        return True
+
+    def _on_front(self, e: _Entry) -> bool:
+        i = bisect.bisect_left(self._keys, e[0])
+        j = bisect.bisect_right(self._keys, e[0])
+        return e in self._front[i:j]
+
+    def _sync(self, conn: sqlite3.Connection) -> int:
+        rows = conn.execute(
+            "SELECT id, tpavg, pstatic, area_um, wn, wp, fidelity FROM designs WHERE scope = ? AND id > ? ORDER BY id",
+            (self.scope, self._last_id),
+        ).fetchall()
+        for rid, t, p, a, wn, wp, fid in rows:
+            if fid == "full":
+                self._insert((t, p, a, wn, wp))
+            self._last_id = rid
+        self._n_points += len(rows)
+        return len(rows)
+
+    # ------------------------------------------------------------------ API
+
+    def add(self, wn_um: float, wp_um: float, ppa: Mapping[str, Any], *, source: str = "") -> bool:
+        """Record one measurement; returns True if it is on the (local view of the) front."""
+        e = (float(ppa["tpavg"]), float(ppa["pstatic"]), float(ppa["area_um"]), float(wn_um), float(wp_um))
+        if not all(np.isfinite(e)):
+            return False
+        fidelity = str(ppa.get("fidelity", "full"))
+        with self._lock:
+            conn = self._db()
+            if conn is not None:
+                try:
+                    conn.execute(
+                        "INSERT OR IGNORE INTO designs (scope, wn, wp, tpavg, pstatic, area_um, fidelity, source, created) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (self.scope, e[3], e[4], e[0], e[1], e[2], fidelity, source, time.time()),
+                    )
+                    # read our row back together with anything other writers added meanwhile
+                    self._sync(conn)
+                    return fidelity == "full" and self._on_front(e)
+                except sqlite3.Error:
+                    # a busy/locked store must never fail a simulation
+                    pass
+            if (e[3], e[4], fidelity) in self._mem_keys:
+                return fidelity == "full" and self._on_front(e)
+            self._mem_keys.add((e[3], e[4], fidelity))
+            self._n_points += 1
+            if fidelity == "full":
+                self._mem.append((e[3], e[4], e[0], e[1], e[2]))
+            return fidelity == "full" and self._insert(e)
+
+    def refresh(self) -> int:
+        """Fold in points written by other processes; returns how many were read."""
+        with self._lock:
+            conn = self._db()
+            if conn is None:
+                return 0
+            try:
+                return self._sync(conn)
+            except sqlite3.Error:
+                return 0
+
+    def front(self) -> List[Dict[str, float]]:
+        """Non-dominated points sorted by tpavg."""
+        self.refresh()
+        with self._lock:
+            return [
+                {"wn_um": wn, "wp_um": wp, "tpavg": t, "pstatic": p, "area_um": a} for t, p, a, wn, wp in self._front
+            ]
+
+    def points(self, *, fidelity: Optional[str] = "full") -> Dict[str, np.ndarray]:
+        """Every stored point as column arrays (wn_um, wp_um, tpavg, pstatic, area_um)."""
+        cols = ("wn", "wp", "tpavg", "pstatic", "area_um")
+        conn = self._db()
+        rows: Sequence[Tuple[float, ...]] = self._mem
+        if conn is not None:
+            sql = f"SELECT {', '.join(cols)} FROM designs WHERE scope = ?"
+            if fidelity is None:
+                rows = conn.execute(sql, (self.scope,)).fetchall()
+            else:
+                rows = conn.execute(sql + " AND fidelity = ?", (self.scope, fidelity)).fetchall()
+        arr = np.asarray(rows, dtype=np.float64).reshape(-1, len(cols))
+        names = ("wn_um", "wp_um", "tpavg", "pstatic", "area_um")
+        return {n: arr[:, k] for k, n in enumerate(names)}
+
+    def __len__(self) -> int:
+        """Stored points of this scope, including those written before this archive was opened."""
+        with self._lock:
+            conn = self._db()
+            if conn is not None:
+                try:
+                    return int(conn.execute("SELECT COUNT(*) FROM designs WHERE scope = ?", (self.scope,)).fetchone()[0])
+                except sqlite3.Error:
+                    pass
+            return self._n_points
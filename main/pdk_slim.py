@@ -0,0 +1,577 @@
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+import warnings
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Mapping, Optional, Set, Tuple
+
+from .netlist import file_digest, lib_references, measure_names, spice_value
+from .sim_cache import PROJECT_ROOT
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None  # type: ignore[assignment]
+
+DEFAULT_SLIM_DIR = PROJECT_ROOT / "results" / "pdk_slim"
+
+# "0": NGSpiceInstance loads the netlists with their full PDK library
+SLIM_ENV = "IA_SLIM_PDK"
+
+# bumped when the extraction rules change, so older extracts are not reused
+EXTRACT_VERSION = 1
+
+# netlist parameter -> range (µm) the extract must cover: InverterEnv action box
+# (rl_env.WN_BOUNDS / WP_BOUNDS) and the default channel length; a point outside it
+# is simulated against the full library (outside_extract)
+DEFAULT_RANGES: Dict[str, Tuple[float, float]] = {"wn": (0.24, 5.0), "wp": (0.48, 10.0), "lch": (0.15, 0.15)}
+
+Range = Optional[Tuple[float, float]]
+
+_INCLUDE_RE = re.compile(r"""^\.inc(?:lude)?\s+(?:"([^"]+)"|'([^']+)'|(\S+))""", re.IGNORECASE)
+_LIB_CALL_RE = re.compile(r"""^\.lib\s+(?:"([^"]+)"|'([^']+)'|(\S+))\s+(\S+)""", re.IGNORECASE)
+_LIB_SECTION_RE = re.compile(r"^\.lib\s+(\S+)\s*$", re.IGNORECASE)
+_ENDL_RE = re.compile(r"^\.endl\b", re.IGNORECASE)
+_END_RE = re.compile(r"^\.end\s*$", re.IGNORECASE)
+_SUBCKT_RE = re.compile(r"^\.subckt\s+(\S+)", re.IGNORECASE)
+_ENDS_RE = re.compile(r"^\.ends\b", re.IGNORECASE)
+_MODEL_RE = re.compile(r"^\.model\s+(\S+)", re.IGNORECASE)
+_PARAM_RE = re.compile(r"^\.param\b", re.IGNORECASE)
+_PARAM_NAME_RE = re.compile(r"([a-z_]\w*)\s*=", re.IGNORECASE)
+_BIN_RE = re.compile(r"\b([lw]m(?:in|ax))\s*=\s*([^\s()]+)", re.IGNORECASE)
+_GEOM_RE = re.compile(r"\b([wl])\s*=\s*(\{\s*\w+\s*\}|[^\s{}]+)", re.IGNORECASE)
+_IDENT_RE = re.compile(r"[a-z_][a-z0-9_]*")
+
+
+def enabled() -> bool:
+    return os.environ.get(SLIM_ENV, "1").strip() != "0"
+
+
+# ---------------------------------------------------------------------- parsing
+
+
+def _statements(path: Path) -> List[str]:
+    """Logical lines of a SPICE file: '+' continuations joined (line breaks kept), comments and blanks dropped."""
+    out: List[str] = []
+    for raw in path.read_text(errors="replace").splitlines():
+        line = raw.strip()
+        if not line or line.startswith("*"):
+            continue
+        if line.startswith("+") and out:
+            out[-1] += "\n" + line
+        else:
+            out.append(line)
+    return out
+
+
+def _quoted_path(m: re.Match, base: Path) -> Path:
+    p = Path(m.group(1) or m.group(2) or m.group(3)).expanduser()
+    return p if p.is_absolute() else base / p
+
+
+def _expand(path: Path, section: Optional[str], out: List[str], files: List[Path], depth: int = 0) -> None:
+    """Append the statements of `path` (only `.lib <section>` if given) to `out`, following .include and .lib calls."""
+    if depth > 32:
+        raise ValueError(f"{path}: .include/.lib nesting deeper than 32")
+    path = path.resolve()
+    if path not in files:
+        files.append(path)
+
+    current: Optional[str] = None
+    found = section is None
+    for stmt in _statements(path):
+        m = _LIB_SECTION_RE.match(stmt)
+        if m is not None:
+            current = m.group(1).lower()
+            found = found or current == section.lower()  # type: ignore[union-attr]
+            continue
+        if _ENDL_RE.match(stmt):
+            current = None
+            continue
+        if current != (section.lower() if section is not None else None):
+            continue
+
+        m = _INCLUDE_RE.match(stmt)
+        if m is not None:
+            _expand(_quoted_path(m, path.parent), None, out, files, depth + 1)
+            continue
+        m = _LIB_CALL_RE.match(stmt)
+        if m is not None:
+            _expand(_quoted_path(m, path.parent), m.group(4), out, files, depth + 1)
+            continue
+        if _END_RE.match(stmt):
+            continue
+        out.append(stmt)
+
+    if not found:
+        raise ValueError(f"{path}: no .lib {section} section")
+
+
+@dataclass
+class _Block:
+    kind: str  # "subckt" | "model" | "param" | "other"
+    statements: List[str]
+    # subckt name / model name without its bin suffix (".12") / names defined by a .param
+    names: Tuple[str, ...] = ()
+
+
+def _model_base(name: str) -> str:
+    m = re.fullmatch(r"(.+)\.\d+", name)
+    return (m.group(1) if m else name).lower()
+
+
+def _blocks(statements: List[str]) -> List[_Block]:
+    blocks: List[_Block] = []
+    i = 0
+    while i < len(statements):
+        stmt = statements[i]
+        m = _SUBCKT_RE.match(stmt)
+        if m is not None:
+            depth, j = 1, i + 1
+            while j < len(statements) and depth:
+                if _SUBCKT_RE.match(statements[j]):
+                    depth += 1
+                elif _ENDS_RE.match(statements[j]):
+                    depth -= 1
+                j += 1
+            blocks.append(_Block("subckt", statements[i:j], (m.group(1).lower(),)))
+            i = j
+            continue
+        m = _MODEL_RE.match(stmt)
+        if m is not None:
+            blocks.append(_Block("model", [stmt], (_model_base(m.group(1)),)))
+        elif _PARAM_RE.match(stmt):
+            names = tuple(n.lower() for n in _PARAM_NAME_RE.findall(stmt[len(".param") :]))
+            blocks.append(_Block("param", [stmt], names))
+        else:
+            blocks.append(_Block("other", [stmt]))
+        i += 1
+    return blocks
+
+
+def _bin_covers(model: str, w: Range, l: Range) -> bool:
+    """False only if the model is a bin whose lmin/lmax/wmin/wmax miss the (µm) ranges entirely."""
+    limits: Dict[str, float] = {}
+    for key, value in _BIN_RE.findall(model):
+        with contextlib.suppress(ValueError):
+            limits[key.lower()] = spice_value(value)
+    for dim, rng in (("w", w), ("l", l)):
+        lo_lim, hi_lim = limits.get(dim + "min"), limits.get(dim + "max")
+        if rng is None or (lo_lim is None and hi_lim is None):
+            continue
+        # bin limits are in metres (µm if a limit is >= 1 mm, i.e. written unscaled)
+        unit = 1e-6 if max(v for v in (lo_lim, hi_lim) if v is not None) < 1e-3 else 1.0
+        lo, hi = rng[0] * unit, rng[1] * unit
+        if hi_lim is not None and hi_lim < lo * (1 - 1e-6):
+            return False
+        if lo_lim is not None and lo_lim > hi * (1 + 1e-6):
+            return False
+    return True
+
+
+def _device_ranges(
+    netlist_path: Path,
+    known: Set[str],
+    ranges: Mapping[str, Tuple[float, float]],
+) -> Dict[str, Dict[str, Range]]:
+    """
+    Devices of the library instantiated by the netlist (X/M lines), with the W/L range (µm) they must cover.
+    A W/L given by a parameter missing from `ranges` (or by an expression) is not filtered.
+    """
+    ranges = {k.lower(): v for k, v in ranges.items()}
+    out: Dict[str, Dict[str, Range]] = {}
+    for stmt in _statements(netlist_path):
+        if stmt[0].lower() not in "xm":
+            continue
+        tokens = [t.lower() for t in re.split(r"\s+", stmt.replace("\n+", " "))]
+        devices = [t for t in tokens[1:] if t in known]
+        if not devices:
+            continue
+        geom: Dict[str, Range] = {}
+        for dim, value in _GEOM_RE.findall(stmt):
+            value = value.strip("{} ").lower()
+            if value in ranges:
+                geom[dim.lower()] = ranges[value]
+            else:
+                try:
+                    v = spice_value(value)
+                except ValueError:
+                    geom[dim.lower()] = None
+                else:
+                    geom[dim.lower()] = (v, v)
+        for dev in devices:
+            seen = out.get(dev)
+            if seen is None:
+                out[dev] = {d: geom.get(d) for d in ("w", "l")}
+                continue
+            for d in ("w", "l"):
+                a, b = seen[d], geom.get(d)
+                seen[d] = None if a is None or b is None else (min(a[0], b[0]), max(a[1], b[1]))
+    return out
+
+
+@dataclass
+class Extract:
+    text: str
+    files: List[Path]
+    devices: Dict[str, Dict[str, Range]]
+    n_statements: int
+    n_kept: int
+    n_models: int
+    n_models_kept: int
+
+
+def extract_library(
+    lib_path: str | Path,
+    corner: str,
+    netlist_path: str | Path,
+    *,
+    ranges: Mapping[str, Tuple[float, float]] = DEFAULT_RANGES,
+) -> Extract:
+    """
+    Slim copy of one corner of a PDK library, holding only what the netlist's devices need.
+    - the corner is flattened (.include / .lib calls followed)
+    - kept: the subckts and models the netlist instantiates, transitively what they
+      reference (subckts, models, .param), plus every other statement (.option, .func, ...)
+    - binned models (lmin/lmax/wmin/wmax) are kept only if they overlap the W/L range the
+      netlist can ask for (`ranges`, per netlist parameter)
+    Raises ValueError if a device is missing or no bin of it covers the range.
+    """
+    lib_path, netlist_path = Path(lib_path), Path(netlist_path)
+    statements: List[str] = []
+    files: List[Path] = []
+    _expand(lib_path, corner, statements, files)
+    blocks = _blocks(statements)
+
+    by_name: Dict[str, List[int]] = {}
+    for i, b in enumerate(blocks):
+        for name in b.names:
+            by_name.setdefault(name, []).append(i)
+    known = {b.names[0] for b in blocks if b.kind in ("subckt", "model")}
+    devices = _device_ranges(netlist_path, known, ranges)
+    if not devices:
+        raise ValueError(f"{netlist_path} instantiates no device of {lib_path} [{corner}]")
+
+    kept: Dict[int, List[str]] = {i: b.statements for i, b in enumerate(blocks) if b.kind == "other"}
+    bins: Dict[str, List[int]] = {dev: [0, 0] for dev in devices}
+    # names used by the statements always kept (.func bodies, options); popped last, so
+    # the devices and what they reach are visited first, with their W/L filter
+    todo: List[Tuple[str, str]] = [(t, "") for stmts in kept.values() for s in stmts for t in _IDENT_RE.findall(s.lower())]
+    todo.extend((dev, dev) for dev in devices)
+    seen: Set[str] = set()
+
+    while todo:
+        name, dev = todo.pop()
+        if name in seen:
+            continue
+        seen.add(name)
+        geom = devices.get(dev, {"w": None, "l": None})
+        for i in by_name.get(name, ()):
+            b = blocks[i]
+            body: List[str] = []
+            for stmt in b.statements:
+                if _MODEL_RE.match(stmt):
+                    if dev:
+                        bins[dev][0] += 1
+                    if not _bin_covers(stmt, geom["w"], geom["l"]):
+                        continue
+                    if dev:
+                        bins[dev][1] += 1
+                body.append(stmt)
+            if not body:
+                continue
+            kept[i] = body
+            for stmt in body:
+                todo.extend((t, dev) for t in _IDENT_RE.findall(stmt.lower()) if t not in seen)
+
+    for dev, (n_bins, n_kept) in bins.items():
+        if n_bins and not n_kept:
+            raise ValueError(f"no {dev} model of {lib_path} [{corner}] covers W={devices[dev]['w']} L={devices[dev]['l']} µm")
+
+    text = "\n".join(s for i in sorted(kept) for s in kept[i]) + "\n"
+    return Extract(
+        text=text,
+        files=files,
+        devices=devices,
+        n_statements=sum(len(b.statements) for b in blocks),
+        n_kept=sum(len(v) for v in kept.values()),
+        n_models=sum(1 for s in statements if _MODEL_RE.match(s)),
+        n_models_kept=sum(1 for v in kept.values() for s in v if _MODEL_RE.match(s)),
+    )
+
+
+# ---------------------------------------------------------------------- cache
+
+
+def _atomic_write_text(path: Path, text: str) -> None:
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+@contextlib.contextmanager
+def _locked(cache_dir: Path) -> Iterator[None]:
+    # workers starting together: one extracts, the others then find its manifest
+    if fcntl is None:
+        yield
+        return
+    with open(cache_dir / ".lock", "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _stat_key(path: Path) -> List[int]:
+    st = path.stat()
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _manifest_valid(manifest: Dict[str, object]) -> bool:
+    try:
+        if not Path(str(manifest["slim"])).exists():
+            return False
+        return all(_stat_key(Path(p)) == list(k) for p, k in manifest["files"].items())  # type: ignore[union-attr]
+    except (OSError, KeyError, TypeError):
+        return False
+
+
+def slim_library(
+    lib_path: str | Path,
+    corner: str,
+    netlist_path: str | Path,
+    *,
+    ranges: Mapping[str, Tuple[float, float]] = DEFAULT_RANGES,
+    cache_dir: str | Path = DEFAULT_SLIM_DIR,
+    force: bool = False,
+) -> Path:
+    """
+    Cached extract_library(): <cache_dir>/<lib>.<corner>.<pdk hash>.<selection hash>.spice
+    - the pdk hash covers every file of the flattened corner: a changed PDK gives a new extract
+    - a manifest records the (mtime, size) of those files; lookups only stat them
+    """
+    lib_path, netlist_path, cache_dir = Path(lib_path).resolve(), Path(netlist_path), Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    selection = json.dumps(
+        {
+            "version": EXTRACT_VERSION,
+            "lib": str(lib_path),
+            "corner": corner.lower(),
+            # only the X/M lines select devices and W/L: fidelity variants share one extract
+            "instances": hashlib.sha256(
+                "\n".join(st.lower() for st in _statements(netlist_path) if st[0].lower() in "xm").encode()
+            ).hexdigest(),
+            "ranges": sorted((k.lower(), list(v)) for k, v in ranges.items()),
+        },
+        sort_keys=True,
+    )
+    sel = hashlib.sha256(selection.encode()).hexdigest()[:16]
+    manifest_path = cache_dir / f"{sel}.json"
+
+    with _locked(cache_dir):
+        if not force and manifest_path.exists():
+            with contextlib.suppress(ValueError, OSError):
+                manifest = json.loads(manifest_path.read_text())
+                if _manifest_valid(manifest):
+                    return Path(manifest["slim"])
+
+        ex = extract_library(lib_path, corner, netlist_path, ranges=ranges)
+        pdk = hashlib.sha256("".join(file_digest(p) for p in ex.files).encode()).hexdigest()
+        slim = cache_dir / f"{lib_path.name.split('.')[0]}.{corner.lower()}.{pdk[:12]}.{sel[:8]}.spice"
+        if force or not slim.exists():
+            ranges_txt = ", ".join(f"{d} W={g['w']} L={g['l']}" for d, g in sorted(ex.devices.items()))
+            header = [
+                f"* slim extract of {lib_path} [{corner}] - written by main/pdk_slim.py, do not edit",
+                f"* pdk sha256 {pdk}",
+                f"* devices (µm): {ranges_txt}",
+                f"* {ex.n_kept}/{ex.n_statements} statements, {ex.n_models_kept}/{ex.n_models} models",
+            ]
+            _atomic_write_text(slim, "\n".join(header) + f"\n.lib {corner}\n" + ex.text + f".endl {corner}\n")
+        manifest = {
+            "slim": str(slim),
+            "pdk_sha256": pdk,
+            "files": {str(p): _stat_key(p) for p in ex.files},
+        }
+        _atomic_write_text(manifest_path, json.dumps(manifest, indent=1))
+    return slim
+
+
+# ---------------------------------------------------------------------- runtime hook
+
+# (netlist, mtime_ns, ranges, cache_dir) -> netlist to load
+_SLIM: Dict[Tuple[str, int, str, str], Path] = {}
+
+
+def slim_netlist(
+    netlist_path: str | Path,
+    *,
+    ranges: Mapping[str, Tuple[float, float]] = DEFAULT_RANGES,
+    cache_dir: str | Path = DEFAULT_SLIM_DIR,
+) -> Path:
+    """
+    Netlist to hand to NGSpiceInstance.load(): a copy whose .lib lines point at slim extracts.
+    The netlist itself when IA_SLIM_PDK=0, when it pulls in no existing library, or (with a
+    warning) when the extraction fails. Memoised per process.
+    SimCache keys stay computed on the original netlist and full PDK.
+    """
+    netlist_path = Path(netlist_path)
+    if not enabled():
+        return netlist_path
+    try:
+        mtime = netlist_path.stat().st_mtime_ns
+    except OSError:
+        return netlist_path
+    key = (str(netlist_path.resolve()), mtime, repr(sorted(ranges.items())), str(cache_dir))
+    cached = _SLIM.get(key)
+    if cached is not None:
+        return cached
+
+    out = netlist_path
+    refs = [(lib, corner) for lib, corner in lib_references(netlist_path) if lib.exists()]
+    if refs:
+        try:
+            libs = {
+                (str(lib), corner.lower()): slim_library(lib, corner, netlist_path, ranges=ranges, cache_dir=cache_dir)
+                for lib, corner in refs
+            }
+            out = _rewrite_libs(netlist_path, libs, Path(cache_dir))
+        except (OSError, ValueError) as exc:
+            warnings.warn(f"slim PDK extract failed for {netlist_path} ({exc}); loading the full library", stacklevel=2)
+    _SLIM[key] = out
+    return out
+
+
+def covers(params: Mapping[str, float], ranges: Mapping[str, Tuple[float, float]] = DEFAULT_RANGES) -> bool:
+    """True if every parameter the extract is cut for lies in its range; other parameters are not checked."""
+    ranges = {k.lower(): v for k, v in ranges.items()}
+    for name, value in params.items():
+        rng = ranges.get(name.lower())
+        if rng is not None and not (rng[0] * (1 - 1e-6) <= float(value) <= rng[1] * (1 + 1e-6)):
+            return False
+    return True
+
+
+_WARNED: Set[str] = set()
+
+
+def outside_extract(
+    netlist_path: str | Path,
+    params: Mapping[str, float],
+    *,
+    ranges: Mapping[str, Tuple[float, float]] = DEFAULT_RANGES,
+) -> bool:
+    """
+    True if the slim extract of the netlist may have no model bin for `params`: the caller then
+    loads the netlist itself (full library) instead. Warns once per netlist and process.
+    False when no extract is in use (IA_SLIM_PDK=0, no library, failed extraction).
+    """
+    if covers(params, ranges):
+        return False
+    netlist_path = Path(netlist_path)
+    if slim_netlist(netlist_path, ranges=ranges) == netlist_path:
+        return False
+    if str(netlist_path) not in _WARNED:
+        _WARNED.add(str(netlist_path))
+        point = ", ".join(f"{k}={float(v):g}" for k, v in params.items())
+        warnings.warn(
+            f"{point} is outside the slim PDK extract of {netlist_path}; loading the full library",
+            stacklevel=2,
+        )
+    return True
+
+
+def _rewrite_libs(netlist_path: Path, libs: Mapping[Tuple[str, str], Path], cache_dir: Path) -> Path:
+    lines = []
+    for line in netlist_path.read_text(errors="replace").splitlines():
+        m = _LIB_CALL_RE.match(line.strip())
+        if m is not None:
+            slim = libs.get((str(_quoted_path(m, netlist_path.parent)), m.group(4).lower()))
+            if slim is not None:
+                line = f'.lib "{slim}" {m.group(4)}'
+        lines.append(line)
+    text = "\n".join(lines) + "\n"
+    digest = hashlib.sha256(text.encode()).hexdigest()[:12]
+    path = cache_dir / f"{netlist_path.stem}.slim.{digest}{netlist_path.suffix}"
+    if not path.exists():
+        _atomic_write_text(path, text)
+    return path
+
+
+# ---------------------------------------------------------------------- CLI
+
+
+def _check(full: Path, slim: Path, points: List[Tuple[float, float]]) -> None:
+    """Load time and measures of the full vs slim netlist (needs ngspice)."""
+    from .spice_backend import NGSpiceInstance
+
+    names = measure_names(full)
+    results = {}
+    for label, path in (("full", full), ("slim", slim)):
+        inst = NGSpiceInstance()
+        t0 = time.perf_counter()
+        inst.load(path)
+        t_load = time.perf_counter() - t0
+        vals = []
+        for wn, wp in points:
+            inst.set_parameter("wn", wn)
+            inst.set_parameter("wp", wp)
+            inst.run()
+            vals.append([float(inst.get_measure(m)) for m in names])
+        inst.stop()
+        results[label] = vals
+        print(f"  {label}: load {t_load * 1e3:8.1f} ms")
+    worst = max(
+        (abs(b / a - 1.0) if a != 0.0 else abs(b))
+        for ra, rb in zip(results["full"], results["slim"])
+        for a, b in zip(ra, rb)
+    )
+    print(f"  max relative difference over {len(points)} points x {len(names)} measures: {worst:.3e}")
+
+
+def main() -> None:
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Write the slim PDK extracts of netlists (results/pdk_slim)")
+    ap.add_argument("netlists", nargs="*", default=[str(PROJECT_ROOT / "spice" / "inv_char.cir")])
+    ap.add_argument("--force", action="store_true", help="re-extract even if the cache is valid")
+    ap.add_argument("--check", action="store_true", help="compare load time and measures with the full library")
+    args = ap.parse_args()
+
+    status = 0
+    for netlist in map(Path, args.netlists):
+        print(netlist)
+        refs = [(lib, corner) for lib, corner in lib_references(netlist) if lib.exists()]
+        if not refs:
+            print("  no existing .lib reference, nothing to extract")
+            continue
+        for lib, corner in refs:
+            try:
+                ex = extract_library(lib, corner, netlist)
+                slim = slim_library(lib, corner, netlist, force=args.force)
+            except (OSError, ValueError) as exc:
+                print(f"  {lib} [{corner}]: {exc}")
+                status = 1
+                continue
+            src_bytes = sum(p.stat().st_size for p in ex.files)
+            print(f"  {lib} [{corner}]: {len(ex.files)} files, {src_bytes / 1e6:.1f} MB -> {slim.stat().st_size / 1e3:.0f} kB")
+            print(f"  statements {ex.n_kept}/{ex.n_statements}, models {ex.n_models_kept}/{ex.n_models}")
+            for dev, g in sorted(ex.devices.items()):
+                print(f"  {dev}: W={g['w']} L={g['l']} µm")
+            print(f"  -> {slim}")
+        if args.check:
+            _check(netlist, slim_netlist(netlist), [(0.42, 0.84), (1.0, 2.0), (4.0, 8.0)])
+    sys.exit(status)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+from stable_baselines3 import PPO
+
+from .design_eval import REFERENCE_DESIGN, DesignEvaluator
+from .rl_env import WN_BOUNDS, WP_BOUNDS, normalize_weights
+from .sim_cache import PROJECT_ROOT
+from .spice_pool import PyngsWorkerPool
+
+DEFAULT_POLICY_PATH = PROJECT_ROOT / "results" / "ppo_weight_conditioned.zip"
+
+
+def load_policy(path: str | Path = DEFAULT_POLICY_PATH) -> PPO:
+    return PPO.load(str(path), device="cpu")
+
+
+def _observation(wn: float, wp: float, norm: Tuple[float, float, float], weights: Tuple[float, float, float]) -> np.ndarray:
+    """Weight-conditioned InverterEnv observation."""
+    wn_norm = (wn - WN_BOUNDS[0]) / (WN_BOUNDS[1] - WN_BOUNDS[0])
+    wp_norm = (wp - WP_BOUNDS[0]) / (WP_BOUNDS[1] - WP_BOUNDS[0])
+    return np.array([wn_norm, wp_norm, *norm, *weights], dtype=np.float32)
+
+
+def propose(
+    model: PPO,
+    w_delay: float,
+    w_power: float,
+    w_area: float,
+    *,
+    start: Tuple[float, float] = REFERENCE_DESIGN,
+) -> Tuple[float, float]:
+    """
+    Widths the policy picks for these weights, from one forward pass.
+    - at an episode start the normalised metrics are 1 by construction, so no simulation is needed
+    """
+    weights = normalize_weights(w_delay, w_power, w_area)
+    action, _ = model.predict(_observation(start[0], start[1], (1.0, 1.0, 1.0), weights), deterministic=True)
+    a = np.asarray(action, dtype=np.float64).reshape(-1)
+    return float(np.clip(a[0], *WN_BOUNDS)), float(np.clip(a[1], *WP_BOUNDS))
+
+
+def query_policy(
+    model: PPO | str | Path,
+    w_delay: float,
+    w_power: float,
+    w_area: float,
+    *,
+    steps: int = 1,
+    pool: Optional[PyngsWorkerPool] = None,
+    cache_path: Optional[str] = None,
+    archive_path: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Best design of a weight-conditioned policy for new weights, confirmed with SPICE.
+    - episode start at the reference design, then `steps` deterministic policy steps, each simulated
+      (1 + steps simulations, the reference included)
+    - rewards use the reference design as normalisation, like InverterEnv and the black-box optimizers
+    - returns the InverterEnv.get_best() layout plus the simulation count
+    """
+    if not isinstance(model, PPO):
+        model = load_policy(model)
+    weights = normalize_weights(w_delay, w_power, w_area)
+    evaluator = DesignEvaluator(
+        w_delay,
+        w_power,
+        w_area,
+        pool=pool,
+        n_workers=1,
+        cache_path=cache_path,
+        archive_path=archive_path,
+        source="policy",
+    )
+    try:
+        wn, wp = REFERENCE_DESIGN
+        norm = (1.0, 1.0, 1.0)
+        for _ in range(max(1, int(steps))):
+            action, _ = model.predict(_observation(wn, wp, norm, weights), deterministic=True)
+            _, records = evaluator.evaluate(np.asarray(action, dtype=np.float64).reshape(1, 2))
+            rec = records[0]
+            if rec["ppa"]["sim_ok"] < 0.5:
+                break
+            wn, wp = rec["wn_um"], rec["wp_um"]
+            norm = (rec["ppa"]["delay_norm"], rec["ppa"]["power_norm"], rec["ppa"]["area_norm"])
+        best = evaluator.best or {"reward": float("nan"), "wn_um": float("nan"), "wp_um": float("nan"), "ppa": {}}
+        return {**best, "n_simulations": evaluator.n_sims}
+    finally:
+        evaluator.close()
+
+
+def main() -> None:
+    wd, wpw, wa = (float(x) for x in (sys.argv[1:4] if len(sys.argv) >= 4 else (1.0, 1.0, 1.0)))
+    best = query_policy(DEFAULT_POLICY_PATH, wd, wpw, wa)
+    print(f"weights {wd:g}/{wpw:g}/{wa:g}: Wn = {best['wn_um']:.3f} µm, Wp = {best['wp_um']:.3f} µm, reward = {best['reward']:.6f}")
+    ppa = best.get("ppa", {})
+    if ppa:
+        print(f"tpavg = {ppa['tpavg'] * 1e12:.3f} ps, pstatic = {ppa['pstatic'] * 1e12:.6f} pW, area = {ppa['area_um']:.3f} µm")
+    print(f"{best['n_simulations']} SPICE simulations")
+
+
+if __name__ == "__main__":
+    main()
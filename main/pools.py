@@ -1,11 +1,22 @@
 # main/pools.py
 from __future__ import annotations
 
+import hashlib
+import json
+import os
 from pathlib import Path
-from typing import Sequence, Dict, Any, Tuple, Iterable
+from typing import Sequence, Dict, Any, Tuple, Iterable, Iterator, Optional
 
+import numpy as np
 import pandas as pd
-from pyngs.core import NGSpiceInstance
+
+from .netlist import measure_names
+from .pdk_slim import outside_extract, slim_netlist
+from .sim_cache import SimCache
+from .spice_backend import NGSpiceInstance
+
+# Mesure(s) à lire : un nom, une liste de noms, ou None / "all" (toutes les .meas)
+MeasureSpec = str | Sequence[str] | None
 
 
 # =====================================================================
@@ -13,46 +24,80 @@ from pyngs.core import NGSpiceInstance
 # =====================================================================
 
 
-def _worker_task(args: Tuple[str, str, Dict[str, float]]) -> float:
+# Instances ngspice propres à chaque processus fils : {chemin netlist: instance}.
+# Remplies une seule fois par _init_worker, puis réutilisées par toutes les tâches.
+_WORKER_INSTANCES: Dict[str, NGSpiceInstance] = {}
+# Netlists rechargées avec la librairie complète du PDK dans ce processus : un
+# point est sorti des plages couvertes par l'extrait allégé (voir pdk_slim).
+_FULL_LIB: set[str] = set()
+
+
+def _init_worker(netlist_paths: Sequence[str]) -> None:
+    """
+    Initialiseur des processus fils (version parallèle).
+
+    Charge chaque netlist (et donc la librairie de modèles du PDK) une seule
+    fois par processus. Les tâches suivantes réutilisent ces instances.
+    """
+    for path in netlist_paths:
+        if path not in _WORKER_INSTANCES:
+            inst = NGSpiceInstance()
+            inst.load(path if path in _FULL_LIB else slim_netlist(path))
+            _WORKER_INSTANCES[path] = inst
+
+
+def _worker_task(args: Tuple[str, Tuple[str, ...], Dict[str, float]]) -> list[float]:
     """
     Fonction exécutée dans un processus fils (version parallèle).
 
     Paramètres
     ----------
     args : tuple
-        (netlist_path_str, measure_name, params)
+        (netlist_path_str, measure_names, params)
 
         - netlist_path_str : chemin vers le fichier .cir à utiliser
-        - measure_name     : nom de la mesure SPICE (ex: 'fcut')
+        - measure_names    : noms des mesures SPICE (ex: ('fcut',))
         - params           : dictionnaire {nom_param: valeur}
 
     Retour
     ------
-    float
-        Valeur de la mesure demandée (par exemple fréquence de coupure).
+    list[float]
+        Valeurs des mesures demandées, toutes issues d'une seule simulation.
     """
-    netlist_path_str, measure_name, params = args
+    netlist_path_str, measure_names, params = args
 
-    inst = NGSpiceInstance()
+    # Point hors de l'extrait allégé du PDK : rechargement avec la librairie complète
+    if netlist_path_str not in _FULL_LIB and outside_extract(netlist_path_str, params):
+        _FULL_LIB.add(netlist_path_str)
+        old = _WORKER_INSTANCES.pop(netlist_path_str, None)
+        if old is not None:
+            old.stop()
 
-    try:
-        # Charge la netlist dans ngspice
-        inst.load(Path(netlist_path_str))
+    # Instance préchargée par _init_worker (chargement paresseux sinon)
+    inst = _WORKER_INSTANCES.get(netlist_path_str)
+    if inst is None:
+        _init_worker([netlist_path_str])
+        inst = _WORKER_INSTANCES[netlist_path_str]
 
-        # Applique chaque paramètre SPICE (R_val, C_val, etc.)
-        for name, value in params.items():
-            inst.set_parameter(name, float(value))
+    # Applique chaque paramètre SPICE (R_val, C_val, etc.)
+    for name, value in params.items():
+        inst.set_parameter(name, float(value))
 
-        # Lance la simulation SPICE (AC dans notre cas)
-        inst.run()
+    # Lance la simulation SPICE (AC dans notre cas)
+    inst.run()
+
+    # Récupère les mesures demandées (ex: .meas ac fcut ...)
+    return [float(inst.get_measure(name)) for name in measure_names]
 
-        # Récupère la mesure demandée (ex: .meas ac fcut ...)
-        value = inst.get_measure(measure_name)
-        return float(value)
 
-    finally:
-        # Arrêt propre de l'instance ngspice dans ce processus
-        inst.stop()
+def _choose_chunksize(n_tasks: int, n_processes: int) -> int:
+    """
+    Taille des paquets de tâches envoyés aux processus.
+
+    Environ 4 paquets par processus : assez gros pour amortir les échanges
+    entre processus, assez petits pour équilibrer la charge en fin de run.
+    """
+    return max(1, -(-n_tasks // (4 * max(1, n_processes))))
 
 
 # =====================================================================
@@ -68,20 +113,37 @@ class BasePool:
     Elle stocke simplement les informations communes:
 
     - la liste des chemins de netlists
-    - le nom de la mesure SPICE à récupérer (par exemple 'fcut')
+    - le ou les noms des mesures SPICE à récupérer (par exemple 'fcut')
+    - un cache de simulations optionnel (SimCache), partagé entre les pools
     """
 
     def __init__(
         self,
         netlist_paths: Sequence[str | Path],
-        measure_name: str = "fcut",
+        measure_name: MeasureSpec = "fcut",
+        cache: Optional[SimCache] = None,
     ) -> None:
         if not netlist_paths:
             raise ValueError("Au moins une netlist est requise.")
 
         # On convertit tout en Path pour être plus robustes
         self._netlist_paths: list[Path] = [Path(p) for p in netlist_paths]
-        self._measure_name: str = measure_name
+
+        # Une ou plusieurs mesures par simulation.
+        # None (ou "all") : toutes les .meas définies dans la première netlist.
+        if measure_name is None or measure_name == "all":
+            names = measure_names(self._netlist_paths[0])
+            if not names:
+                raise ValueError(f"Aucune .meas trouvée dans {self._netlist_paths[0]}.")
+        elif isinstance(measure_name, str):
+            names = [measure_name]
+        else:
+            names = [str(m) for m in measure_name]
+            if not names:
+                raise ValueError("Au moins une mesure est requise.")
+        self._measure_names: Tuple[str, ...] = tuple(names)
+        self._measure_name: str = names[0]
+        self._cache: Optional[SimCache] = cache
 
     # --- propriétés "propres" pour accéder aux attributs ---
 
@@ -92,14 +154,93 @@ class BasePool:
 
     @property
     def measure_name(self) -> str:
-        """Nom de la mesure SPICE à lire (ex: 'fcut')."""
+        """Nom de la (première) mesure SPICE à lire (ex: 'fcut')."""
         return self._measure_name
 
-    # --- méthode d'interface que les classes filles doivent implémenter ---
+    @property
+    def measure_names(self) -> Tuple[str, ...]:
+        """Noms de toutes les mesures lues après chaque simulation."""
+        return self._measure_names
+
+    @property
+    def cache(self) -> Optional[SimCache]:
+        """Cache de simulations (None si désactivé)."""
+        return self._cache
+
+    # --- accès au cache ---
+
+    def _cache_key(self, netlist_path: Path, params: Dict[str, float]) -> Optional[str]:
+        """Clé de cache d'une simulation, ou None si le cache est désactivé."""
+        if self._cache is None:
+            return None
+        return self._cache.key(netlist_path, params, tag=",".join(self._measure_names))
+
+    def _run_rows(self, start: int, rows: list[Dict[str, float]]) -> list[list[float]]:
+        """
+        Mesures d'un bloc de lignes consécutives (la première a l'indice `start`).
+
+        Renvoie, pour chaque ligne, la liste des valeurs de `measure_names`.
+        Les lignes déjà présentes dans le cache ne sont pas simulées ; les autres
+        sont confiées à `_simulate_rows` puis mémorisées.
+        """
+        nan_row = [float("nan")] * len(self._measure_names)
+        measures: list[list[float]] = [nan_row] * len(rows)
+        keys: Dict[int, str] = {}
+        todo: list[int] = []
+        nb_netlists = len(self._netlist_paths)
+
+        for j, params in enumerate(rows):
+            key = self._cache_key(self._netlist_paths[(start + j) % nb_netlists], params)
+            if key is not None:
+                assert self._cache is not None
+                hit = self._cache.get(key)
+                if hit is not None:
+                    measures[j] = [float(hit[name]) for name in self._measure_names]
+                    continue
+                keys[j] = key
+            todo.append(j)
+
+        if todo:
+            computed = self._simulate_rows([(start + j, rows[j]) for j in todo])
+            for j, values in zip(todo, computed):
+                measures[j] = list(values)
+                if j in keys:
+                    assert self._cache is not None
+                    self._cache.put(keys[j], dict(zip(self._measure_names, values)))
+
+        return measures
+
+    # --- gestion des ressources ---
+
+    def close(self) -> None:
+        """Libère les ressources du pool (rien à faire par défaut)."""
+
+    def __enter__(self) -> "BasePool":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    # --- méthode que les classes filles doivent implémenter ---
+
+    def _simulate_rows(self, tasks: list[Tuple[int, Dict[str, float]]]) -> list[list[float]]:
+        """
+        Simule une liste de tâches et renvoie les mesures dans le même ordre
+        (une liste de valeurs de `measure_names` par tâche, un seul run chacune).
+
+        Paramètres
+        ----------
+        tasks : list
+            Couples (indice de ligne, {nom_param: valeur}). L'indice sert à
+            choisir la netlist en round robin.
+        """
+        raise NotImplementedError("La méthode _simulate_rows() doit être implémentée.")
+
+    # --- interface principale ---
 
     def run(self, values: pd.DataFrame) -> pd.DataFrame:
         """
-        Méthode à implémenter dans les classes dérivées.
+        Exécute les simulations pour chaque ligne de la DataFrame.
 
         Paramètres
         ----------
@@ -110,9 +251,199 @@ class BasePool:
         Retour
         ------
         pandas.DataFrame
-            Doit contenir au minimum une colonne avec la mesure (par ex. 'fcut').
+            Une colonne par mesure (par ex. 'fcut'), avec le même index
+            que la DataFrame d'entrée.
+        """
+        if values.empty:
+            # Rien à faire, on renvoie une DataFrame vide avec les bonnes colonnes.
+            return pd.DataFrame({name: [] for name in self._measure_names})
+
+        chunk = next(self.run_iter(values, chunk_size=len(values)))
+        return chunk[list(self._measure_names)]
+
+    def run_iter(
+        self,
+        values: pd.DataFrame,
+        *,
+        chunk_size: int = 1000,
+        out_dir: str | Path | None = None,
+        resume: bool = True,
+    ) -> Iterator[pd.DataFrame]:
         """
-        raise NotImplementedError("La méthode run() doit être implémentée.")
+        Version "streaming" de run() pour les très grands plans d'expériences.
+
+        Les colonnes sont lues une fois en tableaux NumPy, puis les lignes sont
+        simulées par blocs de `chunk_size`. Chaque bloc terminé est renvoyé
+        (paramètres + mesures) et, si `out_dir` est donné, écrit sur disque
+        (Parquet si pyarrow est disponible, CSV sinon). Rien n'est accumulé en
+        mémoire : la consommation reste constante quel que soit le nombre de lignes.
+
+        Avec `resume=True`, les lignes déjà écrites dans `out_dir` par un run
+        précédent (interrompu) ne sont pas recalculées. Un manifeste écrit au
+        premier run (nombre de lignes, colonnes, mesures, netlists, empreinte des
+        valeurs) garantit que ces lignes viennent du même plan : sinon ValueError.
+        Avec `resume=False`, les blocs et le manifeste existants sont effacés.
+        """
+        n_rows = len(values)
+        if n_rows == 0:
+            return
+
+        columns = [str(c) for c in values.columns]
+        arrays = [values[c].to_numpy(dtype=float) for c in values.columns]
+        chunk_size = max(1, int(chunk_size))
+
+        start = 0
+        if out_dir is not None:
+            out_dir = Path(out_dir)
+            out_dir.mkdir(parents=True, exist_ok=True)
+            manifest = _run_manifest(n_rows, columns, arrays, self._measure_names, self._netlist_paths)
+            if resume and _parts(out_dir):
+                # Ne reprendre que les blocs du même plan d'expériences
+                _check_manifest(out_dir, manifest)
+                start = completed_rows(out_dir)
+            else:
+                _clear_run(out_dir)
+                _write_manifest(out_dir, manifest)
+
+        while start < n_rows:
+            stop = min(n_rows, start + chunk_size)
+            rows = [
+                {name: float(arr[i]) for name, arr in zip(columns, arrays)}
+                for i in range(start, stop)
+            ]
+            measures = self._run_rows(start, rows)
+
+            chunk = pd.DataFrame(
+                {name: arr[start:stop] for name, arr in zip(columns, arrays)},
+                index=values.index[start:stop],
+            )
+            for k, name in enumerate(self._measure_names):
+                chunk[name] = [m[k] for m in measures]
+
+            if out_dir is not None:
+                _write_part(out_dir, start, stop, chunk)
+            yield chunk
+            start = stop
+
+
+# =====================================================================
+#  Écriture / reprise des résultats sur disque (run_iter)
+# =====================================================================
+
+
+_PART_PREFIX = "part-"
+_MANIFEST = "manifest.json"
+
+
+def _run_manifest(
+    n_rows: int,
+    columns: Sequence[str],
+    arrays: Sequence[Any],
+    measure_names: Sequence[str],
+    netlist_paths: Sequence[Path],
+) -> Dict[str, Any]:
+    """Description d'un run_iter : ce qui doit être identique pour reprendre ses blocs."""
+    digest = hashlib.sha256()
+    for name, arr in zip(columns, arrays):
+        digest.update(name.encode())
+        digest.update(np.ascontiguousarray(arr, dtype=np.float64).tobytes())
+    return {
+        "n_rows": int(n_rows),
+        "columns": list(columns),
+        "measures": list(measure_names),
+        "netlists": [str(p) for p in netlist_paths],
+        "values_sha256": digest.hexdigest(),
+    }
+
+
+def _write_manifest(out_dir: Path, manifest: Dict[str, Any]) -> None:
+    tmp = out_dir / f".{_MANIFEST}.tmp"
+    tmp.write_text(json.dumps(manifest, indent=1))
+    os.replace(tmp, out_dir / _MANIFEST)
+
+
+def _check_manifest(out_dir: Path, manifest: Dict[str, Any]) -> None:
+    """ValueError si les blocs de out_dir ne viennent pas du run décrit par `manifest`."""
+    path = out_dir / _MANIFEST
+    try:
+        found = json.loads(path.read_text())
+    except (OSError, ValueError):
+        raise ValueError(
+            f"{out_dir} contient des blocs sans manifeste lisible ({_MANIFEST}) : "
+            "reprise impossible, relancer avec resume=False ou un autre out_dir"
+        ) from None
+    diff = [k for k in manifest if found.get(k) != manifest[k]]
+    if diff:
+        raise ValueError(
+            f"{out_dir} contient les blocs d'un autre plan d'expériences ({', '.join(diff)} différent) : "
+            "relancer avec resume=False ou un autre out_dir"
+        )
+
+
+def _clear_run(out_dir: Path) -> None:
+    """Efface les blocs et le manifeste d'un run précédent dans out_dir."""
+    for _, _, path in _parts(out_dir):
+        path.unlink()
+    (out_dir / _MANIFEST).unlink(missing_ok=True)
+
+
+def _write_part(out_dir: Path, start: int, stop: int, chunk: pd.DataFrame) -> Path:
+    """
+    Écrit un bloc de résultats de façon atomique (fichier temporaire + rename).
+
+    Le nom du fichier contient les lignes couvertes : part-<start>-<stop>.<ext>.
+    """
+    stem = f"{_PART_PREFIX}{start:010d}-{stop:010d}"
+    try:
+        import pyarrow  # noqa: F401
+
+        path = out_dir / f"{stem}.parquet"
+        tmp = out_dir / f".{stem}.parquet.tmp"
+        chunk.to_parquet(tmp)
+    except ImportError:
+        path = out_dir / f"{stem}.csv"
+        tmp = out_dir / f".{stem}.csv.tmp"
+        chunk.to_csv(tmp)
+    os.replace(tmp, path)
+    return path
+
+
+def _parts(out_dir: Path) -> list[Tuple[int, int, Path]]:
+    """Liste triée des blocs (start, stop, chemin) présents dans out_dir."""
+    parts: list[Tuple[int, int, Path]] = []
+    for path in Path(out_dir).glob(f"{_PART_PREFIX}*"):
+        if path.suffix not in (".parquet", ".csv"):
+            continue
+        try:
+            start_s, stop_s = path.stem[len(_PART_PREFIX):].split("-")
+            parts.append((int(start_s), int(stop_s), path))
+        except ValueError:
+            continue
+    parts.sort()
+    return parts
+
+
+def completed_rows(out_dir: str | Path) -> int:
+    """Nombre de lignes déjà calculées sans trou depuis le début (point de reprise)."""
+    done = 0
+    for start, stop, _ in _parts(Path(out_dir)):
+        if start > done:
+            break
+        done = max(done, stop)
+    return done
+
+
+def load_results(out_dir: str | Path) -> pd.DataFrame:
+    """Relit et concatène tous les blocs écrits par run_iter dans out_dir."""
+    frames = []
+    for _, _, path in _parts(Path(out_dir)):
+        if path.suffix == ".parquet":
+            frames.append(pd.read_parquet(path))
+        else:
+            frames.append(pd.read_csv(path, index_col=0))
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames)
 
 
 # =====================================================================
@@ -132,19 +463,18 @@ class SequentialPool(BasePool):
     def __init__(
         self,
         netlist_paths: Sequence[str | Path],
-        measure_name: str = "fcut",
+        measure_name: MeasureSpec = "fcut",
+        cache: Optional[SimCache] = None,
     ) -> None:
-        super().__init__(netlist_paths, measure_name)
+        super().__init__(netlist_paths, measure_name, cache)
 
         # Liste d'instances ngspice, une par netlist.
         # Dans l'énoncé, on peut utiliser une seule netlist,
         # mais cette structure permet d'en utiliser plusieurs si besoin.
         self._instances: list[NGSpiceInstance] = []
-
-        for path in self._netlist_paths:
-            inst = NGSpiceInstance()
-            inst.load(path)
-            self._instances.append(inst)
+        # Indices des netlists rechargées avec la librairie complète du PDK
+        self._full_lib: set[int] = set()
+        self._ensure_instances()
 
     # -----------------------------------------------------------------
     #  Méthode interne pour une seule simulation
@@ -154,9 +484,9 @@ class SequentialPool(BasePool):
         self,
         inst: NGSpiceInstance,
         params: Dict[str, float],
-    ) -> float:
+    ) -> list[float]:
         """
-        Applique un jeu de paramètres à une instance ngspice et renvoie la mesure.
+        Applique un jeu de paramètres à une instance ngspice et renvoie les mesures.
 
         Paramètres
         ----------
@@ -167,8 +497,9 @@ class SequentialPool(BasePool):
 
         Retour
         ------
-        float
-            Valeur de la mesure (par ex. la fréquence de coupure).
+        list[float]
+            Valeurs de `measure_names` (par ex. la fréquence de coupure),
+            toutes lues après un seul inst.run().
         """
         # Mise à jour des paramètres SPICE
         for name, value in params.items():
@@ -177,9 +508,31 @@ class SequentialPool(BasePool):
         # Lancement de la simulation (AC, etc.)
         inst.run()
 
-        # Lecture de la mesure .meas définie dans la netlist
-        value = inst.get_measure(self._measure_name)
-        return float(value)
+        # Lecture des mesures .meas définies dans la netlist
+        return [float(inst.get_measure(name)) for name in self._measure_names]
+
+    def _ensure_instances(self) -> None:
+        """(Re)charge une instance par netlist si elles ont été arrêtées."""
+        if not self._instances:
+            for k, path in enumerate(self._netlist_paths):
+                inst = NGSpiceInstance()
+                inst.load(path if k in self._full_lib else slim_netlist(path))
+                self._instances.append(inst)
+
+    def _instance_for(self, k: int, params: Dict[str, float]) -> NGSpiceInstance:
+        """Instance de la netlist k ; rechargée avec la librairie complète si le point sort de l'extrait allégé."""
+        if k not in self._full_lib and outside_extract(self._netlist_paths[k], params):
+            self._full_lib.add(k)
+            self._instances[k].stop()
+            self._instances[k] = NGSpiceInstance()
+            self._instances[k].load(self._netlist_paths[k])
+        return self._instances[k]
+
+    def _simulate_rows(self, tasks: list[Tuple[int, Dict[str, float]]]) -> list[list[float]]:
+        """Simule les tâches une par une, les instances étant choisies en round robin."""
+        self._ensure_instances()
+        nb_insts = len(self._instances)
+        return [self._simulate_one(self._instance_for(idx % nb_insts, params), params) for idx, params in tasks]
 
     # -----------------------------------------------------------------
     #  Méthode run (interface principale)
@@ -201,40 +554,17 @@ class SequentialPool(BasePool):
             Une DataFrame avec une colonne 'fcut' (ou le nom choisi) contenant
             la valeur de la mesure pour chaque ligne d'entrée.
         """
-        if values.empty:
-            # Rien à faire, on renvoie une DataFrame vide avec la bonne colonne.
-            return pd.DataFrame({self._measure_name: []})
-
-        # Résultats de la mesure pour chaque ligne
-        results: list[float] = []
-
-        # On va utiliser les instances de ngspice de manière "round robin"
-        # (utile si on a plusieurs netlists dans self._instances).
-        nb_insts = len(self._instances)
-
         try:
-            for idx, (_, row) in enumerate(values.iterrows()):
-                # Dictionnaire {nom_param: valeur} pour cette ligne
-                params = {col: row[col] for col in values.columns}
-
-                # Choix de l'instance (si plusieurs netlists)
-                inst = self._instances[idx % nb_insts]
-
-                # Simulation et récupération de la mesure
-                value = self._simulate_one(inst, params)
-                results.append(value)
-
+            return super().run(values)
         finally:
             # On s'assure d'arrêter proprement toutes les instances ngspice
-            for inst in self._instances:
-                inst.stop()
-
-        # On renvoie les résultats dans une DataFrame,
-        # avec le même index que la DataFrame d'entrée.
-        return pd.DataFrame(
-            {self._measure_name: results},
-            index=values.index.copy(),
-        )
+            self.close()
+
+    def close(self) -> None:
+        """Arrête les instances ngspice (elles seront rechargées au besoin)."""
+        for inst in self._instances:
+            inst.stop()
+        self._instances = []
 
 
 # =====================================================================
@@ -247,81 +577,67 @@ class ParallelPool(BasePool):
     Version parallèle de l'environnement de simulation.
 
     - Utilise multiprocessing.Pool pour exécuter plusieurs simulations en parallèle.
-    - Chaque processus crée sa propre instance NGSpiceInstance.
+    - Chaque processus charge les netlists une seule fois (initialiseur) et
+      garde ses instances NGSpiceInstance d'une tâche à l'autre.
+    - Le nombre de processus dépend du nombre de CPU, pas du nombre de netlists.
+    - Les processus restent vivants entre deux appels à run() (voir close()).
     - Intéressant quand on a beaucoup de jeux de paramètres à simuler.
     """
 
     def __init__(
         self,
         netlist_paths: Sequence[str | Path],
-        measure_name: str = "fcut",
+        measure_name: MeasureSpec = "fcut",
+        cache: Optional[SimCache] = None,
+        *,
+        processes: Optional[int] = None,
+        start_method: str = "spawn",
     ) -> None:
-        super().__init__(netlist_paths, measure_name)
+        super().__init__(netlist_paths, measure_name, cache)
 
-    def run(self, values: pd.DataFrame) -> pd.DataFrame:
-        """
-        Exécute les simulations en parallèle.
+        import multiprocessing as mp
 
-        Paramètres
-        ----------
-        values : pandas.DataFrame
-            - Colonnes : noms des paramètres SPICE (R_val, C_val, ...).
-            - Lignes   : jeux de valeurs à tester.
+        self._processes: int = int(processes or mp.cpu_count() or 1)
+        self._ctx = mp.get_context(start_method)
+        self._pool: Any = None
 
-        Retour
-        ------
-        pandas.DataFrame
-            Une DataFrame avec une colonne 'fcut' (ou autre nom de mesure),
-            les lignes étant dans le même ordre que la DataFrame d'entrée.
-        """
-        import multiprocessing as mp
+    @property
+    def processes(self) -> int:
+        """Nombre de processus du pool."""
+        return self._processes
+
+    def _get_pool(self) -> Any:
+        """Crée le pool de processus au premier besoin, puis le réutilise."""
+        if self._pool is None:
+            netlists = [str(p) for p in self._netlist_paths]
+            self._pool = self._ctx.Pool(
+                processes=self._processes,
+                initializer=_init_worker,
+                initargs=(netlists,),
+            )
+        return self._pool
 
-        if values.empty:
-            return pd.DataFrame({self._measure_name: []})
+    def close(self) -> None:
+        """Arrête les processus fils (et leurs instances ngspice)."""
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
 
-        # On transforme chaque ligne de la DataFrame en "tâche" pour un worker.
-        tasks: list[Tuple[str, str, Dict[str, float], int]] = []
+    def _simulate_rows(self, tasks: list[Tuple[int, Dict[str, float]]]) -> list[list[float]]:
+        """
+        Exécute les simulations en parallèle.
 
+        imap conserve l'ordre des tâches : les mesures reviennent dans l'ordre
+        des lignes d'entrée, même si les processus terminent dans le désordre.
+        """
         netlists = [str(p) for p in self._netlist_paths]
         nb_netlists = len(netlists)
+        jobs = [(netlists[idx % nb_netlists], self._measure_names, params) for idx, params in tasks]
 
-        # Construction des tâches
-        for idx, (_, row) in enumerate(values.iterrows()):
-            # Dictionnaire {nom_param: valeur}
-            params = {col: row[col] for col in values.columns}
-
-            # Sélection d'une netlist en round robin
-            netlist_path = netlists[idx % nb_netlists]
-
-            # On stocke aussi l'indice d'origine pour reconstruire l'ordre
-            tasks.append((netlist_path, self._measure_name, params, idx))
-
-        # Fonction interne pour appeler _worker_task et transmettre l'indice
-        def _task_with_index(
-            args: Tuple[str, str, Dict[str, float], int]
-        ) -> Tuple[int, float]:
-            netlist_path_str, measure_name, params, index = args
-            value = _worker_task((netlist_path_str, measure_name, params))
-            return index, value
-
-        # Nombre de processus à utiliser
-        # On prend min(nombre de netlists, nombre de CPU)
-        n_processes = min(len(netlists), mp.cpu_count() or 1)
-
-        with mp.Pool(processes=n_processes) as pool:
-            # pool.map renvoie une liste de (index, valeur)
-            results_with_index: list[Tuple[int, float]] = pool.map(
-                _task_with_index, tasks
-            )
-
-        # On remet les résultats dans l'ordre des indices d'origine
-        results_with_index.sort(key=lambda x: x[0])
-        measures = [val for _, val in results_with_index]
-
-        return pd.DataFrame(
-            {self._measure_name: measures},
-            index=values.index.copy(),
-        )
+        pool = self._get_pool()
+        chunksize = _choose_chunksize(len(jobs), self._processes)
+        return list(pool.imap(_worker_task, jobs, chunksize))
 
 
 # =====================================================================
@@ -332,7 +648,8 @@ class ParallelPool(BasePool):
 def create_pool(
     mode: str,
     netlist_paths: Sequence[str | Path],
-    measure_name: str = "fcut",
+    measure_name: MeasureSpec = "fcut",
+    cache: Optional[SimCache] = None,
 ) -> BasePool:
     """
     Fabrique un pool en fonction du mode demandé.
@@ -343,7 +660,9 @@ def create_pool(
         - "sequential" : renvoie un SequentialPool
         - "parallel"   : renvoie un ParallelPool
     netlist_paths : liste de chemins vers les .cir
-    measure_name  : nom de la mesure SPICE (par défaut 'fcut')
+    measure_name  : nom de la mesure SPICE (par défaut 'fcut'), liste de
+                    mesures, ou None / "all" pour toutes les .meas de la netlist
+    cache         : SimCache optionnel partagé par les simulations
 
     Retour
     ------
@@ -353,8 +672,8 @@ def create_pool(
     mode = mode.lower()
 
     if mode in ("seq", "sequential"):
-        return SequentialPool(netlist_paths, measure_name)
+        return SequentialPool(netlist_paths, measure_name, cache)
     elif mode in ("par", "parallel"):
-        return ParallelPool(netlist_paths, measure_name)
+        return ParallelPool(netlist_paths, measure_name, cache)
     else:
         raise ValueError(f"Mode inconnu: {mode!r}. Utiliser 'sequential' ou 'parallel'.")
@@ -0,0 +1,278 @@
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from .design_eval import REFERENCE_DESIGN
+from .inverter_spice import INV_CHAR_NETLIST, PROJECT_ROOT
+from .netlist import netlist_fingerprint
+from .rl_env import WN_BOUNDS, WP_BOUNDS, normalize_weights, ppa_reward
+from .spice_backend import backend_name
+from .spice_pool import PyngsWorkerPool
+
+DEFAULT_MAP_PATH = PROJECT_ROOT / "results" / "ppa_map.npz"
+
+# stored metrics, interpolated in log space (all strictly positive)
+MAP_METRICS = ("tpavg", "pstatic", "area_um")
+
+# (level, ci, cj): cell ci, cj of a level-`level` grid (base * 2**level cells per axis)
+Cell = Tuple[int, int, int]
+
+
+def _map_identity() -> Dict[str, str]:
+    """What a stored map was simulated with: characterisation netlist, PDK .lib/corner and backend."""
+    return {**netlist_fingerprint(INV_CHAR_NETLIST), "backend": backend_name()}
+
+
+def pareto_mask(Y: np.ndarray) -> np.ndarray:
+    """Rows of Y (all objectives minimised) that no other row dominates. NaN rows are excluded."""
+    Y = np.asarray(Y, dtype=np.float64)
+    ok = np.all(np.isfinite(Y), axis=1)
+    mask = np.zeros(len(Y), dtype=bool)
+    idx = np.flatnonzero(ok)
+    F = Y[idx]
+    le = np.all(F[:, None, :] <= F[None, :, :], axis=2)
+    lt = np.any(F[:, None, :] < F[None, :, :], axis=2)
+    dominated = np.any(le & lt, axis=0)
+    mask[idx[~dominated]] = True
+    return mask
+
+
+class PPAMap:
+    """
+    Dense PPA lookup over the InverterEnv action box, built by adaptive refinement.
+    - simulated nodes live on a lattice of base * 2**depth cells per axis
+    - `grid` holds log(tpavg, pstatic, area) on every lattice node, bilinearly
+      interpolated inside each quadtree leaf (finer leaves and real nodes win)
+    - query()/query_many() are O(1) bilinear lookups; best_for_weights() ranks the
+      whole grid for a new weight vector without any simulation
+    """
+
+    def __init__(self, base: int, depth: int, nodes: Dict[Tuple[int, int], np.ndarray], leaves: List[Cell]) -> None:
+        self.base = int(base)
+        self.depth = int(depth)
+        self.nodes = nodes
+        self.leaves = leaves
+        self.n = self.base * 2**self.depth
+        self.lo = np.array([WN_BOUNDS[0], WP_BOUNDS[0]])
+        self.span = np.array([WN_BOUNDS[1] - WN_BOUNDS[0], WP_BOUNDS[1] - WP_BOUNDS[0]])
+        self.grid = self._fill_grid()
+
+    # ------------------------------------------------------------------ lattice
+
+    def widths(self, i: np.ndarray | int, j: np.ndarray | int) -> Tuple[Any, Any]:
+        return self.lo[0] + np.asarray(i) / self.n * self.span[0], self.lo[1] + np.asarray(j) / self.n * self.span[1]
+
+    def _fill_grid(self) -> np.ndarray:
+        grid = np.full((self.n + 1, self.n + 1, len(MAP_METRICS)), np.nan)
+        for level, ci, cj in sorted(self.leaves):
+            s = 2 ** (self.depth - level)
+            i0, j0 = ci * s, cj * s
+            corners = [self.nodes.get(k) for k in ((i0, j0), (i0 + s, j0), (i0, j0 + s), (i0 + s, j0 + s))]
+            if any(c is None for c in corners):
+                continue
+            v00, v10, v01, v11 = (np.log(c) for c in corners)
+            t = np.linspace(0.0, 1.0, s + 1)
+            u, v = t[:, None, None], t[None, :, None]
+            grid[i0 : i0 + s + 1, j0 : j0 + s + 1] = (
+                (1 - u) * (1 - v) * v00 + u * (1 - v) * v10 + (1 - u) * v * v01 + u * v * v11
+            )
+        for (i, j), val in self.nodes.items():
+            grid[i, j] = np.log(val)
+        return grid
+
+    # ------------------------------------------------------------------ queries
+
+    def query_many(self, wn: np.ndarray, wp: np.ndarray) -> np.ndarray:
+        """(N, 3) interpolated (tpavg, pstatic, area_um) at the given widths (clipped to the bounds)."""
+        x = np.clip((np.asarray(wn, dtype=np.float64) - self.lo[0]) / self.span[0], 0.0, 1.0) * self.n
+        y = np.clip((np.asarray(wp, dtype=np.float64) - self.lo[1]) / self.span[1], 0.0, 1.0) * self.n
+        i = np.minimum(x.astype(np.int64), self.n - 1)
+        j = np.minimum(y.astype(np.int64), self.n - 1)
+        u, v = (x - i)[..., None], (y - j)[..., None]
+        g = self.grid
+        out = (1 - u) * (1 - v) * g[i, j] + u * (1 - v) * g[i + 1, j]
+        out += (1 - u) * v * g[i, j + 1] + u * v * g[i + 1, j + 1]
+        return np.exp(out)
+
+    def query(self, wn_um: float, wp_um: float) -> Dict[str, float]:
+        # scalar path without array allocation (a few microseconds)
+        x = min(max((wn_um - self.lo[0]) / self.span[0], 0.0), 1.0) * self.n
+        y = min(max((wp_um - self.lo[1]) / self.span[1], 0.0), 1.0) * self.n
+        i, j = min(int(x), self.n - 1), min(int(y), self.n - 1)
+        u, v = x - i, y - j
+        cell = self.grid[i : i + 2, j : j + 2]
+        logs = (1 - u) * (1 - v) * cell[0, 0] + u * (1 - v) * cell[1, 0] + (1 - u) * v * cell[0, 1] + u * v * cell[1, 1]
+        vals = np.exp(logs)
+        return {m: float(val) for m, val in zip(MAP_METRICS, vals)}
+
+    def best_for_weights(
+        self,
+        w_delay: float,
+        w_power: float,
+        w_area: float,
+        *,
+        reference: Tuple[float, float] = REFERENCE_DESIGN,
+    ) -> Dict[str, Any]:
+        """Best lattice design for a weight vector, InverterEnv reward normalised by `reference`."""
+        refs = self.query_many(np.array([reference[0]]), np.array([reference[1]]))[0]
+        vals = np.exp(self.grid).reshape(-1, len(MAP_METRICS))
+        norm = vals / refs
+        rewards = ppa_reward(norm[:, 0], norm[:, 1], norm[:, 2], normalize_weights(w_delay, w_power, w_area))
+        k = int(np.nanargmax(rewards))
+        i, j = divmod(k, self.n + 1)
+        wn, wp = self.widths(i, j)
+        ppa = {m: float(v) for m, v in zip(MAP_METRICS, vals[k])}
+        ppa.update(delay_norm=float(norm[k, 0]), power_norm=float(norm[k, 1]), area_norm=float(norm[k, 2]))
+        return {"reward": float(rewards[k]), "wn_um": float(wn), "wp_um": float(wp), "ppa": ppa}
+
+    def pareto_front(self) -> np.ndarray:
+        """Simulated nodes on the (tpavg, pstatic, area) front: rows (wn, wp, tpavg, pstatic, area_um)."""
+        keys = np.array(list(self.nodes.keys()), dtype=np.int64).reshape(-1, 2)
+        vals = np.array(list(self.nodes.values())).reshape(-1, len(MAP_METRICS))
+        mask = pareto_mask(vals)
+        wn, wp = self.widths(keys[mask, 0], keys[mask, 1])
+        return np.column_stack([wn, wp, vals[mask]])
+
+    # ------------------------------------------------------------------ persistence
+
+    def save(self, path: str | Path) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp.npz")
+        np.savez_compressed(
+            tmp,
+            base=self.base,
+            depth=self.depth,
+            node_keys=np.array(list(self.nodes.keys()), dtype=np.int64).reshape(-1, 2),
+            node_vals=np.array(list(self.nodes.values())).reshape(-1, len(MAP_METRICS)),
+            leaves=np.array(self.leaves, dtype=np.int64).reshape(-1, 3),
+            bounds=np.array([WN_BOUNDS, WP_BOUNDS]),
+            identity=np.array(json.dumps(_map_identity(), sort_keys=True)),
+        )
+        os.replace(tmp, path)
+        return path
+
+    @classmethod
+    def load(cls, path: str | Path) -> "PPAMap":
+        with np.load(path) as z:
+            if not np.allclose(z["bounds"], [WN_BOUNDS, WP_BOUNDS]):
+                raise ValueError(f"{path}: PPA map was built for other action bounds")
+            stored = json.loads(str(z["identity"])) if "identity" in z.files else {}
+            changed = [k for k, v in _map_identity().items() if stored.get(k) != v]
+            if changed:
+                raise ValueError(f"{path}: PPA map was built with another {'/'.join(changed)}, rebuild it")
+            nodes = {(int(i), int(j)): v for (i, j), v in zip(z["node_keys"], z["node_vals"])}
+            leaves = [(int(a), int(b), int(c)) for a, b, c in z["leaves"]]
+            return cls(int(z["base"]), int(z["depth"]), nodes, leaves)
+
+
+def _corners(cell: Cell, depth: int) -> List[Tuple[int, int]]:
+    level, ci, cj = cell
+    s = 2 ** (depth - level)
+    return [(ci * s, cj * s), ((ci + 1) * s, cj * s), (ci * s, (cj + 1) * s), ((ci + 1) * s, (cj + 1) * s)]
+
+
+def _children(cell: Cell) -> List[Cell]:
+    level, ci, cj = cell
+    return [(level + 1, 2 * ci + a, 2 * cj + b) for a in (0, 1) for b in (0, 1)]
+
+
+def build_ppa_map(
+    pool: PyngsWorkerPool,
+    *,
+    base: int = 8,
+    max_depth: int = 4,
+    tol: float = 0.1,
+    max_sims: int = 3000,
+    near_front: bool = True,
+    verbose: bool = False,
+) -> PPAMap:
+    """
+    Adaptive sweep: start from a (base+1)^2 grid, then split quadtree cells level by level.
+    - a cell is split when log tpavg or log pstatic varies by more than log(1 + tol)
+      across its corners, or when one of its corners is on the current Pareto front
+    - each level is one measure_many() batch on the pool; failed points stay NaN
+    - splits are prioritised by variation (front cells first) when max_sims would be exceeded
+    """
+    n = base * 2**max_depth
+    lo = np.array([WN_BOUNDS[0], WP_BOUNDS[0]])
+    span = np.array([WN_BOUNDS[1] - WN_BOUNDS[0], WP_BOUNDS[1] - WP_BOUNDS[0]])
+    nodes: Dict[Tuple[int, int], np.ndarray] = {}
+
+    def evaluate(keys: Sequence[Tuple[int, int]]) -> None:
+        keys = [k for k in dict.fromkeys(keys) if k not in nodes]
+        if not keys:
+            return
+        pts = [tuple(lo + np.array(k) / n * span) for k in keys]
+        results = pool.measure_many(pts, return_exceptions=True)
+        for k, (wn, wp), r in zip(keys, pts, results):
+            if isinstance(r, Exception):
+                nodes[k] = np.full(len(MAP_METRICS), np.nan)
+            else:
+                nodes[k] = np.array([float(r["tpavg"]), float(r["pstatic"]), float(wn + wp)])
+
+    leaves: List[Cell] = [(0, ci, cj) for ci in range(base) for cj in range(base)]
+    evaluate([k for c in leaves for k in _corners(c, max_depth)])
+
+    thresh = np.log1p(tol)
+    for level in range(max_depth):
+        front: set = set()
+        if near_front:
+            keys = list(nodes.keys())
+            mask = pareto_mask(np.array([nodes[k] for k in keys]))
+            front = {k for k, m in zip(keys, mask) if m}
+
+        scored: List[Tuple[float, Cell]] = []
+        for cell in leaves:
+            if cell[0] != level:
+                continue
+            corners = _corners(cell, max_depth)
+            logs = np.log(np.array([nodes[k][:2] for k in corners]))
+            if not np.all(np.isfinite(logs)):
+                continue
+            variation = float(np.max(logs.max(axis=0) - logs.min(axis=0)))
+            on_front = any(k in front for k in corners)
+            if variation > thresh or on_front:
+                scored.append((variation + (np.inf if on_front else 0.0), cell))
+
+        scored.sort(key=lambda t: -t[0])
+        budget = max_sims - len(nodes)
+        split: List[Cell] = []
+        new_keys: set = set()
+        for _, cell in scored:
+            keys = {k for c in _children(cell) for k in _corners(c, max_depth)} - set(nodes)
+            if len(new_keys | keys) > budget:
+                break
+            new_keys |= keys
+            split.append(cell)
+        if not split:
+            break
+
+        evaluate(sorted(new_keys))
+        split_set = set(split)
+        leaves = [c for c in leaves if c not in split_set] + [ch for c in split for ch in _children(c)]
+        if verbose:
+            print(f"[ppa_map] level {level + 1}: split {len(split)} cells, {len(nodes)} sims", flush=True)
+
+    return PPAMap(base, max_depth, nodes, leaves)
+
+
+def main() -> None:
+    pool = PyngsWorkerPool(os.cpu_count() or 1)
+    try:
+        ppa_map = build_ppa_map(pool, verbose=True)
+    finally:
+        pool.close()
+    path = ppa_map.save(DEFAULT_MAP_PATH)
+    print(f"{len(ppa_map.nodes)} simulated points -> {path}")
+    best = ppa_map.best_for_weights(1.0, 1.0, 1.0)
+    print(f"best (1/1/1): Wn = {best['wn_um']:.3f} µm, Wp = {best['wp_um']:.3f} µm, reward = {best['reward']:.6f}")
+
+
+if __name__ == "__main__":
+    main()
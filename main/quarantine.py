@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import math
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from .inverter_spice import INV_CHAR_NETLIST
+from .sim_cache import PROJECT_ROOT, design_scope
+from .sqlite_store import SQLiteStore
+
+DEFAULT_QUARANTINE_PATH = PROJECT_ROOT / "results" / "quarantine.sqlite"
+
+
+class FailureQuarantine(SQLiteStore):
+    """
+    Memory of the (wn, wp) points where ngspice failed or hung, and of the region around them.
+    - every real simulation outcome (never a cache hit or surrogate answer) is counted on a grid
+      in (log wn, log wp), cell = radius / 2, one row per cell in SQLite (SQLiteStore: WAL, one
+      connection per process); SubprocVecEnv children, pools and later runs share the store
+    - failure region: Gaussian-kernel estimate over the grid, p(fail) = F / (F + S + prior),
+      F and S the kernel-weighted failure and success counts around the point
+    - check() is True (skip the simulation, apply the failure penalty) when p(fail) >= threshold
+      and F >= min_evidence: with no success around, a single failure covers about one radius
+    - every probe_every-th blocked request in a cell goes through anyway, so a transient
+      failure is cleared by the successes of the re-probes
+    - one scope per netlist/PDK/corner, bias point and backend: other circuits never match
+    """
+
+    def __init__(
+        self,
+        path: str | Path | None = DEFAULT_QUARANTINE_PATH,
+        *,
+        netlist_path: str | Path = INV_CHAR_NETLIST,
+        vdd: float = 1.8,
+        lch_um: float = 0.15,
+        radius: float = 0.05,
+        threshold: float = 0.5,
+        min_evidence: float = 0.5,
+        prior: float = 0.5,
+        probe_every: int = 20,
+        refresh_s: float = 2.0,
+    ) -> None:
+        super().__init__(path)
+        self.radius = float(radius)
+        self.threshold = float(threshold)
+        self.min_evidence = float(min_evidence)
+        self.prior = float(prior)
+        self.probe_every = int(probe_every)
+        self.refresh_s = float(refresh_s)
+
+        # the grid is part of the scope: cells of another radius do not line up
+        self.scope = design_scope(netlist_path, vdd=vdd, lch_um=lch_um, radius=radius)
+
+        self.blocked = 0
+        self.probes = 0
+        self.failures = 0
+        self.successes = 0
+
+        # (i, j) -> [failures, successes]
+        self._cells: Dict[Tuple[int, int], List[int]] = {}
+        self._blocked_in: Dict[Tuple[int, int], int] = {}
+        # highest cell version read from the store
+        self._last_seq = 0
+        self._synced = 0.0
+
+    def _fresh_state(self) -> Dict[str, Any]:
+        return {"_cells": {}, "_blocked_in": {}, "_last_seq": 0, "_synced": 0.0}
+
+    def _schema(self, conn: sqlite3.Connection) -> None:
+        # one row per grid cell: counts are aggregated in place, the store stays bounded
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cells ("
+            "scope TEXT NOT NULL, i INTEGER NOT NULL, j INTEGER NOT NULL, "
+            "fails INTEGER NOT NULL, oks INTEGER NOT NULL, error TEXT NOT NULL, "
+            "seq INTEGER NOT NULL, updated REAL NOT NULL, PRIMARY KEY (scope, i, j))"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS cells_seq ON cells (scope, seq)")
+
+    # ------------------------------------------------------------------ grid
+
+    def _cell(self, wn_um: float, wp_um: float) -> Tuple[int, int]:
+        h = self.radius / 2
+        return int(math.floor(math.log(wn_um) / h)), int(math.floor(math.log(wp_um) / h))
+
+    def _count(self, wn_um: float, wp_um: float, ok: bool) -> None:
+        c = self._cells.setdefault(self._cell(wn_um, wp_um), [0, 0])
+        c[1 if ok else 0] += 1
+
+    def _sync(self, conn: sqlite3.Connection) -> None:
+        # cells other writers (or we) changed since the last read; their counts are absolute
+        rows = conn.execute(
+            "SELECT i, j, fails, oks, seq FROM cells WHERE scope = ? AND seq > ? ORDER BY seq",
+            (self.scope, self._last_seq),
+        ).fetchall()
+        for i, j, fails, oks, seq in rows:
+            self._cells[(i, j)] = [int(fails), int(oks)]
+            self._last_seq = seq
+        self._synced = time.monotonic()
+
+    def _refresh(self) -> None:
+        if time.monotonic() - self._synced < self.refresh_s:
+            return
+        conn = self._db()
+        if conn is None:
+            return
+        try:
+            self._sync(conn)
+        except sqlite3.Error:
+            # a busy store only delays what other processes learnt
+            pass
+
+    def _evidence(self, wn_um: float, wp_um: float) -> Tuple[float, float]:
+        """Kernel-weighted (failures, successes) around a point."""
+        h = self.radius / 2
+        x, y = math.log(wn_um), math.log(wp_um)
+        i0, j0 = self._cell(wn_um, wp_um)
+        span = int(math.ceil(3 * self.radius / h))
+        fails = oks = 0.0
+        for i in range(i0 - span, i0 + span + 1):
+            for j in range(j0 - span, j0 + span + 1):
+                c = self._cells.get((i, j))
+                if c is None:
+                    continue
+                d2 = (x - (i + 0.5) * h) ** 2 + (y - (j + 0.5) * h) ** 2
+                w = math.exp(-0.5 * d2 / self.radius**2)
+                fails += w * c[0]
+                oks += w * c[1]
+        return fails, oks
+
+    # ------------------------------------------------------------------ API
+
+    def p_fail(self, wn_um: float, wp_um: float) -> float:
+        """Estimated probability that a simulation at (wn, wp) fails (0 with no failure around)."""
+        with self._lock:
+            self._refresh()
+            fails, oks = self._evidence(float(wn_um), float(wp_um))
+        return fails / (fails + oks + self.prior) if fails > 0 else 0.0
+
+    def check(self, wn_um: float, wp_um: float) -> bool:
+        """True if (wn, wp) lies in a known failure region and is not due for a re-probe."""
+        wn_um, wp_um = float(wn_um), float(wp_um)
+        with self._lock:
+            self._refresh()
+            fails, oks = self._evidence(wn_um, wp_um)
+            if fails < self.min_evidence or fails / (fails + oks + self.prior) < self.threshold:
+                return False
+            cell = self._cell(wn_um, wp_um)
+            n = self._blocked_in.get(cell, 0) + 1
+            self._blocked_in[cell] = n
+            if self.probe_every > 0 and n % self.probe_every == 0:
+                self.probes += 1
+                return False
+            self.blocked += 1
+            return True
+
+    def record(self, wn_um: float, wp_um: float, ok: bool, *, error: str = "") -> None:
+        """Log the outcome of a real simulation (not a cache or surrogate answer)."""
+        wn_um, wp_um = float(wn_um), float(wp_um)
+        if not (wn_um > 0 and wp_um > 0):
+            return
+        with self._lock:
+            if ok:
+                self.successes += 1
+            else:
+                self.failures += 1
+            conn = self._db()
+            if conn is None:
+                self._count(wn_um, wp_um, ok)
+                return
+            i, j = self._cell(wn_um, wp_um)
+            try:
+                conn.execute(
+                    "INSERT INTO cells (scope, i, j, fails, oks, error, seq, updated) "
+                    "VALUES (?, ?, ?, ?, ?, ?, (SELECT COALESCE(MAX(seq), 0) + 1 FROM cells WHERE scope = ?), ?) "
+                    "ON CONFLICT (scope, i, j) DO UPDATE SET fails = fails + excluded.fails, "
+                    "oks = oks + excluded.oks, error = CASE WHEN excluded.error = '' THEN error "
+                    "ELSE excluded.error END, seq = excluded.seq, updated = excluded.updated",
+                    (self.scope, i, j, int(not ok), int(ok), error[:200], self.scope, time.time()),
+                )
+                # read our cell back together with anything other writers changed meanwhile
+                self._sync(conn)
+            except sqlite3.Error:
+                # a busy/locked store must never fail a simulation
+                self._count(wn_um, wp_um, ok)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            n_bad = sum(1 for c in self._cells.values() if c[0] > 0)
+            return {
+                "blocked": float(self.blocked),
+                "probes": float(self.probes),
+                "failures": float(self.failures),
+                "successes": float(self.successes),
+                "failure_cells": float(n_bad),
+            }
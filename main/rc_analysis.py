@@ -2,9 +2,10 @@ from __future__ import annotations
 
 from math import pi
 from pathlib import Path
-from typing import Iterable, Tuple, Dict, Any
+from typing import Iterable, Tuple, Dict, Any, Optional
 
-from pyngs.core import NGSpiceInstance
+from .sim_cache import SimCache
+from .spice_backend import NGSpiceInstance
 
 
 # Chemin du netlist RC
@@ -17,28 +18,44 @@ def theoretical_cutoff(R: float, C: float) -> float:
     return 1.0 / (2.0 * pi * R * C)
 
 
-def sweep_cutoff(rc_values: Iterable[Tuple[float, float]]) -> list[Dict[str, Any]]:
+def sweep_cutoff(
+    rc_values: Iterable[Tuple[float, float]],
+    cache: Optional[SimCache] = None,
+) -> list[Dict[str, Any]]:
     """
     Pour chaque couple (R, C), lance ngspice via pyngs, récupère la mesure f_cutoff
     et renvoie une liste de dictionnaires avec théorie + mesure.
+    Si un cache est fourni, les couples déjà simulés ne relancent pas ngspice.
     """
     inst = NGSpiceInstance()
     results: list[Dict[str, Any]] = []
+    loaded = False
 
     try:
-        # Charger le netlist une seule fois
-        inst.load(NETLIST_PATH)
-
         for R, C in rc_values:
-            # Met à jour les paramètres du netlist
-            inst.set_parameter("Rval", R)
-            inst.set_parameter("Cval", C)
-
-            # Lance la simulation AC
-            inst.run()
-
-            # Récupère la mesure .meas f_cutoff définie dans le netlist
-            f_meas = inst.get_measure("f_cutoff")
+            params = {"Rval": float(R), "Cval": float(C)}
+            key = None if cache is None else cache.key(NETLIST_PATH, params, tag="f_cutoff")
+            hit = None if key is None else cache.get(key)
+
+            if hit is not None:
+                f_meas = hit["f_cutoff"]
+            else:
+                # Charger le netlist une seule fois (et seulement si besoin)
+                if not loaded:
+                    inst.load(NETLIST_PATH)
+                    loaded = True
+
+                # Met à jour les paramètres du netlist
+                inst.set_parameter("Rval", R)
+                inst.set_parameter("Cval", C)
+
+                # Lance la simulation AC
+                inst.run()
+
+                # Récupère la mesure .meas f_cutoff définie dans le netlist
+                f_meas = inst.get_measure("f_cutoff")
+                if key is not None:
+                    cache.put(key, {"f_cutoff": float(f_meas)})
 
             # Calcule la valeur théorique
             f_th = theoretical_cutoff(R, C)
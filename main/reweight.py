@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+import numpy as np
+
+from .design_eval import REFERENCE_DESIGN
+from .rl_env import normalize_weights, ppa_reward
+
+# column arrays as returned by ParetoArchive.points()
+Points = Mapping[str, np.ndarray]
+
+
+def reference_metrics(points: Points, reference: Tuple[float, float] = REFERENCE_DESIGN) -> np.ndarray:
+    """(tpavg, pstatic, area) of the stored point closest (log widths) to the reference design."""
+    d = np.hypot(np.log(points["wn_um"] / reference[0]), np.log(points["wp_um"] / reference[1]))
+    k = int(np.argmin(d))
+    return np.array([points["tpavg"][k], points["pstatic"][k], points["area_um"][k]])
+
+
+def rank_points(
+    points: Points,
+    w_delay: float,
+    w_power: float,
+    w_area: float,
+    *,
+    refs: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """InverterEnv reward of every stored point for a weight vector (vectorised, no simulation)."""
+    if refs is None:
+        refs = reference_metrics(points)
+    weights = normalize_weights(w_delay, w_power, w_area)
+    return ppa_reward(points["tpavg"] / refs[0], points["pstatic"] / refs[1], points["area_um"] / refs[2], weights)
+
+
+def local_support(points: Points, wn_um: float, wp_um: float, *, radius: float = 0.15) -> int:
+    """Number of distinct designs (wn, wp) stored within `radius` (log widths) of a design."""
+    d = np.hypot(np.log(points["wn_um"] / wn_um), np.log(points["wp_um"] / wp_um))
+    near = d <= radius
+    # a design measured several times (re-runs, other fidelities) is one sample of the region
+    return int(len(np.unique(np.stack([points["wn_um"][near], points["wp_um"][near]], axis=1), axis=0)))
+
+
+def reweight(
+    points: Points,
+    w_delay: float,
+    w_power: float,
+    w_area: float,
+    *,
+    top: int = 10,
+    radius: float = 0.15,
+    min_support: int = 5,
+) -> Dict[str, Any]:
+    """
+    Best stored design for new weights, plus whether the store covers that region.
+    - rewards normalised by the stored point nearest to the InverterEnv start point
+    - covered: at least `min_support` distinct designs within `radius` of the best design, i.e. the
+      optimum was sampled densely rather than hit once at the edge of explored space
+    """
+    n = len(points["tpavg"])
+    if n == 0:
+        return {"best": None, "top": np.empty(0, dtype=np.int64), "rewards": np.empty(0), "covered": False, "support": 0}
+
+    rewards = rank_points(points, w_delay, w_power, w_area)
+    order = np.argsort(-rewards)[:top]
+    k = int(order[0])
+    support = local_support(points, float(points["wn_um"][k]), float(points["wp_um"][k]), radius=radius)
+    best = {
+        "reward": float(rewards[k]),
+        "wn_um": float(points["wn_um"][k]),
+        "wp_um": float(points["wp_um"][k]),
+        "ppa": {m: float(points[m][k]) for m in ("tpavg", "pstatic", "area_um")},
+    }
+    return {"best": best, "top": order, "rewards": rewards, "covered": support >= min_support, "support": support}
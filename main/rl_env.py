@@ -1,13 +1,40 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Any, Dict, Tuple
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
 
 import gymnasium as gym
 import numpy as np
 from gymnasium import spaces
 
+from .adaptive_window import AdaptiveWindowRunner
+from .fidelity import MultiFidelityRunner
 from .inverter_spice import InverterSpiceRunner
+from .pareto import ParetoArchive
+from .quarantine import FailureQuarantine
+from .sim_cache import SimCache
+from .surrogate import SurrogateRunner
+from .worker_health import merge_stats
+
+
+# action bounds in µm, shared by every env flavour and optimizer
+WN_BOUNDS = (0.24, 5.0)
+WP_BOUNDS = (0.48, 10.0)
+
+
+def normalize_weights(w_delay: float, w_power: float, w_area: float) -> Tuple[float, float, float]:
+    """PPA weights scaled to sum to 1 (uniform if they do not sum to a positive value)."""
+    wsum = float(w_delay) + float(w_power) + float(w_area)
+    if wsum <= 0:
+        return 1.0 / 3.0, 1.0 / 3.0, 1.0 / 3.0
+    return float(w_delay) / wsum, float(w_power) / wsum, float(w_area) / wsum
+
+
+def ppa_reward(delay_norm: Any, power_norm: Any, area_norm: Any, weights: Tuple[float, float, float]) -> Any:
+    """Weighted PPA reward on normalised metrics (floats or numpy arrays)."""
+    wd, wpw, wa = weights
+    return -(wd * delay_norm + wpw * power_norm + wa * area_norm)
 
 
 @dataclass
@@ -27,33 +54,43 @@ class InverterEnv(gym.Env):
         w_area: float = 1.0,
         max_steps: int = 40,
         *,
-        restart_every: int = 50,
+        restart_every: int | None = None,
+        recycle: str = "health",
         sim_fail_penalty: float = -1_000.0,
+        cache_path: str | Path | None = None,
+        surrogate: bool = False,
+        surrogate_threshold: float = 0.05,
+        surrogate_validate_every: int = 20,
+        multi_fidelity: bool = False,
+        promote_margin: float = 0.1,
+        adaptive_window: bool = False,
+        archive_path: str | Path | None = None,
+        quarantine_path: str | Path | None = None,
+        weight_conditioned: bool = False,
+        weight_concentration: float = 1.0,
     ) -> None:
         super().__init__()
 
-        self.WN_MIN = 0.24
-        self.WN_MAX = 5.0
-        self.WP_MIN = 0.48
-        self.WP_MAX = 10.0
+        self.WN_MIN, self.WN_MAX = WN_BOUNDS
+        self.WP_MIN, self.WP_MAX = WP_BOUNDS
 
         self.action_space = spaces.Box(
             low=np.array([self.WN_MIN, self.WP_MIN], dtype=np.float32),
             high=np.array([self.WN_MAX, self.WP_MAX], dtype=np.float32),
             dtype=np.float32,
         )
-        self.observation_space = spaces.Box(low=0.0, high=5.0, shape=(5,), dtype=np.float32)
+        # weight_conditioned: PPA weights drawn per episode (Dirichlet) and appended to the observation,
+        # so one policy covers every weight vector; the constructor weights stay the reference for get_best()
+        self.weight_conditioned = bool(weight_conditioned)
+        self.weight_concentration = float(weight_concentration)
+        n_obs = 8 if self.weight_conditioned else 5
+        self.observation_space = spaces.Box(low=0.0, high=5.0, shape=(n_obs,), dtype=np.float32)
 
         self.w_delay = float(w_delay)
         self.w_power = float(w_power)
         self.w_area = float(w_area)
-        wsum = self.w_delay + self.w_power + self.w_area
-        if wsum <= 0:
-            self._wd = self._wpw = self._wa = 1.0 / 3.0
-        else:
-            self._wd = self.w_delay / wsum
-            self._wpw = self.w_power / wsum
-            self._wa = self.w_area / wsum
+        self._wd, self._wpw, self._wa = normalize_weights(self.w_delay, self.w_power, self.w_area)
+        self._ep_weights = (self._wd, self._wpw, self._wa)
 
         self.max_steps = int(max_steps)
         self.sim_fail_penalty = float(sim_fail_penalty)
@@ -64,9 +101,52 @@ class InverterEnv(gym.Env):
         self._targets: PPATargets | None = None
         self._rng = np.random.default_rng()
         self._best: Dict[str, Any] | None = None
+        self._obs: np.ndarray | None = None
 
         # IMPORTANT: in-proc runner (no child process) -> compatible with SubprocVecEnv
-        self._spice = InverterSpiceRunner(restart_every=restart_every, debug=False)
+        # cache_path: shared SQLite store, each SubprocVecEnv child opens its own connection
+        cache = SimCache(cache_path) if cache_path is not None else None
+        # restart_every: interval of recycle="count" (default 50); with "health"/"auto" only
+        # given explicitly, as a cap on the runs per simulator instance
+        if restart_every is None and recycle == "count":
+            restart_every = 50
+        # adaptive_window: transient stimulus/stop/max step sized from the estimated delay
+        self._spice: Any
+        if adaptive_window:
+            self._spice = AdaptiveWindowRunner(restart_every=restart_every, recycle=recycle, cache=cache)
+        else:
+            self._spice = InverterSpiceRunner(restart_every=restart_every, recycle=recycle, debug=False, cache=cache)
+        self._runner: Any = self._spice
+        # every simulator of this env, for get_health_stats()
+        self._sim_runners: List[Any] = [self._spice]
+
+        # optional Pareto archive of every real measurement (shared SQLite store)
+        self._archive = ParetoArchive(archive_path) if archive_path is not None else None
+
+        # optional quarantine: points in a known failure region get the penalty without a simulation
+        self._quarantine = FailureQuarantine(quarantine_path) if quarantine_path is not None else None
+
+        # optional multi-fidelity: coarse transient first, full resolution only near the front
+        self._fidelity: MultiFidelityRunner | None = None
+        if multi_fidelity:
+            coarse = InverterSpiceRunner(
+                restart_every=restart_every, recycle=recycle, debug=False, cache=cache, fidelity="coarse"
+            )
+            self._sim_runners.append(coarse)
+            self._fidelity = MultiFidelityRunner(
+                coarse, self._spice, weights=(self._wd, self._wpw, self._wa), margin=promote_margin
+            )
+            self._runner = self._fidelity
+
+        # optional GP surrogate: SPICE only when the model is uncertain (+ periodic spot-checks)
+        self._surrogate: SurrogateRunner | None = None
+        if surrogate:
+            self._surrogate = SurrogateRunner(
+                self._runner,
+                bounds=((self.WN_MIN, self.WN_MAX), (self.WP_MIN, self.WP_MAX)),
+                threshold=surrogate_threshold,
+                validate_every=surrogate_validate_every,
+            )
 
     def _clip_widths(self, wn: float, wp: float) -> Tuple[float, float]:
         return float(np.clip(wn, self.WN_MIN, self.WN_MAX)), float(np.clip(wp, self.WP_MIN, self.WP_MAX))
@@ -90,12 +170,29 @@ class InverterEnv(gym.Env):
             "sim_ok": 0.0,
         }
 
-    def _compute_ppa(self, wn: float, wp: float) -> Dict[str, float]:
+    def _compute_ppa(self, wn: float, wp: float, *, exact: bool = False) -> Dict[str, Any]:
+        if self._quarantine is not None and self._quarantine.check(wn, wp):
+            return {**self._default_ppa(wn, wp), "quarantined": 1.0}
         try:
-            data = self._spice.measure(wn, wp)
-        except Exception:
+            if exact:
+                data = self._spice.measure(wn, wp)
+            elif self._surrogate is not None:
+                data = self._surrogate.measure(wn, wp)
+            else:
+                data = self._runner.measure(wn, wp)
+        except Exception as exc:
+            if self._quarantine is not None:
+                self._quarantine.record(wn, wp, False, error=f"{type(exc).__name__}: {exc}")
             return self._default_ppa(wn, wp)
 
+        # only real simulations are evidence: no surrogate answer, no cache hit
+        real = float(data.get("surrogate", 0.0)) < 0.5 and float(data.get("cached", 0.0)) < 0.5
+        if self._quarantine is not None and real:
+            self._quarantine.record(wn, wp, True)
+
+        if self._archive is not None and real:
+            self._archive.add(wn, wp, data, source="rl")
+
         tpavg = float(data["tpavg"])
         pstatic = float(data["pstatic"])
         area_um = float(data["area_um"])
@@ -121,23 +218,74 @@ class InverterEnv(gym.Env):
             "power_norm": pstatic / p_ref,
             "area_norm": area_um / a_ref,
             "sim_ok": 1.0,
+            "surrogate": float(data.get("surrogate", 0.0)),
+            "fidelity": str(data.get("fidelity", "full")),
         }
 
-    def _make_obs(self, wn: float, wp: float, ppa: Dict[str, float]) -> np.ndarray:
+    def _make_obs(self, wn: float, wp: float, ppa: Dict[str, Any]) -> np.ndarray:
         wn_norm, wp_norm = self._norm_width(wn, wp)
-        return np.array([wn_norm, wp_norm, ppa["delay_norm"], ppa["power_norm"], ppa["area_norm"]], dtype=np.float32)
+        obs = [wn_norm, wp_norm, ppa["delay_norm"], ppa["power_norm"], ppa["area_norm"]]
+        if self.weight_conditioned:
+            obs.extend(self._ep_weights)
+        return np.array(obs, dtype=np.float32)
 
-    def _compute_reward(self, ppa: Dict[str, float]) -> float:
+    def _compute_reward(self, ppa: Dict[str, Any], weights: Tuple[float, float, float] | None = None) -> float:
         if float(ppa.get("sim_ok", 1.0)) < 0.5:
             return float(self.sim_fail_penalty)
         d = float(ppa["delay_norm"])
         p = float(ppa["power_norm"])
         a = float(ppa["area_norm"])
-        return -float(self._wd * d + self._wpw * p + self._wa * a)
+        return float(ppa_reward(d, p, a, weights or (self._wd, self._wpw, self._wa)))
+
+    def _sample_weights(self, options: Dict[str, Any] | None) -> Tuple[float, float, float]:
+        """Episode weights: options["weights"] if given, else a Dirichlet draw."""
+        if options is not None and options.get("weights") is not None:
+            return normalize_weights(*options["weights"])
+        w = self._rng.dirichlet(np.full(3, self.weight_concentration))
+        return float(w[0]), float(w[1]), float(w[2])
 
     def get_best(self) -> Dict[str, Any] | None:
         return self._best
 
+    def get_surrogate_stats(self) -> Dict[str, float] | None:
+        return None if self._surrogate is None else self._surrogate.stats()
+
+    def get_fidelity_stats(self) -> Dict[str, float] | None:
+        return None if self._fidelity is None else self._fidelity.stats()
+
+    def get_health_stats(self) -> Dict[str, Any] | None:
+        return merge_stats([r.health_stats() for r in self._sim_runners])
+
+    def get_quarantine_stats(self) -> Dict[str, float] | None:
+        return None if self._quarantine is None else self._quarantine.stats()
+
+    def get_state(self) -> Dict[str, Any]:
+        """Episode state for checkpoints (RNG, widths, normalisation references, best point, last obs)."""
+        t = self._targets
+        return {
+            "rng": self._rng.bit_generator.state,
+            "wn": self._wn,
+            "wp": self._wp,
+            "step_count": self._step_count,
+            "refs": None if t is None else [t.delay_ref, t.power_ref, t.area_ref],
+            "best": self._best,
+            "ep_weights": self._ep_weights,
+            "obs": None if self._obs is None else self._obs.copy(),
+        }
+
+    def set_state(self, state: Dict[str, Any]) -> np.ndarray | None:
+        """Restore get_state(); returns the observation to continue the episode from."""
+        self._rng.bit_generator.state = state["rng"]
+        self._wn, self._wp = float(state["wn"]), float(state["wp"])
+        self._step_count = int(state["step_count"])
+        self._targets = None if state["refs"] is None else PPATargets(*(float(r) for r in state["refs"]))
+        self._best = state["best"]
+        self._ep_weights = tuple(state["ep_weights"])
+        if self._fidelity is not None and self.weight_conditioned:
+            self._fidelity.weights = self._ep_weights
+        self._obs = state["obs"]
+        return self._obs
+
     def reset(self, *, seed: int | None = None, options: Dict[str, Any] | None = None):
         super().reset(seed=seed)
         if seed is not None:
@@ -147,12 +295,18 @@ class InverterEnv(gym.Env):
         self._targets = None
         self._best = None
 
+        if self.weight_conditioned:
+            self._ep_weights = self._sample_weights(options)
+            if self._fidelity is not None:
+                self._fidelity.weights = self._ep_weights
+
         self._wn = float(self._rng.uniform(0.3, 1.2))
         self._wp = float(self._rng.uniform(0.6, 2.4))
         self._wn, self._wp = self._clip_widths(self._wn, self._wp)
 
         ppa = self._compute_ppa(self._wn, self._wp)
         obs = self._make_obs(self._wn, self._wp, ppa)
+        self._obs = obs
         return obs, {"wn_um": self._wn, "wp_um": self._wp, "ppa": ppa}
 
     def step(self, action: np.ndarray):
@@ -161,23 +315,45 @@ class InverterEnv(gym.Env):
         self._wn, self._wp = self._clip_widths(float(a[0]), float(a[1]))
 
         ppa = self._compute_ppa(self._wn, self._wp)
+        score = self._compute_reward(ppa)
+
+        approx = ppa.get("surrogate", 0.0) > 0.5 or ppa.get("fidelity", "full") != "full"
+        if approx and (self._best is None or float(score) > float(self._best["reward"])):
+            # never keep a surrogate/coarse result as best design: confirm it at full fidelity
+            ppa = self._compute_ppa(self._wn, self._wp, exact=True)
+            score = self._compute_reward(ppa)
+
+        # score: constructor weights (get_best), reward: episode weights (what the policy learns)
+        reward = self._compute_reward(ppa, self._ep_weights) if self.weight_conditioned else score
+
         obs = self._make_obs(self._wn, self._wp, ppa)
-        reward = self._compute_reward(ppa)
+        self._obs = obs
 
         terminated = bool(self._step_count >= self.max_steps)
         truncated = bool(float(ppa.get("sim_ok", 1.0)) < 0.5)
 
         info: Dict[str, Any] = {"wn_um": self._wn, "wp_um": self._wp, "ppa": ppa}
+        if self.weight_conditioned:
+            info["weights"] = self._ep_weights
 
         if not truncated:
-            if self._best is None or float(reward) > float(self._best["reward"]):
-                self._best = {"reward": float(reward), "wn_um": float(self._wn), "wp_um": float(self._wp), "ppa": ppa}
+            if self._best is None or float(score) > float(self._best["reward"]):
+                self._best = {"reward": float(score), "wn_um": float(self._wn), "wp_um": float(self._wp), "ppa": ppa}
 
         return obs, float(reward), terminated, truncated, info
 
     def close(self):
         try:
-            self._spice.close()
+            if self._fidelity is not None:
+                self._fidelity.close()
+            else:
+                self._spice.close()
         except Exception:
             pass
+        if self._spice.cache is not None:
+            self._spice.cache.close()
+        if self._archive is not None:
+            self._archive.close()
+        if self._quarantine is not None:
+            self._quarantine.close()
         return super().close()
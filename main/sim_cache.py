@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import sqlite3
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Mapping, Optional
+
+from .netlist import netlist_fingerprint
+from .spice_backend import backend_name
+from .sqlite_store import SQLiteStore
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_CACHE_PATH = PROJECT_ROOT / "results" / "sim_cache.sqlite"
+
+
+def quantize(value: float, sig_digits: int = 6) -> float:
+    """Round to `sig_digits` significant digits so float noise maps to the same key."""
+    value = float(value)
+    if value == 0.0 or not math.isfinite(value):
+        return value
+    return float(f"{value:.{sig_digits - 1}e}")
+
+
+def design_scope(netlist_path: str | Path, *, vdd: float, lch_um: float, **extra: float) -> str:
+    """
+    Short hash naming the population a stored design point belongs to: netlist, PDK .lib,
+    corner, bias point and backend (+ `extra`). Stores filter on it, so stand-in results or
+    points of an older deck never mix with the current SPICE ones.
+    """
+    payload = {
+        **netlist_fingerprint(netlist_path),
+        "vdd": quantize(vdd),
+        "lch": quantize(lch_um),
+        "backend": backend_name(),
+        **{k: quantize(v) for k, v in extra.items()},
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()[:16]
+
+
+class SimCache(SQLiteStore):
+    """
+    Content-addressed cache of SPICE results.
+    - key = netlist hash + PDK .lib hash + corner + quantized parameters (+ tag)
+    - in-memory LRU in front of an optional SQLite store (SQLiteStore: WAL, one connection
+      per process, picklable)
+    """
+
+    def __init__(
+        self,
+        path: str | Path | None = DEFAULT_CACHE_PATH,
+        *,
+        max_items: int = 4096,
+        sig_digits: int = 6,
+    ) -> None:
+        super().__init__(path)
+        self.max_items = int(max_items)
+        self.sig_digits = int(sig_digits)
+
+        self.hits = 0
+        self.misses = 0
+
+        self._lru: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    def _fresh_state(self) -> Dict[str, Any]:
+        return {"_lru": OrderedDict()}
+
+    def _schema(self, conn: sqlite3.Connection) -> None:
+        conn.execute("CREATE TABLE IF NOT EXISTS sims (key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)")
+
+    def key(self, netlist_path: str | Path, params: Mapping[str, float], *, tag: str = "") -> str:
+        payload = {
+            **netlist_fingerprint(netlist_path),
+            "params": {k: quantize(v, self.sig_digits) for k, v in sorted(params.items())},
+            "tag": tag,
+        }
+        backend = backend_name()
+        if backend != "ngspice":
+            # stand-in results must never be served as SPICE results
+            payload["backend"] = backend
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            value = self._lru.get(key)
+            if value is not None:
+                self._lru.move_to_end(key)
+                self.hits += 1
+                return dict(value)
+
+            value = None
+            conn = self._db()
+            if conn is not None:
+                try:
+                    row = conn.execute("SELECT value FROM sims WHERE key = ?", (key,)).fetchone()
+                except sqlite3.Error:
+                    row = None
+                if row is not None:
+                    value = json.loads(row[0])
+
+            if value is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._remember(key, value)
+            return dict(value)
+
+    def put(self, key: str, value: Mapping[str, Any]) -> None:
+        value = dict(value)
+        with self._lock:
+            self._remember(key, value)
+            conn = self._db()
+            if conn is None:
+                return
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO sims (key, value, created) VALUES (?, ?, ?)",
+                    (key, json.dumps(value), time.time()),
+                )
+            except sqlite3.Error:
+                # a busy/locked store must never fail a simulation
+                pass
+
+    def get_or_compute(
+        self,
+        netlist_path: str | Path,
+        params: Mapping[str, float],
+        compute: Callable[[], Mapping[str, Any]],
+        *,
+        tag: str = "",
+    ) -> Dict[str, Any]:
+        key = self.key(netlist_path, params, tag=tag)
+        value = self.get(key)
+        if value is None:
+            value = dict(compute())
+            self.put(key, value)
+        return value
+
+    def _remember(self, key: str, value: Dict[str, Any]) -> None:
+        self._lru[key] = value
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_items:
+            self._lru.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "mem_items": len(self._lru)}
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import math
+import os
+import random
+import re
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from .netlist import measure_names, spice_value
+
+# "ngspice" (pyngs + libngspice, default) or "analytic" (closed-form stand-in, no ngspice/PDK needed).
+# Read at import: spawned workers inherit it through the environment.
+BACKEND_ENV = "IA_SPICE_BACKEND"
+# analytic backend: time per run() and per load() (PDK parsing), in ms; IA_ANALYTIC_SPIN=1 busy-waits
+LATENCY_ENV = "IA_ANALYTIC_LATENCY_MS"
+LOAD_LATENCY_ENV = "IA_ANALYTIC_LOAD_MS"
+SPIN_ENV = "IA_ANALYTIC_SPIN"
+# tail latency: each run() stalls with probability IA_ANALYTIC_STALL_P for IA_ANALYTIC_STALL_MS (hung ngspice)
+STALL_P_ENV = "IA_ANALYTIC_STALL_P"
+STALL_MS_ENV = "IA_ANALYTIC_STALL_MS"
+
+_PARAM_RE = re.compile(r"^\s*\.param\s+(\w+)\s*=\s*([^\s*;]+)", re.IGNORECASE)
+
+
+def backend_name() -> str:
+    name = os.environ.get(BACKEND_ENV, "ngspice").strip().lower() or "ngspice"
+    if name not in ("ngspice", "analytic"):
+        raise ValueError(f"{BACKEND_ENV}={name!r}: expected 'ngspice' or 'analytic'")
+    return name
+
+
+def _wait(seconds: float, spin: bool) -> None:
+    if seconds <= 0:
+        return
+    if not spin:
+        time.sleep(seconds)
+        return
+    # occupies a core like a real simulation
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class AnalyticInstance:
+    """
+    Deterministic stand-in for pyngs NGSpiceInstance, same load/set_parameter/run/get_measure/stop API.
+    - load() reads the .param defaults and .meas names of the netlist (the .lib files are not opened)
+    - run() waits the configured latency, then evaluates closed-form models:
+      inverter RC delays (tphl/tplh/tpavg) and width-proportional leakage (ileak*/pstatic),
+      RC filter cut-off (fcut/f_cutoff)
+    - for benchmarks and CI on machines without ngspice or the PDK; the numbers are plausible
+      (tens of ps, pA), not SKY130-accurate
+    """
+
+    def __init__(self) -> None:
+        self.latency_s = float(os.environ.get(LATENCY_ENV, "10")) / 1000.0
+        self.load_latency_s = float(os.environ.get(LOAD_LATENCY_ENV, "100")) / 1000.0
+        self.spin = os.environ.get(SPIN_ENV, "0") not in ("", "0")
+        self.stall_p = float(os.environ.get(STALL_P_ENV, "0"))
+        self.stall_s = float(os.environ.get(STALL_MS_ENV, "30000")) / 1000.0
+        # stalls differ between worker processes (forked ones too); the measures stay deterministic
+        self._rng = random.Random()
+        self._rng_pid = os.getpid()
+        self._defaults: Dict[str, float] = {}
+        self._params: Dict[str, float] = {}
+        self._measures: List[str] = []
+        self._values: Dict[str, float] = {}
+        self._loaded = False
+
+    def load(self, netlist_path: str | Path) -> None:
+        path = Path(netlist_path)
+        defaults: Dict[str, float] = {}
+        for line in path.read_text(errors="replace").splitlines():
+            m = _PARAM_RE.match(line)
+            if m is not None:
+                try:
+                    defaults[m.group(1).lower()] = spice_value(m.group(2))
+                except ValueError:
+                    pass
+        _wait(self.load_latency_s, self.spin)
+        self._defaults = defaults
+        self._params = {}
+        self._measures = measure_names(path)
+        self._values = {}
+        self._loaded = True
+
+    def set_parameter(self, name: str, value: float) -> None:
+        self._params[name.lower()] = float(value)
+
+    def _p(self, name: str, default: float) -> float:
+        return self._params.get(name, self._defaults.get(name, default))
+
+    def _inverter(self) -> Dict[str, float]:
+        wn, wp = self._p("wn", 0.42), self._p("wp", 0.84)
+        vdd, lch = self._p("vdd", 1.8), self._p("lch", 0.15)
+        # on-resistance ~ L / (W (vdd - vt)), hole mobility ~ 1/2.5 of electrons
+        drive = max(vdd - 0.45, 0.05) / (1.8 - 0.45)
+        r_n = 6.0e3 * (lch / 0.15) / (wn * drive)
+        r_p = 2.5 * 6.0e3 * (lch / 0.15) / (wp * drive)
+        c_load = 2.0e-15 + 1.5e-15 * (wn + wp)
+        tphl = 0.69 * r_n * c_load
+        tplh = 0.69 * r_p * c_load
+        # off-state leakage ~ W, falling steeply with L; I(VDDx) is negative when the supply sources current
+        sub = math.exp(-(lch - 0.15) / 0.02) * (vdd / 1.8)
+        ileak_lo = -1.0e-12 * wn * sub
+        ileak_hi = -0.5e-12 * wp * sub
+        ileak = (ileak_lo + ileak_hi) / 2
+        return {
+            "tphl": tphl,
+            "tplh": tplh,
+            "tpavg": (tphl + tplh) / 2,
+            "ileak_lo": ileak_lo,
+            "ileak_hi": ileak_hi,
+            "ileak": ileak,
+            "pstatic": -vdd * ileak,
+        }
+
+    def _rc(self) -> Dict[str, float]:
+        r = self._p("r_val", self._p("rval", 1e3))
+        c = self._p("c_val", self._p("cval", 100e-9))
+        fc = 1.0 / (2.0 * math.pi * r * c)
+        return {"fcut": fc, "f_cutoff": fc}
+
+    def run(self) -> None:
+        if not self._loaded:
+            raise RuntimeError("circuit not parsed")
+        _wait(self.latency_s, self.spin)
+        if self.stall_p > 0:
+            if os.getpid() != self._rng_pid:
+                self._rng, self._rng_pid = random.Random(), os.getpid()
+            if self._rng.random() < self.stall_p:
+                _wait(self.stall_s, False)
+        self._values = {**self._rc(), **self._inverter()}
+
+    def get_measure(self, name: str) -> float:
+        key = name.lower()
+        if key not in self._measures or key not in self._values:
+            raise RuntimeError(f"measure {name!r} not available")
+        return float(self._values[key])
+
+    def stop(self) -> None:
+        self._loaded = False
+        self._values = {}
+
+
+if backend_name() == "analytic":
+    NGSpiceInstance = AnalyticInstance
+else:
+    from pyngs.core import NGSpiceInstance  # noqa: F401
@@ -1,20 +1,348 @@
-from __future__ import annotations
-
-import itertools
-from typing import Any, Dict, List, Tuple
-
-from .spice_worker import PyngsWorker
-
-
-class PyngsWorkerPool:
-    def __init__(self, n_workers: int = 4, **worker_kwargs) -> None:
-        self.workers = [PyngsWorker(**worker_kwargs) for _ in range(n_workers)]
-        self._rr = itertools.cycle(range(n_workers))
-
-    def measure(self, wn: float, wp: float, **kwargs) -> Dict[str, Any]:
-        i = next(self._rr)
-        return self.workers[i].measure(wn, wp, **kwargs)
-
-    def close(self) -> None:
-        for w in self.workers:
-            w.close()
+from __future__ import annotations
+
+import asyncio
+import math
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from . import tracing
+from .spice_worker import PyngsWorker
+from .worker_health import merge_stats
+
+# (wn, wp) or {"wn": .., "wp": .., "vdd": .., "lch_um": .., "k_area": ..}
+Point = Union[Tuple[float, float], Mapping[str, float]]
+
+
+@dataclass
+class _Job:
+    wn: float
+    wp: float
+    kwargs: Dict[str, Any]
+    future: Future = field(default_factory=Future)
+    queued_ns: int = field(default_factory=time.perf_counter_ns)
+    # hedging: the job this one duplicates, copies not finished, duplicate queued, future decided
+    hedge_of: Optional["_Job"] = None
+    copies: int = 1
+    hedged: bool = False
+    settled: bool = False
+
+    @property
+    def size(self) -> int:
+        return 1
+
+    def duplicate(self) -> "_Job":
+        return _Job(self.wn, self.wp, self.kwargs, hedge_of=self)
+
+
+@dataclass
+class _BatchJob:
+    points: List[Point]
+    kwargs: Dict[str, Any]
+    future: Future = field(default_factory=Future)
+    queued_ns: int = field(default_factory=time.perf_counter_ns)
+    hedge_of: Optional["_BatchJob"] = None
+    copies: int = 1
+    hedged: bool = False
+    settled: bool = False
+
+    @property
+    def size(self) -> int:
+        return len(self.points)
+
+    def duplicate(self) -> "_BatchJob":
+        return _BatchJob(self.points, self.kwargs, hedge_of=self)
+
+
+def _as_job(point: Point, defaults: Mapping[str, Any]) -> _Job:
+    if isinstance(point, Mapping):
+        kwargs = {**defaults, **{k: v for k, v in point.items() if k not in ("wn", "wp")}}
+        return _Job(float(point["wn"]), float(point["wp"]), kwargs)
+    wn, wp = point
+    return _Job(float(wn), float(wp), dict(defaults))
+
+
+class PyngsWorkerPool:
+    """
+    Pool of PyngsWorker processes fed from one shared job queue.
+    - one dispatcher thread per worker: an idle worker always takes the next job
+    - submit() returns a concurrent.futures.Future, asubmit() an asyncio awaitable
+    - measure_many() keeps every worker busy and returns results in input order,
+      sending points to the workers in batch messages
+    - hedging: a job running longer than the hedge_quantile of the run latencies reported by
+      the workers (per point, netlist loads excluded) is duplicated on an idle worker when nothing else is queued; the first success answers
+      and the other copy is cancelled (its worker respawns in the background)
+    """
+
+    def __init__(
+        self,
+        n_workers: int = 4,
+        *,
+        hedge: bool = True,
+        hedge_quantile: float = 0.99,
+        hedge_min_s: float = 0.02,
+        **worker_kwargs,
+    ) -> None:
+        self.workers = [PyngsWorker(**worker_kwargs) for _ in range(n_workers)]
+        self.hedge = bool(hedge) and n_workers > 1
+        self.hedge_quantile = float(hedge_quantile)
+        self.hedge_min_s = float(hedge_min_s)
+
+        self._queue: "queue.Queue[Optional[Union[_Job, _BatchJob]]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._busy = [False] * n_workers
+        self._busy_s = [0.0] * n_workers
+        self._jobs_done = [0] * n_workers
+        # (job, start time) per worker, for hedging and cancellation
+        self._running: List[Optional[Tuple[Union[_Job, _BatchJob], float]]] = [None] * n_workers
+        self._hedges = 0
+        self._hedge_wins = 0
+        self._cancelled = 0
+        self._t0 = time.perf_counter()
+        self._closed = False
+        self._stop = threading.Event()
+
+        self._threads = [
+            threading.Thread(target=self._serve, args=(i,), name=f"pyngs-pool-{i}", daemon=True)
+            for i in range(n_workers)
+        ]
+        for th in self._threads:
+            th.start()
+        self._hedger: Optional[threading.Thread] = None
+        if self.hedge:
+            self._hedger = threading.Thread(target=self._hedge_loop, name="pyngs-pool-hedge", daemon=True)
+            self._hedger.start()
+
+    def _serve(self, i: int) -> None:
+        worker = self.workers[i]
+        while True:
+            job = self._queue.get()
+            if job is None:
+                break
+            primary = job.hedge_of or job
+            if job.hedge_of is None:
+                if not job.future.set_running_or_notify_cancel():
+                    continue
+            else:
+                with self._lock:
+                    if primary.settled:
+                        # the original answered while this duplicate was queued
+                        primary.copies -= 1
+                        continue
+
+            with self._lock:
+                self._busy[i] = True
+                self._running[i] = (job, time.perf_counter())
+            t0 = time.perf_counter()
+            tracing.record("pool.queue_wait", job.queued_ns, time.perf_counter_ns(), "pool", worker=i)
+            res: Any = None
+            error: Optional[BaseException] = None
+            hedge = job.hedge_of is not None
+            try:
+                with worker.running(job):
+                    if isinstance(job, _BatchJob):
+                        with tracing.span("pool.batch", cat="pool", worker=i, points=len(job.points), hedge=hedge):
+                            res = worker.measure_batch(job.points, return_exceptions=True, **job.kwargs)
+                    else:
+                        with tracing.span("pool.job", cat="pool", worker=i, hedge=hedge):
+                            res = worker.measure(job.wn, job.wp, **job.kwargs)
+            except BaseException as exc:
+                error = exc
+            finally:
+                elapsed = time.perf_counter() - t0
+                with self._lock:
+                    self._busy[i] = False
+                    self._running[i] = None
+                    self._busy_s[i] += elapsed
+                    self._jobs_done[i] += 1
+            self._settle(job, res, error)
+
+    def _settle(self, job: Union[_Job, _BatchJob], res: Any, error: Optional[BaseException]) -> None:
+        """First success among a job and its duplicate answers; an error only once no copy is left."""
+        primary = job.hedge_of or job
+        # (worker, job) pairs: a worker is only cancelled while that exact copy is in flight on it
+        losers: List[Tuple[int, Union[_Job, _BatchJob]]] = []
+        with self._lock:
+            primary.copies -= 1
+            if primary.settled or (error is not None and primary.copies > 0):
+                return
+            primary.settled = True
+            if error is None:
+                if job.hedge_of is not None:
+                    self._hedge_wins += 1
+                losers = [
+                    (k, run[0])
+                    for k, run in enumerate(self._running)
+                    if run is not None and run[0] is not job and (run[0] is primary or run[0].hedge_of is primary)
+                ]
+        n_cancelled = sum(self.workers[k].cancel(loser) for k, loser in losers)
+        if n_cancelled:
+            with self._lock:
+                self._cancelled += n_cancelled
+        if error is None:
+            primary.future.set_result(res)
+        else:
+            primary.future.set_exception(error)
+
+    def latency_quantile(self, q: float) -> float:
+        """Quantile of the recent run latencies (s) of every worker; NaN until 16 are known."""
+        x = np.concatenate([w.latency.samples() for w in self.workers])
+        return float(np.quantile(x, q)) if len(x) >= 16 else float("nan")
+
+    def hedge_after_s(self, n_points: int = 1) -> float:
+        """Run time past which a job of `n_points` gets a duplicate (NaN: not enough latencies yet)."""
+        return max(self.hedge_min_s, self.latency_quantile(self.hedge_quantile) * n_points)
+
+    def _hedge_loop(self) -> None:
+        tick = 0.05
+        while not self._stop.wait(tick):
+            per_point = self.latency_quantile(self.hedge_quantile)
+            if math.isnan(per_point):
+                tick = 0.05
+                continue
+            tick = min(0.05, max(0.002, max(self.hedge_min_s, per_point) / 4))
+            # queued work has priority over duplicates
+            if self._queue.qsize() > 0:
+                continue
+            now = time.perf_counter()
+            late: List[Tuple[float, Union[_Job, _BatchJob]]] = []
+            with self._lock:
+                idle = self._busy.count(False)
+                for run in self._running:
+                    if run is None:
+                        continue
+                    job, t0 = run
+                    if job.hedge_of is not None or job.hedged or job.settled:
+                        continue
+                    over = (now - t0) - max(self.hedge_min_s, per_point * job.size)
+                    if over > 0:
+                        late.append((over, job))
+                late.sort(key=lambda x: x[0], reverse=True)
+                dups = []
+                for _, job in late[:idle]:
+                    job.hedged = True
+                    job.copies += 1
+                    self._hedges += 1
+                    dups.append(job.duplicate())
+            for dup in dups:
+                self._queue.put(dup)
+
+    def submit(self, wn: float, wp: float, **kwargs) -> "Future[Dict[str, Any]]":
+        if self._closed:
+            raise RuntimeError("PyngsWorkerPool is closed")
+        job = _Job(float(wn), float(wp), kwargs)
+        self._queue.put(job)
+        return job.future
+
+    def asubmit(self, wn: float, wp: float, **kwargs) -> "asyncio.Future[Dict[str, Any]]":
+        return asyncio.wrap_future(self.submit(wn, wp, **kwargs))
+
+    def measure(self, wn: float, wp: float, **kwargs) -> Dict[str, Any]:
+        return self.submit(wn, wp, **kwargs).result()
+
+    def measure_many(
+        self,
+        points: Sequence[Point],
+        *,
+        batch_size: Optional[int] = None,
+        return_exceptions: bool = False,
+        **kwargs,
+    ) -> List[Any]:
+        """
+        Evaluate every point on the pool and return results in input order.
+        Points are grouped into batch messages of `batch_size` (auto: ~4 batches per worker).
+        With return_exceptions=True a failed point yields its exception instead of raising.
+        """
+        if self._closed:
+            raise RuntimeError("PyngsWorkerPool is closed")
+        points = list(points)
+        if batch_size is None:
+            batch_size = max(1, min(256, len(points) // (4 * len(self.workers))))
+
+        if batch_size <= 1:
+            jobs: List[Union[_Job, _BatchJob]] = [_as_job(p, kwargs) for p in points]
+        else:
+            jobs = [_BatchJob(points[i : i + batch_size], kwargs) for i in range(0, len(points), batch_size)]
+        for job in jobs:
+            self._queue.put(job)
+
+        out: List[Any] = []
+        for job in jobs:
+            try:
+                res = job.future.result()
+            except Exception as exc:
+                if not return_exceptions:
+                    for other in jobs:
+                        other.future.cancel()
+                    raise
+                res = [exc] * len(job.points) if isinstance(job, _BatchJob) else exc
+            if isinstance(job, _BatchJob):
+                out.extend(res)
+            else:
+                out.append(res)
+
+        if not return_exceptions:
+            for r in out:
+                if isinstance(r, Exception):
+                    raise r
+        return out
+
+    async def ameasure_many(self, points: Sequence[Point], **kwargs) -> List[Dict[str, Any]]:
+        jobs = [_as_job(p, kwargs) for p in points]
+        for job in jobs:
+            self._queue.put(job)
+        return list(await asyncio.gather(*(asyncio.wrap_future(j.future) for j in jobs)))
+
+    @property
+    def queue_depth(self) -> int:
+        """Jobs submitted but not yet picked up by a worker."""
+        return self._queue.qsize()
+
+    def utilization(self) -> List[float]:
+        """Fraction of wall time each worker spent running jobs since the pool started."""
+        elapsed = max(time.perf_counter() - self._t0, 1e-9)
+        with self._lock:
+            return [min(1.0, b / elapsed) for b in self._busy_s]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            busy = list(self._busy)
+            done = list(self._jobs_done)
+            hedges, hedge_wins, cancelled = self._hedges, self._hedge_wins, self._cancelled
+        worker_health = [w.health_stats() for w in self.workers]
+        return {
+            "n_workers": len(self.workers),
+            "queue_depth": self.queue_depth,
+            "in_flight": sum(busy),
+            "jobs_done": done,
+            "utilization": self.utilization(),
+            "health": merge_stats(worker_health),
+            "worker_health": worker_health,
+            "latency_p50_ms": 1e3 * self.latency_quantile(0.5),
+            "latency_p99_ms": 1e3 * self.latency_quantile(0.99),
+            "hedge_after_ms": 1e3 * self.hedge_after_s() if self.hedge else float("nan"),
+            "hedges": hedges,
+            "hedge_wins": hedge_wins,
+            "cancelled": cancelled,
+            "timeouts": [w.n_timeouts for w in self.workers],
+            "deadline_s": [w.deadline_s() for w in self.workers],
+        }
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._stop.set()
+        if self._hedger is not None:
+            self._hedger.join(timeout=1.0)
+        for _ in self._threads:
+            self._queue.put(None)
+        for th in self._threads:
+            th.join(timeout=5.0)
+        for w in self.workers:
+            w.close()
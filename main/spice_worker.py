@@ -1,22 +1,41 @@
 from __future__ import annotations
 
 import __main__
+import contextlib
+import math
 import multiprocessing as mp
 import os
+import threading
 import time
 import warnings
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
 
-from pyngs.core import NGSpiceInstance
+import numpy as np
+
+from . import tracing
+from .pdk_slim import outside_extract, slim_netlist
+from .sim_cache import SimCache
+from .spice_backend import NGSpiceInstance
+from .worker_health import HealthMonitor, HealthPolicy, LatencyTracker, count_warnings, current_rss_mb
+from .zygote import Zygote, ZygoteChild, get_zygote
 
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 INV_CHAR_NETLIST = PROJECT_ROOT / "spice" / "inv_char.cir"
 MEASURES = ("tphl", "tplh", "tpavg", "ileak", "pstatic")
+# column layout of the binary batch protocol
+BATCH_COLS = ("wn", "wp", "vdd", "lch", "k_area")
+# per-run health sent back with every result: run latency (s), warnings, RSS (MB),
+# load time (s) of the instance if this is its first run (else NaN)
+HEALTH_COLS = ("latency_s", "warnings", "rss_mb", "load_s")
+_NO_RESULT = "pyngs worker: no result"
 
 
 def _pick_ctx(start_method: str) -> mp.context.BaseContext:
     # spawn is safer for C libs; fallback to fork only for <stdin>
+    if start_method == "zygote":
+        # the workers are forked by the zygote; this context only provides the Pipe
+        return mp.get_context("spawn")
     if start_method == "auto":
         main_file = getattr(__main__, "__file__", None)
         if main_file is None or str(main_file).endswith("<stdin>"):
@@ -41,18 +60,98 @@ def _install_warning_policy() -> None:
     )
 
 
-def _worker_loop(conn, netlist_path: str, restart_every: int) -> None:
+def _batch_rows(
+    points: Sequence[Any],
+    *,
+    vdd: float,
+    lch_um: float,
+    k_area: float,
+) -> np.ndarray:
+    """Pack (wn, wp[, vdd, lch]) tuples or dicts into a float64 array with BATCH_COLS columns."""
+    rows = np.empty((len(points), len(BATCH_COLS)), dtype=np.float64)
+    for i, p in enumerate(points):
+        if isinstance(p, Mapping):
+            rows[i] = (
+                p["wn"],
+                p["wp"],
+                p.get("vdd", vdd),
+                p.get("lch_um", p.get("lch", lch_um)),
+                p.get("k_area", k_area),
+            )
+        else:
+            t = tuple(p)
+            rows[i] = (
+                t[0],
+                t[1],
+                t[2] if len(t) > 2 else vdd,
+                t[3] if len(t) > 3 else lch_um,
+                k_area,
+            )
+    return rows
+
+
+def _worker_loop(
+    conn,
+    netlist_path: str,
+    preloaded: Optional[NGSpiceInstance] = None,
+) -> None:
+    # Recycling is decided by the parent (PyngsWorker.health); the child only reloads on
+    # request ("restart") or after a failed run.
     _install_warning_policy()
+    tracing.set_process_name("pyngs-worker")
 
     inst: Optional[NGSpiceInstance] = None
-    jobs = 0
+    load_s = float("nan")
+    # set by the first point the slim PDK extract does not cover: full library from then on
+    full_lib = False
 
     def _new_instance() -> NGSpiceInstance:
-        i = NGSpiceInstance()
-        i.load(Path(netlist_path))
+        nonlocal load_s
+        t0 = time.perf_counter()
+        with tracing.span("ngspice.load", full_lib=full_lib):
+            i = NGSpiceInstance()
+            i.load(netlist_path if full_lib else slim_netlist(netlist_path))
+        load_s = time.perf_counter() - t0
         return i
 
-    inst = _new_instance()
+    def _drop_instance() -> None:
+        nonlocal inst
+        try:
+            if inst is not None:
+                inst.stop()
+        except Exception:
+            pass
+        inst = None
+
+    def _simulate(wn: float, wp: float, vdd: float, lch: float) -> Tuple[List[float], Tuple[float, ...]]:
+        nonlocal inst, load_s, full_lib
+        if not full_lib and outside_extract(netlist_path, {"wn": wn, "wp": wp, "lch": lch}):
+            full_lib = True
+            _drop_instance()
+        if inst is None:
+            with tracing.span("ngspice.restart"):
+                inst = _new_instance()
+
+        with count_warnings() as caught:
+            t0 = time.perf_counter()
+            with tracing.span("set_parameter"):
+                inst.set_parameter("wn", wn)
+                inst.set_parameter("wp", wp)
+                inst.set_parameter("vdd", vdd)
+                inst.set_parameter("lch", lch)
+
+            with tracing.span("ngspice.run"):
+                inst.run()
+
+            with tracing.span("get_measure"):
+                vals = [float(inst.get_measure(m)) for m in MEASURES]
+            latency = time.perf_counter() - t0
+        health = (latency, float(len(caught)), current_rss_mb(), load_s)
+        load_s = float("nan")
+        return vals, health
+
+    # preloaded: instance inherited from a Zygote, netlist already loaded
+    inst = preloaded if preloaded is not None else _new_instance()
 
     while True:
         msg = conn.recv()
@@ -61,14 +160,41 @@ def _worker_loop(conn, netlist_path: str, restart_every: int) -> None:
 
         if isinstance(msg, dict) and msg.get("__cmd__") == "restart":
             # hard reset inside the process
-            try:
-                if inst is not None:
-                    inst.stop()
-            except Exception:
-                pass
+            _drop_instance()
             inst = _new_instance()
-            jobs = 0
-            conn.send({"ok": True})
+            conn.send({"ok": True, "load_s": load_s})
+            load_s = float("nan")
+            continue
+
+        if isinstance(msg, tuple) and msg[0] == "batch":
+            # ("batch", float64 rows as bytes, chunk_size)
+            #   -> ("chunk", start, measures bytes, errors, HEALTH_COLS bytes)* + ("done", n)
+            _, payload, chunk_size = msg
+            rows = np.frombuffer(payload, dtype=np.float64).reshape(-1, len(BATCH_COLS))
+            failed = False
+
+            for start in range(0, len(rows), chunk_size):
+                block = rows[start : start + chunk_size]
+                out = np.full((len(block), len(MEASURES)), np.nan, dtype=np.float64)
+                health = np.full((len(block), len(HEALTH_COLS)), np.nan, dtype=np.float64)
+                errors: Dict[int, str] = {}
+
+                for j, (wn, wp, vdd, lch, _k_area) in enumerate(block):
+                    try:
+                        out[j], health[j] = _simulate(float(wn), float(wp), float(vdd), float(lch))
+                    except Exception as e:
+                        # isolate the failure: fresh instance for the rest of the batch
+                        errors[start + j] = f"{type(e).__name__}: {e}"
+                        failed = True
+                        _drop_instance()
+
+                conn.send(("chunk", start, out.tobytes(), errors, health.tobytes()))
+
+            conn.send(("done", len(rows)))
+            if failed:
+                # the process is recycled only once the whole batch has been answered
+                tracing.flush()
+                os._exit(1)
             continue
 
         wn = float(msg["wn"])
@@ -78,45 +204,41 @@ def _worker_loop(conn, netlist_path: str, restart_every: int) -> None:
         k_area = float(msg.get("k_area", 1.0))
 
         try:
-            if restart_every > 0 and jobs >= restart_every:
-                try:
-                    inst.stop()
-                except Exception:
-                    pass
-                inst = _new_instance()
-                jobs = 0
-
-            inst.set_parameter("wn", wn)
-            inst.set_parameter("wp", wp)
-            inst.set_parameter("vdd", vdd)
-            inst.set_parameter("lch", lch)
+            vals, health = _simulate(wn, wp, vdd, lch)
 
-            inst.run()
+            out_d: Dict[str, Any] = dict(zip(MEASURES, vals))
+            out_d["area_um"] = float(k_area * (wn + wp))
+            out_d["wn_um"] = wn
+            out_d["wp_um"] = wp
+            out_d["__health__"] = health
 
-            out: Dict[str, Any] = {m: float(inst.get_measure(m)) for m in MEASURES}
-            out["area_um"] = float(k_area * (wn + wp))
-            out["wn_um"] = wn
-            out["wp_um"] = wp
-
-            jobs += 1
-            conn.send(out)
+            conn.send(out_d)
 
         except Exception as e:
             # If we get here, the instance is unreliable: force the worker to die.
             conn.send({"__error__": f"{type(e).__name__}: {e}"})
+            tracing.flush()
             os._exit(1)
 
-    try:
-        if inst is not None:
-            inst.stop()
-    except Exception:
-        pass
+    _drop_instance()
+    tracing.flush()
 
 
 class PyngsWorker:
     """
     pyngs/libngspice in a dedicated process.
     If it errors or hangs -> kill + restart.
+    The optional SimCache is consulted in the parent, before any pipe traffic; its hits carry
+    "cached": 1.0.
+    Recycling is decided here, between pipe messages, by a HealthMonitor fed with the latency,
+    warnings and RSS the child reports with every result (recycle="count" | "health" | "auto").
+    start_method="zygote": the process is forked from a Zygote with the netlist already loaded
+    (milliseconds instead of a Python start + PDK parse); a recycle then replaces the whole
+    process with a fresh fork instead of reloading ngspice in place.
+    Deadlines adapt to the observed latencies: timeout_factor x p99 of recent runs, within
+    [min_timeout_s, timeout_s]; timeout_s alone while the process is still loading the netlist.
+    cancel(job) aborts the job in flight from another thread (PyngsWorkerPool hedging), only while
+    that job is still the one declared by running(job).
     """
 
     def __init__(
@@ -124,25 +246,110 @@ class PyngsWorker:
         netlist_path: Path = INV_CHAR_NETLIST,
         *,
         timeout_s: float = 10.0,
-        restart_every: int = 25,
+        restart_every: Optional[int] = None,
         start_method: str = "auto",
+        cache: Optional[SimCache] = None,
+        recycle: str = "health",
+        health_policy: Optional[HealthPolicy] = None,
+        adaptive_timeout: bool = True,
+        timeout_factor: float = 5.0,
+        min_timeout_s: float = 1.0,
     ) -> None:
         self.netlist_path = Path(netlist_path)
         self.timeout_s = float(timeout_s)
-        self.restart_every = int(restart_every)
-
+        self.restart_every = restart_every
+        self.cache = cache
+        self.health = HealthMonitor(recycle, self.restart_every, health_policy)
+        # why the next (re)load happens; charged when its cost is known
+        self._pending_reason = "start"
+
+        self.adaptive_timeout = bool(adaptive_timeout)
+        self.timeout_factor = float(timeout_factor)
+        self.min_timeout_s = min(float(min_timeout_s), self.timeout_s)
+        self.latency = LatencyTracker()
+        # True until the process answered once (a spawned child loads the netlist on its first job)
+        self._cold = True
+        self._cancel_pending = False
+        # job declared by running(); cancel(job) is a no-op for any other
+        self._job: Optional[object] = None
+        self._job_lock = threading.Lock()
+        self.n_timeouts = 0
+        self.n_cancelled = 0
+
+        self._zygote: Optional[Zygote] = get_zygote(self.netlist_path) if start_method == "zygote" else None
         self._ctx = _pick_ctx(start_method)
         self._parent_conn, self._child_conn = self._ctx.Pipe()
-        self._proc: Optional[mp.Process] = None
+        self._proc: Optional[Union[mp.process.BaseProcess, ZygoteChild]] = None
         self._start()
 
     def _start(self) -> None:
+        if self._zygote is not None:
+            t0 = time.perf_counter()
+            self._proc = self._zygote.fork(self._child_conn)
+            # the worker has its own copy of this end
+            self._child_conn.close()
+            self.health.record_restart(time.perf_counter() - t0, self._pending_reason)
+            self._pending_reason = "start"
+            self._cold = False
+            return
+        # the child reports its load time with its first result
         self._proc = self._ctx.Process(
             target=_worker_loop,
-            args=(self._child_conn, str(self.netlist_path), self.restart_every),
+            args=(self._child_conn, str(self.netlist_path)),
             daemon=True,
         )
         self._proc.start()
+        # the child has its own copy: a dead child now reads as EOF instead of a silent pipe
+        self._child_conn.close()
+        self._cold = True
+
+    def deadline_s(self, n_runs: int = 1) -> float:
+        """How long to wait for `n_runs` simulations before declaring the worker stuck."""
+        per_run = self.timeout_s
+        if self.adaptive_timeout and len(self.latency) >= 8:
+            p99 = self.latency.quantile(0.99)
+            per_run = min(self.timeout_s, max(self.min_timeout_s, self.timeout_factor * p99))
+        # a cold process first imports pyngs and loads the netlist
+        return (self.timeout_s if self._cold else 0.0) + per_run * max(1, n_runs)
+
+    @contextlib.contextmanager
+    def running(self, job: object) -> Iterator[None]:
+        """Declare `job` as the one in flight for the calls made inside the block."""
+        with self._job_lock:
+            self._job = job
+        try:
+            yield
+        finally:
+            with self._job_lock:
+                self._job = None
+
+    def cancel(self, job: object) -> bool:
+        """
+        Abort `job` if it is still in flight, from any thread, without waiting: the process is
+        killed and the blocked measure()/measure_batch() raises RuntimeError("pyngs job cancelled")
+        after a respawn. False (nothing done) if the worker moved on to another job or is idle.
+        """
+        with self._job_lock:
+            if job is None or self._job is not job:
+                return False
+            self._cancel_pending = True
+            proc = self._proc
+            if proc is not None:
+                try:
+                    proc.kill()
+                except Exception:
+                    pass
+        return True
+
+    def _consume_cancel(self) -> bool:
+        """Respawn after a cancel(); True if one was pending."""
+        if not self._cancel_pending:
+            return False
+        self._cancel_pending = False
+        self.n_cancelled += 1
+        self._kill()
+        self._restart_proc("cancelled")
+        return True
 
     def _kill(self) -> None:
         if self._proc is None:
@@ -158,24 +365,54 @@ class PyngsWorker:
             pass
         self._proc = None
 
-    def _restart_proc(self) -> None:
-        self.close()
-        self._parent_conn, self._child_conn = self._ctx.Pipe()
-        self._start()
-
-    def restart(self) -> None:
+    def _restart_proc(self, reason: str = "error") -> None:
+        with tracing.span("worker.respawn", cat="worker", reason=reason):
+            self._pending_reason = reason
+            self.close()
+            self._parent_conn, self._child_conn = self._ctx.Pipe()
+            self._start()
+
+    def _maybe_recycle(self) -> None:
+        reason = self.health.restart_reason()
+        if reason is not None:
+            self.restart(reason)
+
+    def _record(self, vals: Sequence[float], health: Sequence[float]) -> None:
+        latency, n_warnings, rss_mb, load_s = (float(x) for x in health)
+        self._cold = False
+        self.latency.record(latency)
+        if not math.isnan(load_s):
+            self.health.record_restart(load_s, self._pending_reason)
+            self._pending_reason = "start"
+        if not math.isnan(latency):
+            self.health.record_run(
+                latency,
+                nan=bool(np.isnan(np.asarray(vals, dtype=np.float64)).any()),
+                warnings=int(n_warnings),
+                rss_mb=rss_mb,
+            )
+
+    def restart(self, reason: str = "manual") -> None:
+        if self._zygote is not None:
+            # a fresh fork is cheaper than reloading the netlist in place
+            self._restart_proc(reason)
+            return
         if self._proc is None or not self._proc.is_alive():
-            self._restart_proc()
+            self._restart_proc(reason)
             return
         try:
             self._parent_conn.send({"__cmd__": "restart"})
             if not self._parent_conn.poll(self.timeout_s):
                 self._kill()
-                self._restart_proc()
+                self._restart_proc("timeout")
                 return
-            _ = self._parent_conn.recv()
+            reply = self._parent_conn.recv()
+            self.health.record_restart(reply.get("load_s", float("nan")), reason)
         except Exception:
-            self._restart_proc()
+            self._restart_proc(reason)
+
+    def health_stats(self) -> Dict[str, Any]:
+        return self.health.stats()
 
     def measure(
         self,
@@ -187,8 +424,40 @@ class PyngsWorker:
         k_area: float = 1.0,
         _retry: bool = True,
     ) -> Dict[str, Any]:
+        if self.cache is None:
+            return self._measure(wn_um, wp_um, vdd=vdd, lch_um=lch_um, k_area=k_area, _retry=_retry)
+
+        params = {"wn": float(wn_um), "wp": float(wp_um), "vdd": float(vdd), "lch": float(lch_um)}
+        key = self.cache.key(self.netlist_path, params)
+        data = self.cache.get(key)
+        if data is None:
+            res = self._measure(wn_um, wp_um, vdd=vdd, lch_um=lch_um, k_area=k_area, _retry=_retry)
+            self.cache.put(key, {m: res[m] for m in MEASURES})
+            return res
+
+        out: Dict[str, Any] = {m: float(data[m]) for m in MEASURES}
+        out["area_um"] = float(k_area * (float(wn_um) + float(wp_um)))
+        out["wn_um"] = float(wn_um)
+        out["wp_um"] = float(wp_um)
+        # no simulation ran: consumers that learn from outcomes (quarantine) skip it
+        out["cached"] = 1.0
+        return out
+
+    def _measure(
+        self,
+        wn_um: float,
+        wp_um: float,
+        *,
+        vdd: float = 1.8,
+        lch_um: float = 0.15,
+        k_area: float = 1.0,
+        _retry: bool = True,
+    ) -> Dict[str, Any]:
+        # a cancel(job) that killed the process after that job had its answer
+        self._consume_cancel()
+        self._maybe_recycle()
         if self._proc is None or not self._proc.is_alive():
-            self._restart_proc()
+            self._restart_proc("died")
 
         req = {
             "wn": float(wn_um),
@@ -198,30 +467,177 @@ class PyngsWorker:
             "k_area": float(k_area),
         }
 
-        try:
-            self._parent_conn.send(req)
-        except Exception:
-            self._restart_proc()
-            self._parent_conn.send(req)
-
-        if not self._parent_conn.poll(self.timeout_s):
+        with tracing.span("pipe.send", cat="worker"):
+            try:
+                self._parent_conn.send(req)
+            except Exception:
+                self._restart_proc("died")
+                self._parent_conn.send(req)
+
+        # wait = child compute + pipe latency; the child's own spans split it
+        deadline = self.deadline_s()
+        with tracing.span("pipe.wait", cat="worker"):
+            answered = self._parent_conn.poll(deadline)
+        if not answered:
+            if self._consume_cancel():
+                raise RuntimeError("pyngs job cancelled")
+            self.n_timeouts += 1
             self._kill()
-            self._restart_proc()
+            self._restart_proc("timeout")
             if _retry:
-                return self.measure(wn_um, wp_um, vdd=vdd, lch_um=lch_um, k_area=k_area, _retry=False)
-            raise RuntimeError("pyngs worker timeout (stuck ngspice)")
+                return self._measure(wn_um, wp_um, vdd=vdd, lch_um=lch_um, k_area=k_area, _retry=False)
+            raise RuntimeError(f"pyngs worker timeout after {deadline:.2f}s (stuck ngspice)")
 
-        res = self._parent_conn.recv()
+        with tracing.span("pipe.recv", cat="worker"):
+            try:
+                res = self._parent_conn.recv()
+            except (EOFError, OSError):
+                # the parent holds no copy of the child end: a dead worker reads as EOF
+                res = {"__error__": "pyngs worker died"}
 
         if isinstance(res, dict) and "__error__" in res:
+            if self._consume_cancel():
+                raise RuntimeError("pyngs job cancelled")
             self._kill()
-            self._restart_proc()
+            self._restart_proc("error")
             if _retry:
-                return self.measure(wn_um, wp_um, vdd=vdd, lch_um=lch_um, k_area=k_area, _retry=False)
+                return self._measure(wn_um, wp_um, vdd=vdd, lch_um=lch_um, k_area=k_area, _retry=False)
             raise RuntimeError(res["__error__"])
 
+        self._record([res[m] for m in MEASURES], res.pop("__health__"))
         return res
 
+    @staticmethod
+    def _format(vals: Sequence[float], row: np.ndarray) -> Dict[str, Any]:
+        wn, wp, _vdd, _lch, k_area = (float(x) for x in row)
+        out: Dict[str, Any] = {m: float(v) for m, v in zip(MEASURES, vals)}
+        out["area_um"] = float(k_area * (wn + wp))
+        out["wn_um"] = wn
+        out["wp_um"] = wp
+        return out
+
+    def _run_batch(self, rows: np.ndarray, chunk_size: int) -> Tuple[np.ndarray, Dict[int, str]]:
+        """One batch round trip. Returns measure values and {row: error} for rows without a result."""
+        n = len(rows)
+        values = np.full((n, len(MEASURES)), np.nan, dtype=np.float64)
+        errors: Dict[int, str] = {i: _NO_RESULT for i in range(n)}
+
+        self._consume_cancel()
+        self._maybe_recycle()
+        if self._proc is None or not self._proc.is_alive():
+            self._restart_proc("died")
+
+        msg = ("batch", np.ascontiguousarray(rows, dtype=np.float64).tobytes(), int(chunk_size))
+        with tracing.span("pipe.send", cat="worker", points=n):
+            try:
+                self._parent_conn.send(msg)
+            except Exception:
+                self._restart_proc("died")
+                self._parent_conn.send(msg)
+
+        child_failed = False
+        while True:
+            # deadline per chunk scales with the number of sims in it
+            with tracing.span("pipe.wait", cat="worker"):
+                answered = self._parent_conn.poll(self.deadline_s(min(chunk_size, n)))
+            if not answered:
+                if self._consume_cancel():
+                    raise RuntimeError("pyngs job cancelled")
+                # blame the first unanswered row; the ones after it never ran
+                self.n_timeouts += 1
+                if errors:
+                    errors[min(errors)] = "pyngs worker timeout (stuck ngspice)"
+                self._kill()
+                self._restart_proc("timeout")
+                return values, errors
+            try:
+                reply = self._parent_conn.recv()
+            except (EOFError, OSError):
+                if self._consume_cancel():
+                    raise RuntimeError("pyngs job cancelled")
+                if errors:
+                    errors[min(errors)] = "pyngs worker died"
+                self._restart_proc("died")
+                return values, errors
+
+            if reply[0] == "chunk":
+                _, start, payload, errs, health_payload = reply
+                block = np.frombuffer(payload, dtype=np.float64).reshape(-1, len(MEASURES))
+                values[start : start + len(block)] = block
+                health = np.frombuffer(health_payload, dtype=np.float64).reshape(-1, len(HEALTH_COLS))
+                for vals, h in zip(block, health):
+                    self._record(vals, h)
+                for i in range(start, start + len(block)):
+                    errors.pop(i, None)
+                errors.update(errs)
+                child_failed = child_failed or bool(errs)
+            elif reply[0] == "done":
+                break
+
+        if child_failed:
+            # the child exits after a batch with failures
+            self._restart_proc("error")
+        return values, errors
+
+    def measure_batch(
+        self,
+        points: Sequence[Any],
+        *,
+        vdd: float = 1.8,
+        lch_um: float = 0.15,
+        k_area: float = 1.0,
+        chunk_size: int = 32,
+        return_exceptions: bool = False,
+    ) -> List[Any]:
+        """
+        Measure many (wn, wp[, vdd, lch]) points in one pipe message; results stream back in chunks.
+        A failing job does not affect the others and is retried once, like measure().
+        With return_exceptions=True failed points yield a RuntimeError instead of raising.
+        """
+        rows = _batch_rows(points, vdd=vdd, lch_um=lch_um, k_area=k_area)
+        results: List[Any] = [None] * len(rows)
+        keys: Dict[int, str] = {}
+        todo = list(range(len(rows)))
+
+        if self.cache is not None:
+            todo = []
+            for i, row in enumerate(rows):
+                params = dict(zip(("wn", "wp", "vdd", "lch"), (float(x) for x in row[:4])))
+                keys[i] = self.cache.key(self.netlist_path, params)
+                hit = self.cache.get(keys[i])
+                if hit is None:
+                    todo.append(i)
+                else:
+                    results[i] = {**self._format([hit[m] for m in MEASURES], row), "cached": 1.0}
+
+        # every round either answers or charges an attempt to at least one row
+        attempts = {i: 0 for i in todo}
+        failed: List[int] = []
+        while todo:
+            # a message never runs past a scheduled recycle: the rest goes in the next one
+            self._maybe_recycle()
+            left = self.health.runs_left()
+            head, rest = (todo, []) if left is None else (todo[:left], todo[left:])
+            values, errors = self._run_batch(rows[head], max(1, int(chunk_size)))
+            retry: List[int] = []
+            for local, i in enumerate(head):
+                err = errors.get(local)
+                if err is None:
+                    results[i] = self._format(values[local], rows[i])
+                    if i in keys:
+                        assert self.cache is not None
+                        self.cache.put(keys[i], {m: results[i][m] for m in MEASURES})
+                    continue
+                if err != _NO_RESULT:
+                    attempts[i] += 1
+                    results[i] = RuntimeError(err)
+                (failed if attempts[i] >= 2 else retry).append(i)
+            todo = retry + rest
+
+        if failed and not return_exceptions:
+            raise results[min(failed)]
+        return results
+
     def close(self) -> None:
         try:
             if self._proc is not None and self._proc.is_alive():
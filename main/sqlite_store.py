@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+class SQLiteStore:
+    """
+    Base of the stores shared by processes and runs (SimCache, ParetoArchive, FailureQuarantine).
+    - SQLite in WAL mode, one connection per process (safe for SubprocVecEnv children)
+    - path=None: no store, subclasses keep everything in memory
+    - picklable: the connection is reopened lazily after spawn/fork, and the in-memory
+      state listed by _fresh_state() starts empty in the new process
+    - subclasses create their tables in _schema()
+    """
+
+    def __init__(self, path: str | Path | None) -> None:
+        self.path = None if path is None else Path(path)
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid = os.getpid()
+
+    def _fresh_state(self) -> Dict[str, Any]:
+        """In-memory attributes a pickled copy starts from (it refills them from the store)."""
+        return {}
+
+    def _schema(self, conn: sqlite3.Connection) -> None:
+        raise NotImplementedError
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        state.update(self._fresh_state())
+        state["_lock"] = None
+        state["_conn"] = None
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def _db(self) -> Optional[sqlite3.Connection]:
+        if self.path is None:
+            return None
+        if self._conn is not None and self._pid == os.getpid():
+            return self._conn
+
+        # never reuse a connection inherited through fork
+        self._conn = None
+        self._pid = os.getpid()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.path), timeout=30.0, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        self._schema(conn)
+        self._conn = conn
+        return conn
+
+    def close(self) -> None:
+        try:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+        except Exception:
+            pass
+        self._conn = None
@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import math
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# quantities learned by the surrogate (log-space targets, all strictly positive)
+SURROGATE_TARGETS = ("tpavg", "pstatic")
+
+
+class GaussianProcess:
+    """
+    Minimal GP regressor (numpy only).
+    - isotropic RBF kernel on inputs already scaled to [0, 1]
+    - length scale picked from a small grid by log marginal likelihood
+    - targets standardised internally
+    """
+
+    def __init__(
+        self,
+        length_scales: Sequence[float] = (0.05, 0.1, 0.2, 0.35, 0.6),
+        noise: float = 1e-4,
+    ) -> None:
+        self.length_scales = tuple(float(x) for x in length_scales)
+        self.noise = float(noise)
+
+        self.length_scale = self.length_scales[0]
+        self._X: Optional[np.ndarray] = None
+        self._L: Optional[np.ndarray] = None
+        self._alpha: Optional[np.ndarray] = None
+        self._y_mean = 0.0
+        self._y_std = 1.0
+
+    @staticmethod
+    def _kernel(A: np.ndarray, B: np.ndarray, ls: float) -> np.ndarray:
+        d2 = np.sum(A * A, axis=1)[:, None] + np.sum(B * B, axis=1)[None, :] - 2.0 * A @ B.T
+        return np.exp(-0.5 * np.maximum(d2, 0.0) / (ls * ls))
+
+    def _factor(self, X: np.ndarray, ls: float) -> np.ndarray:
+        K = self._kernel(X, X, ls)
+        jitter = self.noise
+        for _ in range(5):
+            try:
+                return np.linalg.cholesky(K + jitter * np.eye(len(X)))
+            except np.linalg.LinAlgError:
+                jitter *= 10.0
+        raise np.linalg.LinAlgError("GP kernel matrix is not positive definite")
+
+    @property
+    def fitted(self) -> bool:
+        return self._alpha is not None
+
+    def fit(self, X: np.ndarray, y: np.ndarray) -> "GaussianProcess":
+        X = np.asarray(X, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64).reshape(-1)
+        self._y_mean = float(y.mean())
+        self._y_std = float(y.std()) or 1.0
+        ys = (y - self._y_mean) / self._y_std
+
+        best: Optional[Tuple[float, float, np.ndarray, np.ndarray]] = None
+        for ls in self.length_scales:
+            try:
+                L = self._factor(X, ls)
+            except np.linalg.LinAlgError:
+                continue
+            alpha = np.linalg.solve(L.T, np.linalg.solve(L, ys))
+            # log marginal likelihood (up to a constant)
+            lml = -0.5 * float(ys @ alpha) - float(np.sum(np.log(np.diag(L))))
+            if best is None or lml > best[0]:
+                best = (lml, ls, L, alpha)
+
+        if best is None:
+            raise np.linalg.LinAlgError("GP fit failed for every length scale")
+        _, self.length_scale, self._L, self._alpha = best
+        self._X = X
+        return self
+
+    def predict(self, Xs: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Posterior mean and standard deviation, in target units."""
+        assert self._X is not None and self._L is not None and self._alpha is not None
+        Xs = np.atleast_2d(np.asarray(Xs, dtype=np.float64))
+        Ks = self._kernel(Xs, self._X, self.length_scale)
+        mean = Ks @ self._alpha
+        v = np.linalg.solve(self._L, Ks.T)
+        var = np.maximum(1.0 - np.sum(v * v, axis=0), 1e-12)
+        return mean * self._y_std + self._y_mean, np.sqrt(var) * self._y_std
+
+
+class SurrogateRunner:
+    """
+    Wraps an InverterSpiceRunner-like object (measure(wn, wp, ...) -> dict).
+    - learns log(tpavg), log(pstatic) over (wn, wp) online from real full-fidelity SPICE results
+      (coarse screening results of a MultiFidelityRunner are passed through, never learned)
+    - answers from the GP when its predictive std (log space) is below `threshold`
+    - every `validate_every` surrogate answers, runs SPICE anyway and records the error
+    """
+
+    def __init__(
+        self,
+        runner: Any,
+        *,
+        bounds: Tuple[Tuple[float, float], Tuple[float, float]] = ((0.24, 5.0), (0.48, 10.0)),
+        threshold: float = 0.05,
+        min_points: int = 12,
+        max_points: int = 300,
+        refit_every: int = 5,
+        validate_every: int = 20,
+        vdd: float = 1.8,
+    ) -> None:
+        self.runner = runner
+        # supply of the runner's default measure(), the only bias point the GP models
+        self.vdd = float(vdd)
+        self._lo = np.array([bounds[0][0], bounds[1][0]], dtype=np.float64)
+        self._span = np.array([bounds[0][1] - bounds[0][0], bounds[1][1] - bounds[1][0]], dtype=np.float64)
+        self.threshold = float(threshold)
+        self.min_points = int(min_points)
+        self.max_points = int(max_points)
+        self.refit_every = int(refit_every)
+        self.validate_every = int(validate_every)
+
+        self._X: List[Tuple[float, float]] = []
+        self._Y: List[Tuple[float, ...]] = []
+        self._models: Optional[List[GaussianProcess]] = None
+        self._since_fit = 0
+        self._confident = 0
+
+        self.surrogate_hits = 0
+        self.spice_calls = 0
+        self.validations = 0
+        self._val_errors: List[float] = []
+
+    @property
+    def cache(self) -> Any:
+        return getattr(self.runner, "cache", None)
+
+    def _scale(self, wn: float, wp: float) -> np.ndarray:
+        return (np.array([[wn, wp]], dtype=np.float64) - self._lo) / self._span
+
+    def _record(self, wn: float, wp: float, res: Dict[str, Any]) -> None:
+        ys = [float(res[t]) for t in SURROGATE_TARGETS]
+        if not all(math.isfinite(y) and y > 0.0 for y in ys):
+            return
+        self._X.append((float(wn), float(wp)))
+        self._Y.append(tuple(math.log(y) for y in ys))
+        if len(self._X) > self.max_points:
+            self._X.pop(0)
+            self._Y.pop(0)
+
+        self._since_fit += 1
+        if len(self._X) >= self.min_points and (self._models is None or self._since_fit >= self.refit_every):
+            X = (np.asarray(self._X) - self._lo) / self._span
+            Y = np.asarray(self._Y)
+            try:
+                self._models = [GaussianProcess().fit(X, Y[:, k]) for k in range(Y.shape[1])]
+                self._since_fit = 0
+            except np.linalg.LinAlgError:
+                self._models = None
+
+    def _spice(self, wn: float, wp: float, **kwargs) -> Dict[str, Any]:
+        self.spice_calls += 1
+        res = self.runner.measure(wn, wp, **kwargs)
+        if set(kwargs) <= {"k_area"} and res.get("fidelity", "full") == "full":
+            self._record(wn, wp, res)
+        return res
+
+    def predict(self, wn: float, wp: float) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """(mean, std) of the log targets, or None while the model is not trained."""
+        if self._models is None:
+            return None
+        x = self._scale(wn, wp)
+        preds = [m.predict(x) for m in self._models]
+        return np.array([p[0][0] for p in preds]), np.array([p[1][0] for p in preds])
+
+    def measure(self, wn_um: float, wp_um: float, **kwargs) -> Dict[str, Any]:
+        # the surrogate only models the default vdd/lch
+        if not set(kwargs) <= {"k_area"}:
+            return self._spice(wn_um, wp_um, **kwargs)
+
+        pred = self.predict(wn_um, wp_um)
+        if pred is None or float(np.max(pred[1])) > self.threshold:
+            return self._spice(wn_um, wp_um, **kwargs)
+
+        self._confident += 1
+        mean = np.exp(pred[0])
+
+        if self.validate_every > 0 and self._confident % self.validate_every == 0:
+            # spot-check: answer with SPICE and record how wrong the surrogate was
+            res = self._spice(wn_um, wp_um, **kwargs)
+            if res.get("fidelity", "full") == "full":
+                errs = [abs(float(mean[k]) / float(res[t]) - 1.0) for k, t in enumerate(SURROGATE_TARGETS)]
+                self._val_errors.append(max(errs))
+                self.validations += 1
+            return res
+
+        self.surrogate_hits += 1
+        tpavg, pstatic = (float(v) for v in mean)
+        k_area = float(kwargs.get("k_area", 1.0))
+        return {
+            "tphl": tpavg,
+            "tplh": tpavg,
+            "tpavg": tpavg,
+            "ileak": -pstatic / self.vdd,
+            "pstatic": pstatic,
+            "area_um": float(k_area * (float(wn_um) + float(wp_um))),
+            "wn_um": float(wn_um),
+            "wp_um": float(wp_um),
+            "surrogate": 1.0,
+        }
+
+    def stats(self) -> Dict[str, float]:
+        total = self.surrogate_hits + self.spice_calls
+        recent = self._val_errors[-20:]
+        return {
+            "surrogate_hits": float(self.surrogate_hits),
+            "spice_calls": float(self.spice_calls),
+            "hit_rate": float(self.surrogate_hits / total) if total else 0.0,
+            "validations": float(self.validations),
+            "validation_error_mean": float(np.mean(self._val_errors)) if self._val_errors else float("nan"),
+            "validation_error_recent": float(np.mean(recent)) if recent else float("nan"),
+            "n_train": float(len(self._X)),
+        }
+
+    def close(self) -> None:
+        self.runner.close()
@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+import atexit
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from .sim_cache import PROJECT_ROOT
+
+DEFAULT_TRACE_DIR = PROJECT_ROOT / "results" / "trace"
+DEFAULT_TB_DIR = PROJECT_ROOT / "results" / "tb"
+
+# inherited by spawned children (PyngsWorker, SubprocVecEnv), which trace into the same directory
+TRACE_ENV = "IA_TRACE_DIR"
+
+_FLUSH_EVERY = 512
+_FLUSH_INTERVAL_NS = 1_000_000_000
+
+_dir: Optional[Path] = None
+_events: List[Dict[str, Any]] = []
+_pid = os.getpid()
+_last_flush_ns = 0
+_lock = threading.Lock()
+_NOOP = contextlib.nullcontext()
+
+
+def enabled() -> bool:
+    return _dir is not None
+
+
+def enable(trace_dir: str | Path = DEFAULT_TRACE_DIR, *, fresh: bool = True) -> Path:
+    """
+    Start tracing this process and every child started afterwards; one events file per process.
+    fresh=True drops the events files of a previous trace in the same directory.
+    """
+    global _dir
+    _dir = Path(trace_dir)
+    _dir.mkdir(parents=True, exist_ok=True)
+    if fresh:
+        for old in _dir.glob("events.*.jsonl"):
+            old.unlink(missing_ok=True)
+    os.environ[TRACE_ENV] = str(_dir)
+    _process_name(Path(sys.argv[0]).stem if sys.argv and sys.argv[0] else "python")
+    return _dir
+
+
+def disable() -> None:
+    global _dir
+    flush()
+    _dir = None
+    os.environ.pop(TRACE_ENV, None)
+
+
+def _append(ev: Dict[str, Any]) -> None:
+    global _events, _pid
+    with _lock:
+        if os.getpid() != _pid:
+            # forked child: the parent's buffered events are not ours
+            _events = []
+            _pid = os.getpid()
+        _events.append(ev)
+        # ts is in µs of perf_counter_ns
+        due = len(_events) >= _FLUSH_EVERY or ev["ts"] * 1000 - _last_flush_ns >= _FLUSH_INTERVAL_NS
+    if due:
+        flush()
+
+
+def _process_name(name: str) -> None:
+    _append({"name": "process_name", "ph": "M", "pid": os.getpid(), "tid": 0, "ts": 0, "args": {"name": name}})
+
+
+def set_process_name(name: str) -> None:
+    """Label this process in the trace viewer (e.g. "pyngs-worker")."""
+    if _dir is not None:
+        _process_name(name)
+
+
+def record(name: str, t0_ns: int, t1_ns: int, cat: str = "sim", **args: Any) -> None:
+    """Complete event between two time.perf_counter_ns() values (CLOCK_MONOTONIC: shared by all processes)."""
+    if _dir is None:
+        return
+    th = threading.current_thread()
+    ev = {"name": name, "cat": cat, "ph": "X", "ts": t0_ns / 1000, "dur": (t1_ns - t0_ns) / 1000}
+    ev.update(pid=os.getpid(), tid=th.ident or 0, args={"thread": th.name, **args})
+    _append(ev)
+
+
+class _Span:
+    __slots__ = ("name", "cat", "args", "t0")
+
+    def __init__(self, name: str, cat: str, args: Dict[str, Any]) -> None:
+        self.name = name
+        self.cat = cat
+        self.args = args
+        self.t0 = 0
+
+    def __enter__(self) -> "_Span":
+        self.t0 = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        record(self.name, self.t0, time.perf_counter_ns(), self.cat, **self.args)
+
+
+def span(name: str, cat: str = "sim", **args: Any) -> Any:
+    """Context manager timing a block; a shared no-op when tracing is disabled."""
+    if _dir is None:
+        return _NOOP
+    return _Span(name, cat, args)
+
+
+def flush() -> None:
+    """Append the buffered events of this process to <trace_dir>/events.<pid>.jsonl."""
+    global _events, _last_flush_ns
+    if _dir is None:
+        return
+    with _lock:
+        if os.getpid() != _pid:
+            _events = []
+            return
+        events, _events = _events, []
+        _last_flush_ns = time.perf_counter_ns()
+    if not events:
+        return
+    try:
+        with open(_dir / f"events.{os.getpid()}.jsonl", "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(ev, separators=(",", ":")) + "\n" for ev in events))
+    except OSError:
+        pass
+
+
+def load_events(trace_dir: str | Path = DEFAULT_TRACE_DIR) -> List[Dict[str, Any]]:
+    events: List[Dict[str, Any]] = []
+    for path in sorted(Path(trace_dir).glob("events.*.jsonl")):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                # a process killed mid-write leaves at most one truncated line
+                with contextlib.suppress(json.JSONDecodeError):
+                    events.append(json.loads(line))
+    return events
+
+
+def export_chrome_trace(trace_dir: str | Path = DEFAULT_TRACE_DIR, out_path: str | Path | None = None) -> Path:
+    """Merge every process file into one Chrome trace / Perfetto JSON (chrome://tracing, ui.perfetto.dev)."""
+    events = load_events(trace_dir)
+    out = Path(out_path) if out_path is not None else Path(trace_dir) / "trace.json"
+    tmp = out.with_suffix(out.suffix + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+    os.replace(tmp, out)
+    return out
+
+
+def summarize(trace_dir: str | Path = DEFAULT_TRACE_DIR) -> Dict[str, Dict[str, float]]:
+    """Per span name: count, total/mean/p50/p95 duration in ms, share of the traced wall time (>1 when concurrent)."""
+    durs: Dict[str, List[float]] = {}
+    t_min, t_max = float("inf"), float("-inf")
+    for ev in load_events(trace_dir):
+        if ev.get("ph") != "X":
+            continue
+        durs.setdefault(ev["name"], []).append(ev["dur"] / 1000)
+        t_min = min(t_min, ev["ts"])
+        t_max = max(t_max, ev["ts"] + ev["dur"])
+    wall_ms = max((t_max - t_min) / 1000, 1e-9)
+
+    out: Dict[str, Dict[str, float]] = {}
+    for name, d in sorted(durs.items()):
+        a = np.asarray(d)
+        out[name] = {
+            "count": float(len(a)),
+            "total_ms": float(a.sum()),
+            "mean_ms": float(a.mean()),
+            "p50_ms": float(np.percentile(a, 50)),
+            "p95_ms": float(np.percentile(a, 95)),
+            "share_of_wall": float(a.sum() / wall_ms),
+        }
+    return out
+
+
+def write_tensorboard(
+    summary: Dict[str, Dict[str, float]],
+    log_dir: str | Path | None = None,
+    *,
+    step: int = 0,
+) -> Optional[Path]:
+    """Summary scalars under results/tb (trace/<span>/<stat>); None if tensorboard is not installed."""
+    try:
+        from torch.utils.tensorboard import SummaryWriter
+    except ImportError:
+        return None
+    log_dir = Path(log_dir) if log_dir is not None else DEFAULT_TB_DIR / f"trace_{time.strftime('%Y%m%d-%H%M%S')}"
+    writer = SummaryWriter(str(log_dir))
+    try:
+        for name, stats in summary.items():
+            for k in ("count", "total_ms", "mean_ms", "p95_ms", "share_of_wall"):
+                writer.add_scalar(f"trace/{name}/{k}", stats[k], step)
+    finally:
+        writer.close()
+    return log_dir
+
+
+def format_summary(summary: Dict[str, Dict[str, float]]) -> str:
+    lines = [f"{'span':<24}{'count':>8}{'total ms':>12}{'mean ms':>10}{'p95 ms':>10}{'wall %':>8}"]
+    for name, s in sorted(summary.items(), key=lambda kv: -kv[1]["total_ms"]):
+        lines.append(
+            f"{name:<24}{int(s['count']):>8}{s['total_ms']:>12.1f}{s['mean_ms']:>10.3f}"
+            f"{s['p95_ms']:>10.3f}{100 * s['share_of_wall']:>8.1f}"
+        )
+    return "\n".join(lines)
+
+
+def _init_from_env() -> None:
+    global _dir
+    trace_dir = os.environ.get(TRACE_ENV)
+    if trace_dir:
+        _dir = Path(trace_dir)
+
+
+_init_from_env()
+atexit.register(flush)
+
+
+def main() -> None:
+    trace_dir = Path(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_TRACE_DIR
+    out = export_chrome_trace(trace_dir)
+    summary = summarize(trace_dir)
+    print(format_summary(summary))
+    print(f"\nChrome trace -> {out} (chrome://tracing or https://ui.perfetto.dev)")
+    tb = write_tensorboard(summary)
+    if tb is not None:
+        print(f"TensorBoard scalars -> {tb}")
+
+
+if __name__ == "__main__":
+    main()
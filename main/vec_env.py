@@ -0,0 +1,311 @@
+from __future__ import annotations
+
+import os
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+import gymnasium as gym
+import numpy as np
+from gymnasium import spaces
+from stable_baselines3.common.vec_env import VecEnv
+from stable_baselines3.common.vec_env.base_vec_env import VecEnvIndices, VecEnvObs, VecEnvStepReturn
+
+from .pareto import ParetoArchive
+from .quarantine import FailureQuarantine
+from .rl_env import WN_BOUNDS, WP_BOUNDS, normalize_weights, ppa_reward
+from .sim_cache import SimCache
+from .spice_pool import PyngsWorkerPool
+
+
+class InverterVecEnv(VecEnv):
+    """
+    Batched version of InverterEnv for SB3.
+    - all env state lives in NumPy arrays of the main process (no per-env interpreter)
+    - each step sends the whole batch of actions to a PyngsWorkerPool in one call
+    - n_envs is independent of the number of simulator processes
+    - same observation, reward, episode and get_best() contract as InverterEnv
+    """
+
+    def __init__(
+        self,
+        n_envs: int = 8,
+        w_delay: float = 1.0,
+        w_power: float = 1.0,
+        w_area: float = 1.0,
+        max_steps: int = 40,
+        *,
+        n_workers: Optional[int] = None,
+        pool: Optional[PyngsWorkerPool] = None,
+        sim_fail_penalty: float = -1_000.0,
+        cache_path: Optional[str] = None,
+        restart_every: Optional[int] = None,
+        recycle: str = "health",
+        timeout_s: float = 10.0,
+        start_method: str = "spawn",
+        archive_path: Optional[str] = None,
+        quarantine_path: Optional[str] = None,
+        weight_conditioned: bool = False,
+        weight_concentration: float = 1.0,
+    ) -> None:
+        self.render_mode = None
+        action_space = spaces.Box(
+            low=np.array([WN_BOUNDS[0], WP_BOUNDS[0]], dtype=np.float32),
+            high=np.array([WN_BOUNDS[1], WP_BOUNDS[1]], dtype=np.float32),
+            dtype=np.float32,
+        )
+        # weight_conditioned: per-episode Dirichlet weights appended to the observation (see InverterEnv)
+        self.weight_conditioned = bool(weight_conditioned)
+        self.weight_concentration = float(weight_concentration)
+        n_obs = 8 if self.weight_conditioned else 5
+        observation_space = spaces.Box(low=0.0, high=5.0, shape=(n_obs,), dtype=np.float32)
+        super().__init__(int(n_envs), observation_space, action_space)
+
+        self.w_delay = float(w_delay)
+        self.w_power = float(w_power)
+        self.w_area = float(w_area)
+        self._weights = normalize_weights(self.w_delay, self.w_power, self.w_area)
+        self.max_steps = int(max_steps)
+        self.sim_fail_penalty = float(sim_fail_penalty)
+
+        self._owns_pool = pool is None
+        if pool is None:
+            n_workers = int(n_workers or min(self.num_envs, os.cpu_count() or 1))
+            cache = SimCache(cache_path) if cache_path is not None else None
+            # same restart_every meaning as InverterEnv
+            if restart_every is None and recycle == "count":
+                restart_every = 50
+            pool = PyngsWorkerPool(
+                n_workers,
+                restart_every=restart_every,
+                recycle=recycle,
+                timeout_s=timeout_s,
+                start_method=start_method,
+                cache=cache,
+            )
+        self.pool = pool
+        self.archive = ParetoArchive(archive_path) if archive_path is not None else None
+        self.quarantine = FailureQuarantine(quarantine_path) if quarantine_path is not None else None
+
+        n = self.num_envs
+        self._wn = np.full(n, 0.42)
+        self._wp = np.full(n, 0.84)
+        self._steps = np.zeros(n, dtype=np.int64)
+        # per-env normalisation references (first successful sim of the episode), NaN = unset
+        self._refs = np.full((n, 3), np.nan)
+        self._ep_weights = np.tile(np.asarray(self._weights), (n, 1))
+        self._best: List[Optional[Dict[str, Any]]] = [None] * n
+        self._rngs = [np.random.default_rng() for _ in range(n)]
+        self._actions: Optional[np.ndarray] = None
+        self._obs = np.zeros((n, observation_space.shape[0]), dtype=np.float32)
+
+    # ------------------------------------------------------------------ simulation
+
+    def _simulate(self, wn: np.ndarray, wp: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Raw (tphl, tplh, tpavg, pstatic) per point and a success mask, from one pool call."""
+        raw = np.full((len(wn), 4), np.nan)
+        ok = np.zeros(len(wn), dtype=bool)
+        # points in a known failure region never reach the pool (failed, like a crashed sim)
+        run = [j for j in range(len(wn)) if self.quarantine is None or not self.quarantine.check(wn[j], wp[j])]
+        results = self.pool.measure_many([(float(wn[j]), float(wp[j])) for j in run], return_exceptions=True)
+        for j, r in zip(run, results):
+            if isinstance(r, Exception):
+                if self.quarantine is not None:
+                    self.quarantine.record(wn[j], wp[j], False, error=f"{type(r).__name__}: {r}")
+                continue
+            real = float(r.get("cached", 0.0)) < 0.5
+            if self.quarantine is not None and real:
+                self.quarantine.record(wn[j], wp[j], True)
+            raw[j] = (r["tphl"], r["tplh"], r["tpavg"], r["pstatic"])
+            ok[j] = True
+            if self.archive is not None and real:
+                self.archive.add(float(wn[j]), float(wp[j]), {**r, "area_um": float(wn[j] + wp[j])}, source="rl")
+        return raw, ok
+
+    def _evaluate(self, idx: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, List[Dict[str, float]]]:
+        """Simulate envs `idx` at their current widths -> (obs, rewards, constructor-weight scores, ppa dicts)."""
+        wn, wp = self._wn[idx], self._wp[idx]
+        raw, ok = self._simulate(wn, wp)
+        area = wn + wp
+
+        # first successful sim of an episode sets the references (same as InverterEnv)
+        unset = ok & np.isnan(self._refs[idx, 0])
+        if unset.any():
+            self._refs[idx[unset]] = np.stack(
+                [np.maximum(raw[unset, 2], 1e-15), np.maximum(raw[unset, 3], 1e-15), np.maximum(area[unset], 1e-6)],
+                axis=1,
+            )
+
+        norm = np.ones((len(idx), 3))
+        norm[ok] = np.stack([raw[ok, 2], raw[ok, 3], area[ok]], axis=1) / self._refs[idx[ok]]
+
+        scores = np.where(ok, ppa_reward(norm[:, 0], norm[:, 1], norm[:, 2], self._weights), self.sim_fail_penalty)
+        rewards = scores
+        if self.weight_conditioned:
+            rewards = np.where(ok, -np.sum(norm * self._ep_weights[idx], axis=1), self.sim_fail_penalty)
+
+        obs = np.empty((len(idx), self.observation_space.shape[0]), dtype=np.float32)
+        obs[:, 0] = (wn - WN_BOUNDS[0]) / (WN_BOUNDS[1] - WN_BOUNDS[0])
+        obs[:, 1] = (wp - WP_BOUNDS[0]) / (WP_BOUNDS[1] - WP_BOUNDS[0])
+        obs[:, 2:5] = norm
+        if self.weight_conditioned:
+            obs[:, 5:] = self._ep_weights[idx]
+
+        ppas: List[Dict[str, float]] = []
+        for j in range(len(idx)):
+            if ok[j]:
+                tphl, tplh, tpavg, pstatic = (float(x) for x in raw[j])
+            else:
+                tphl = tplh = tpavg = pstatic = 1.0
+            ppas.append(
+                {
+                    "tphl": tphl,
+                    "tplh": tplh,
+                    "tpavg": tpavg,
+                    "pstatic": pstatic,
+                    "area_um": float(area[j]),
+                    "delay_norm": float(norm[j, 0]),
+                    "power_norm": float(norm[j, 1]),
+                    "area_norm": float(norm[j, 2]),
+                    "sim_ok": float(ok[j]),
+                }
+            )
+        return obs, rewards, scores, ppas
+
+    def _reset_envs(self, idx: np.ndarray, options: Optional[List[Dict[str, Any]]] = None) -> np.ndarray:
+        self._steps[idx] = 0
+        self._refs[idx] = np.nan
+        for i in idx:
+            self._best[i] = None
+            rng = self._rngs[i]
+            self._wn[i] = float(np.clip(rng.uniform(0.3, 1.2), *WN_BOUNDS))
+            self._wp[i] = float(np.clip(rng.uniform(0.6, 2.4), *WP_BOUNDS))
+            if self.weight_conditioned:
+                pinned = options[i].get("weights") if options is not None else None
+                if pinned is not None:
+                    self._ep_weights[i] = normalize_weights(*pinned)
+                else:
+                    self._ep_weights[i] = rng.dirichlet(np.full(3, self.weight_concentration))
+
+        obs, _, _, ppas = self._evaluate(idx)
+        for j, i in enumerate(idx):
+            self.reset_infos[i] = {"wn_um": float(self._wn[i]), "wp_um": float(self._wp[i]), "ppa": ppas[j]}
+        return obs
+
+    # ------------------------------------------------------------------ VecEnv API
+
+    def reset(self) -> VecEnvObs:
+        for i, seed in enumerate(self._seeds):
+            if seed is not None:
+                self._rngs[i] = np.random.default_rng(seed)
+        options = list(self._options)
+        self._reset_seeds()
+        self._reset_options()
+        self._obs = self._reset_envs(np.arange(self.num_envs), options)
+        return self._obs.copy()
+
+    def step_async(self, actions: np.ndarray) -> None:
+        self._actions = np.asarray(actions, dtype=np.float64).reshape(self.num_envs, -1)
+
+    def step_wait(self) -> VecEnvStepReturn:
+        assert self._actions is not None
+        idx = np.arange(self.num_envs)
+        self._steps += 1
+        self._wn = np.clip(self._actions[:, 0], *WN_BOUNDS)
+        self._wp = np.clip(self._actions[:, 1], *WP_BOUNDS)
+
+        obs, rewards, scores, ppas = self._evaluate(idx)
+
+        terminated = self._steps >= self.max_steps
+        truncated = np.array([p["sim_ok"] < 0.5 for p in ppas])
+        dones = terminated | truncated
+
+        infos: List[Dict[str, Any]] = []
+        for i in idx:
+            info: Dict[str, Any] = {"wn_um": float(self._wn[i]), "wp_um": float(self._wp[i]), "ppa": ppas[i]}
+            info["TimeLimit.truncated"] = bool(truncated[i] and not terminated[i])
+            if not truncated[i]:
+                b = self._best[i]
+                if b is None or float(scores[i]) > float(b["reward"]):
+                    self._best[i] = {
+                        "reward": float(scores[i]),
+                        "wn_um": float(self._wn[i]),
+                        "wp_um": float(self._wp[i]),
+                        "ppa": ppas[i],
+                    }
+            infos.append(info)
+
+        if dones.any():
+            done_idx = np.flatnonzero(dones)
+            for i in done_idx:
+                infos[i]["terminal_observation"] = obs[i].copy()
+            obs[done_idx] = self._reset_envs(done_idx)
+
+        self._obs = obs.copy()
+        return obs, rewards.astype(np.float32), dones, infos
+
+    def close(self) -> None:
+        if self._owns_pool:
+            self.pool.close()
+        if self.archive is not None:
+            self.archive.close()
+        if self.quarantine is not None:
+            self.quarantine.close()
+
+    def get_best(self, indices: VecEnvIndices = None) -> List[Optional[Dict[str, Any]]]:
+        return [self._best[i] for i in self._get_indices(indices)]
+
+    def get_state(self, indices: VecEnvIndices = None) -> List[Dict[str, Any]]:
+        """Per-env checkpoint state, same keys as InverterEnv.get_state() (unset refs are NaN)."""
+        return [
+            {
+                "rng": self._rngs[i].bit_generator.state,
+                "wn": float(self._wn[i]),
+                "wp": float(self._wp[i]),
+                "step_count": int(self._steps[i]),
+                "refs": self._refs[i].copy(),
+                "best": self._best[i],
+                "ep_weights": tuple(float(w) for w in self._ep_weights[i]),
+                "obs": self._obs[i].copy(),
+            }
+            for i in self._get_indices(indices)
+        ]
+
+    def set_state(self, state: Dict[str, Any], indices: VecEnvIndices = None) -> List[np.ndarray]:
+        for i in self._get_indices(indices):
+            self._rngs[i].bit_generator.state = state["rng"]
+            self._wn[i], self._wp[i] = state["wn"], state["wp"]
+            self._steps[i] = state["step_count"]
+            self._refs[i] = state["refs"]
+            self._best[i] = state["best"]
+            self._ep_weights[i] = state["ep_weights"]
+            self._obs[i] = state["obs"]
+        return [self._obs[i].copy() for i in self._get_indices(indices)]
+
+    def get_attr(self, attr_name: str, indices: VecEnvIndices = None) -> List[Any]:
+        value = getattr(self, attr_name)
+        return [value for _ in self._get_indices(indices)]
+
+    def set_attr(self, attr_name: str, value: Any, indices: VecEnvIndices = None) -> None:
+        setattr(self, attr_name, value)
+
+    def env_method(self, method_name: str, *method_args, indices: VecEnvIndices = None, **method_kwargs) -> List[Any]:
+        # per-env methods of InverterEnv used by the callbacks
+        if method_name == "get_best":
+            return self.get_best(indices)
+        if method_name == "get_state":
+            return self.get_state(indices)
+        if method_name == "set_state":
+            return self.set_state(*method_args, indices=indices)
+        if method_name == "get_health_stats":
+            # the pool is shared by every env: reported once, by the first
+            idx = self._get_indices(indices)
+            return [self.pool.stats()["health"] if k == 0 else None for k, _ in enumerate(idx)]
+        if method_name == "get_quarantine_stats":
+            idx = self._get_indices(indices)
+            stats = None if self.quarantine is None else self.quarantine.stats()
+            return [stats if k == 0 else None for k, _ in enumerate(idx)]
+        if method_name in ("get_surrogate_stats", "get_fidelity_stats"):
+            return [None for _ in self._get_indices(indices)]
+        raise AttributeError(f"InverterVecEnv has no per-env method {method_name!r}")
+
+    def env_is_wrapped(self, wrapper_class: Type[gym.Wrapper], indices: VecEnvIndices = None) -> List[bool]:
+        return [False for _ in self._get_indices(indices)]
@@ -0,0 +1,297 @@
+from __future__ import annotations
+
+import collections
+import contextlib
+import math
+import os
+import threading
+import warnings
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+RECYCLE_MODES = ("count", "health", "auto")
+# recycle="count" interval when restart_every is not given
+DEFAULT_RESTART_EVERY = 25
+
+try:
+    _PAGE_MB = os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+except (AttributeError, ValueError, OSError):  # pragma: no cover - non-POSIX
+    _PAGE_MB = 0.0
+
+
+def current_rss_mb() -> float:
+    """Resident set size of this process (Linux /proc; NaN elsewhere)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_MB
+    except (OSError, IndexError, ValueError):
+        return float("nan")
+
+
+@contextlib.contextmanager
+def count_warnings() -> Iterator[List[warnings.WarningMessage]]:
+    """
+    Record the warnings raised in the block (pyngs reports ngspice trouble as RuntimeWarning).
+    Filters already set to "error" (spice_worker._install_warning_policy) still raise.
+    Not thread-safe: only around calls in the process that owns the simulator.
+    """
+    with warnings.catch_warnings(record=True) as caught:
+        # appended: existing filters win, the rest is recorded every time instead of once per location
+        warnings.filterwarnings("always", append=True)
+        yield caught
+
+
+@dataclass
+class HealthPolicy:
+    """Thresholds of health-driven recycling (HealthMonitor, recycle="health" / "auto")."""
+
+    window: int = 16  # runs in the rolling record; the latency baseline is the first window after a restart
+    latency_drift: float = 1.5  # window median / baseline median that triggers a restart
+    rss_growth_mb: float = 256.0  # RSS growth since the last (re)load
+    max_nan_runs: int = 3  # runs with a NaN measure in the window
+    max_warnings: int = 8  # warnings in the window
+    min_jobs: int = 8  # no signal-driven restart before this many runs on an instance
+    max_jobs: int = 5000  # hard cap (0 = none)
+    rss_every: int = 4  # RSS sample period, in runs
+
+
+class HealthMonitor:
+    """
+    Rolling health record of one simulator instance; decides when to recycle it.
+    - recycle="count": every `restart_every` runs (None: 25, 0 = never), the previous behaviour
+    - recycle="health": when the run latency drifts above its post-restart baseline, RSS grows,
+      NaN measures or warnings pile up in the window, or after policy.max_jobs runs (or
+      restart_every runs if it is given and smaller)
+    - recycle="auto": "health" plus an interval tuned to minimise time per simulation. With a
+      restart cost C and latency growing by b per run since the restart, the mean cost over N
+      runs is a + C/N + b(N-1)/2, minimised at N* = sqrt(2C/b); C and b are measured. Once
+      tuned, N* replaces the latency-drift rule.
+    The monitor lives where the restart decision is taken: in InverterSpiceRunner, or in the
+    parent of a PyngsWorker (the child sends its per-run latency, warnings and RSS).
+    """
+
+    def __init__(
+        self,
+        recycle: str = "health",
+        restart_every: Optional[int] = None,
+        policy: Optional[HealthPolicy] = None,
+    ) -> None:
+        if recycle not in RECYCLE_MODES:
+            raise ValueError(f"unknown recycle mode {recycle!r} (expected one of {RECYCLE_MODES})")
+        self.recycle = recycle
+        self.restart_every = DEFAULT_RESTART_EVERY if restart_every is None else int(restart_every)
+        self.policy = policy or HealthPolicy()
+        # an explicit restart_every > 0 still bounds the life of an instance in "health"/"auto"
+        self.max_jobs = int(self.policy.max_jobs)
+        if recycle != "count" and restart_every is not None and int(restart_every) > 0:
+            self.max_jobs = min(self.max_jobs, int(restart_every)) if self.max_jobs > 0 else int(restart_every)
+
+        w = max(2, int(self.policy.window))
+        self._lock = threading.Lock()
+        self._latency: Deque[float] = collections.deque(maxlen=w)
+        self._nan: Deque[bool] = collections.deque(maxlen=w)
+        self._warn: Deque[int] = collections.deque(maxlen=w)
+        # (runs since restart, latency) over several lives, for the drift slope of "auto"
+        self._drift: Deque[Tuple[int, float]] = collections.deque(maxlen=1024)
+        self._baseline: List[float] = []
+
+        self.jobs = 0
+        self.jobs_since_restart = 0
+        self.run_time_s = 0.0
+        self.restarts = 0
+        self.restart_time_s = 0.0
+        self.restart_reasons: Dict[str, int] = {}
+        self._restart_cost_s = float("nan")
+        self._rss0 = float("nan")
+        self._rss = float("nan")
+        self._interval: Optional[int] = None
+
+    # ------------------------------------------------------------------ record
+
+    def record_restart(self, cost_s: float, reason: str) -> None:
+        """A (re)load of the instance that took `cost_s`; reason "start" for the first load."""
+        with self._lock:
+            cost_s = float(cost_s)
+            if reason != "start":
+                self.restarts += 1
+                self.restart_reasons[reason] = self.restart_reasons.get(reason, 0) + 1
+            self.restart_time_s += cost_s
+            c = self._restart_cost_s
+            self._restart_cost_s = cost_s if math.isnan(c) else 0.7 * c + 0.3 * cost_s
+            self.jobs_since_restart = 0
+            self._latency.clear()
+            self._nan.clear()
+            self._warn.clear()
+            self._baseline = []
+            self._rss0 = self._rss = float("nan")
+
+    def record_run(self, latency_s: float, *, nan: bool = False, warnings: int = 0, rss_mb: float = float("nan")) -> None:
+        with self._lock:
+            latency_s = float(latency_s)
+            self.jobs += 1
+            self.run_time_s += latency_s
+            # the first run after a load warms caches up: not part of the baseline nor the slope
+            if self.jobs_since_restart > 0:
+                if len(self._baseline) < self._latency.maxlen:  # type: ignore[operator]
+                    self._baseline.append(latency_s)
+                self._drift.append((self.jobs_since_restart, latency_s))
+            self.jobs_since_restart += 1
+            self._latency.append(latency_s)
+            self._nan.append(bool(nan))
+            self._warn.append(int(warnings))
+            if not math.isnan(rss_mb):
+                self._rss = float(rss_mb)
+                if math.isnan(self._rss0):
+                    self._rss0 = self._rss
+            if self.recycle == "auto" and self.jobs % self._latency.maxlen == 0:  # type: ignore[operator]
+                self._interval = self._tune()
+
+    def wants_rss(self) -> bool:
+        """True when the next record_run should carry an RSS sample."""
+        return self.jobs_since_restart % max(1, self.policy.rss_every) == 0
+
+    # ------------------------------------------------------------------ decide
+
+    def _slope(self) -> float:
+        """Latency increase per run since restart (s/run), least squares over the pooled samples."""
+        if len(self._drift) < 32:
+            return float("nan")
+        k, lat = np.asarray(self._drift, dtype=np.float64).T
+        if np.ptp(k) < 4:
+            return float("nan")
+        return float(np.polyfit(k, lat, 1)[0])
+
+    def _tune(self) -> Optional[int]:
+        b, c = self._slope(), self._restart_cost_s
+        if math.isnan(b) or math.isnan(c):
+            return None
+        cap = self.max_jobs if self.max_jobs > 0 else None
+        if b <= 0.0:
+            return cap
+        n = int(round(math.sqrt(2.0 * c / b)))
+        n = max(n, self.policy.min_jobs)
+        return min(n, cap) if cap is not None else n
+
+    def runs_left(self) -> Optional[int]:
+        """Runs before the next scheduled restart (count, interval or max_jobs), None if unbounded."""
+        with self._lock:
+            n = self.jobs_since_restart
+            if self.recycle == "count":
+                limits = [self.restart_every] if self.restart_every > 0 else []
+            else:
+                limits = [self.max_jobs] if self.max_jobs > 0 else []
+                if self.recycle == "auto" and self._interval is not None:
+                    limits.append(self._interval)
+            return max(1, min(limits) - n) if limits else None
+
+    def restart_reason(self) -> Optional[str]:
+        """Why the instance should be recycled before the next run, None if it is healthy."""
+        with self._lock:
+            n = self.jobs_since_restart
+            if self.recycle == "count":
+                return "count" if self.restart_every > 0 and n >= self.restart_every else None
+
+            p = self.policy
+            if self.max_jobs > 0 and n >= self.max_jobs:
+                return "max_jobs"
+            if self.recycle == "auto" and self._interval is not None and n >= self._interval:
+                return "interval"
+            if n < p.min_jobs:
+                return None
+            if sum(self._nan) >= p.max_nan_runs:
+                return "nan"
+            if sum(self._warn) >= p.max_warnings:
+                return "warnings"
+            if self._rss - self._rss0 >= p.rss_growth_mb:
+                return "rss"
+            w = self._latency.maxlen
+            # once tuned, the "auto" interval already prices the gradual slowdown
+            if self.recycle == "auto" and self._interval is not None:
+                return None
+            if n >= 2 * w and len(self._baseline) >= w // 2:  # type: ignore[operator]
+                if float(np.median(self._latency)) > p.latency_drift * float(np.median(self._baseline)):
+                    return "latency"
+            return None
+
+    # ------------------------------------------------------------------ report
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lat = list(self._latency)
+            total = self.run_time_s + self.restart_time_s
+            slope = self._slope() if self.recycle == "auto" or len(self._drift) >= 32 else float("nan")
+            return {
+                "recycle": self.recycle,
+                "jobs": self.jobs,
+                "jobs_since_restart": self.jobs_since_restart,
+                "restarts": self.restarts,
+                "restart_reasons": dict(self.restart_reasons),
+                "restart_time_s": self.restart_time_s,
+                "restart_cost_s": self._restart_cost_s,
+                "run_time_s": self.run_time_s,
+                "time_per_sim_ms": 1e3 * total / self.jobs if self.jobs else float("nan"),
+                "latency_baseline_ms": 1e3 * float(np.median(self._baseline)) if self._baseline else float("nan"),
+                "latency_recent_ms": 1e3 * float(np.median(lat)) if lat else float("nan"),
+                "latency_slope_us_per_run": 1e6 * slope,
+                "rss_mb": self._rss,
+                "rss_growth_mb": self._rss - self._rss0,
+                "nan_runs": int(sum(self._nan)),
+                "warnings": int(sum(self._warn)),
+                "interval": self.restart_every if self.recycle == "count" else self._interval,
+            }
+
+
+class LatencyTracker:
+    """Recent run latencies (s) of a worker or a pool: quantiles for deadlines and hedging. Thread-safe."""
+
+    def __init__(self, maxlen: int = 512) -> None:
+        self._lock = threading.Lock()
+        self._samples: Deque[float] = collections.deque(maxlen=maxlen)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, latency_s: float) -> None:
+        if not math.isnan(latency_s):
+            with self._lock:
+                self._samples.append(float(latency_s))
+
+    def samples(self) -> np.ndarray:
+        with self._lock:
+            return np.fromiter(self._samples, dtype=np.float64)
+
+    def quantile(self, q: float) -> float:
+        x = self.samples()
+        return float(np.quantile(x, q)) if len(x) else float("nan")
+
+
+def merge_stats(stats: Sequence[Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+    """Totals of several HealthMonitor.stats() (workers of a pool, envs of a run)."""
+    stats = [s for s in stats if s is not None]
+    if not stats:
+        return None
+    # already merged inputs (a pool among runners) count as their instances
+    instances = sum(s.get("instances", 1) for s in stats)
+    intervals: List[Any] = []
+    for s in stats:
+        intervals.extend(s["intervals"] if "intervals" in s else [s["interval"]])
+    jobs = sum(s["jobs"] for s in stats)
+    reasons: Dict[str, int] = {}
+    for s in stats:
+        for k, v in s["restart_reasons"].items():
+            reasons[k] = reasons.get(k, 0) + v
+    restart_time = sum(s["restart_time_s"] for s in stats)
+    run_time = sum(s["run_time_s"] for s in stats)
+    return {
+        "recycle": ",".join(sorted({m for s in stats for m in s["recycle"].split(",")})),
+        "instances": instances,
+        "jobs": jobs,
+        "restarts": sum(s["restarts"] for s in stats),
+        "restart_reasons": reasons,
+        "restart_time_s": restart_time,
+        "run_time_s": run_time,
+        "time_per_sim_ms": 1e3 * (run_time + restart_time) / jobs if jobs else float("nan"),
+        "intervals": intervals,
+    }
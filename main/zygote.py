@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+import atexit
+import multiprocessing as mp
+import os
+import select
+import signal
+import threading
+import time
+from multiprocessing import reduction
+from multiprocessing.connection import Connection
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from . import tracing
+from .pdk_slim import slim_netlist
+from .spice_backend import NGSpiceInstance
+
+
+def _zygote_main(ctrl: Connection, netlist_path: str) -> None:
+    # imported here: spice_worker imports this module
+    from .spice_worker import _install_warning_policy, _worker_loop
+
+    _install_warning_policy()
+    tracing.set_process_name("pyngs-zygote")
+    # forked workers are reaped by the kernel, the zygote never waits for them
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+
+    t0 = time.perf_counter()
+    with tracing.span("ngspice.load"):
+        inst = NGSpiceInstance()
+        inst.load(slim_netlist(netlist_path))
+    tracing.flush()
+    ctrl.send(("ready", time.perf_counter() - t0))
+
+    while True:
+        try:
+            msg = ctrl.recv()
+        except (EOFError, OSError):
+            break
+        if msg is None:
+            break
+
+        # ("fork",) followed by the worker end of a Pipe, passed as a file descriptor
+        fd = reduction.recv_handle(ctrl)
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+                ctrl.close()
+                # recycling is decided by the parent, which replaces the whole process
+                _worker_loop(Connection(fd), netlist_path, preloaded=inst)
+            except BaseException:
+                code = 1
+            finally:
+                tracing.flush()
+                os._exit(code)
+        os.close(fd)
+        ctrl.send(pid)
+
+    tracing.flush()
+
+
+class ZygoteChild:
+    """
+    Handle on a worker forked by a Zygote: the subset of mp.Process that PyngsWorker uses.
+    The worker is a child of the zygote, not of this process, so liveness goes through a
+    pidfd (Linux >= 5.3) or kill(pid, 0).
+    """
+
+    def __init__(self, pid: int) -> None:
+        self.pid = int(pid)
+        self._pidfd: Optional[int] = None
+        if hasattr(os, "pidfd_open"):
+            try:
+                self._pidfd = os.pidfd_open(self.pid)
+            except OSError:
+                pass
+
+    def is_alive(self) -> bool:
+        if self._pidfd is not None:
+            # a pidfd becomes readable when the process exits
+            return not select.select([self._pidfd], [], [], 0)[0]
+        try:
+            os.kill(self.pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    def kill(self) -> None:
+        try:
+            os.kill(self.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.is_alive():
+            if deadline is not None and time.monotonic() >= deadline:
+                return
+            if self._pidfd is not None:
+                wait = None if deadline is None else max(0.0, deadline - time.monotonic())
+                select.select([self._pidfd], [], [], wait)
+            else:
+                time.sleep(0.001)
+        self._close_pidfd()
+
+    def _close_pidfd(self) -> None:
+        if self._pidfd is not None:
+            try:
+                os.close(self._pidfd)
+            except OSError:
+                pass
+            self._pidfd = None
+
+    def __del__(self) -> None:
+        self._close_pidfd()
+
+
+class Zygote:
+    """
+    Fork server holding a libngspice instance with the netlist (and its PDK .lib) already loaded.
+    - started once with spawn: imports pyngs and parses the model library a single time
+    - never runs a simulation, so the ngspice state it forks from is always clean
+    - fork(conn) starts a worker running _worker_loop on a copy-on-write copy of that state:
+      no interpreter start, no imports, no PDK parsing; the parsed models stay shared
+    - restarts itself if it died
+    """
+
+    def __init__(self, netlist_path: str | Path, *, timeout_s: float = 120.0) -> None:
+        self.netlist_path = Path(netlist_path)
+        self.timeout_s = float(timeout_s)
+        self.load_s = float("nan")
+        self.n_forks = 0
+        self._lock = threading.Lock()
+        self._proc: Optional[mp.process.BaseProcess] = None
+        self._ctrl: Optional[Connection] = None
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self._proc.pid if self._proc is not None else None
+
+    def _start(self) -> None:
+        ctx = mp.get_context("spawn")
+        ctrl, child = ctx.Pipe()
+        proc = ctx.Process(
+            target=_zygote_main,
+            args=(child, str(self.netlist_path)),
+            name="pyngs-zygote",
+            daemon=True,
+        )
+        with tracing.span("zygote.start", cat="worker"):
+            proc.start()
+            child.close()
+            try:
+                if not ctrl.poll(self.timeout_s):
+                    raise RuntimeError(f"pyngs zygote: {self.netlist_path} not loaded after {self.timeout_s:.0f}s")
+                _, self.load_s = ctrl.recv()
+            except BaseException:
+                proc.kill()
+                proc.join(timeout=0.5)
+                ctrl.close()
+                raise
+        self._proc = proc
+        self._ctrl = ctrl
+
+    def _stop(self) -> None:
+        proc, ctrl = self._proc, self._ctrl
+        self._proc = self._ctrl = None
+        if ctrl is not None:
+            try:
+                ctrl.send(None)
+            except Exception:
+                pass
+        if proc is not None:
+            proc.join(timeout=0.5)
+            if proc.is_alive():
+                proc.kill()
+                proc.join(timeout=0.5)
+        if ctrl is not None:
+            ctrl.close()
+
+    def _fork_once(self, conn: Connection) -> ZygoteChild:
+        if self._proc is None or not self._proc.is_alive():
+            self._stop()
+            self._start()
+        assert self._proc is not None and self._ctrl is not None
+        self._ctrl.send(("fork",))
+        reduction.send_handle(self._ctrl, conn.fileno(), self._proc.pid)
+        if not self._ctrl.poll(self.timeout_s):
+            raise TimeoutError("pyngs zygote: no answer to fork")
+        return ZygoteChild(self._ctrl.recv())
+
+    def fork(self, conn: Connection) -> ZygoteChild:
+        """New worker process serving the other end of `conn` (a Pipe end); `conn` may be closed afterwards."""
+        with self._lock, tracing.span("zygote.fork", cat="worker"):
+            try:
+                child = self._fork_once(conn)
+            except (EOFError, OSError):
+                # zygote died between the liveness check and the fork: one fresh zygote, one retry
+                self._stop()
+                child = self._fork_once(conn)
+            self.n_forks += 1
+            return child
+
+    def close(self) -> None:
+        with self._lock:
+            self._stop()
+
+
+# one zygote per (process, netlist): PyngsWorkers of every pool in this process share it
+_ZYGOTES: Dict[Tuple[int, str], Zygote] = {}
+_ZYGOTES_LOCK = threading.Lock()
+
+
+def get_zygote(netlist_path: str | Path) -> Zygote:
+    """Shared Zygote for a netlist, started by the first fork."""
+    key = (os.getpid(), str(Path(netlist_path).resolve()))
+    with _ZYGOTES_LOCK:
+        zygote = _ZYGOTES.get(key)
+        if zygote is None:
+            zygote = _ZYGOTES[key] = Zygote(netlist_path)
+        return zygote
+
+
+def shutdown_zygotes() -> None:
+    """Stop the zygotes of this process; workers already forked keep running."""
+    with _ZYGOTES_LOCK:
+        mine = [k for k in _ZYGOTES if k[0] == os.getpid()]
+        zygotes = [_ZYGOTES.pop(k) for k in mine]
+    for zygote in zygotes:
+        zygote.close()
+
+
+atexit.register(shutdown_zygotes)
@@ -0,0 +1,55 @@
+# scripts/bench_adaptive_window.py
+# Adaptive transient window vs the fixed inv_char.cir setup: time per measure and delay error.
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+
+from main.adaptive_window import AdaptiveWindowRunner
+from main.inverter_spice import InverterSpiceRunner
+
+
+def timed(runner, points):
+    runner.measure(*points[0])  # warm-up (PDK load)
+    t0 = time.perf_counter()
+    results = [runner.measure(wn, wp) for wn, wp in points]
+    return (time.perf_counter() - t0) / len(points), results
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-n", type=int, default=100, help="number of (wn, wp) points")
+    ap.add_argument("--step", type=float, default=0.1, help="random-walk step in log width (RL-like locality)")
+    args = ap.parse_args()
+
+    # random walk, like consecutive RL actions: neighbours are usually close
+    rng = np.random.default_rng(0)
+    x = np.log([0.42, 0.84])
+    lo, hi = np.log([0.24, 0.48]), np.log([5.0, 10.0])
+    points = []
+    for _ in range(args.n):
+        x = np.clip(x + rng.normal(0.0, args.step, 2), lo, hi)
+        points.append(tuple(float(v) for v in np.exp(x)))
+
+    fixed = InverterSpiceRunner(restart_every=0, recycle="count")
+    adaptive = AdaptiveWindowRunner(restart_every=0, recycle="count")
+    try:
+        t_fixed, ref = timed(fixed, points)
+        t_adapt, res = timed(adaptive, points)
+        stats = adaptive.stats()
+    finally:
+        fixed.close()
+        adaptive.close()
+
+    print(f"fixed    : {t_fixed * 1e3:8.2f} ms / measure")
+    print(f"adaptive : {t_adapt * 1e3:8.2f} ms / measure  (x{t_fixed / t_adapt:.2f})")
+    for m in ("tphl", "tplh", "tpavg"):
+        rel = np.array([abs(b[m] / a[m] - 1.0) for a, b in zip(ref, res)])
+        print(f"{m:6s}: max rel. error {rel.max():.3e}, median {np.median(rel):.3e}")
+    print("windows  :", {k: int(v) for k, v in stats.items()})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+# scripts/bench_inv_char.py
+# Time per measurement: legacy netlist (leakage averaged over a 30-40 ns transient)
+# vs current inv_char.cir (short transient + two-point DC sweep of the same inverter for leakage).
+# Needs ngspice and the PDK: the analytic backend ignores the netlist analyses.
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+
+from main.inverter_spice import INV_CHAR_NETLIST, PROJECT_ROOT, InverterSpiceRunner
+from main.spice_backend import backend_name
+
+LEGACY_NETLIST = PROJECT_ROOT / "spice" / "inv_char_legacy.cir"
+
+
+def bench(netlist, points):
+    runner = InverterSpiceRunner(netlist, restart_every=0, recycle="count")
+    try:
+        runner.measure(*points[0])  # warm-up (PDK load)
+        t0 = time.perf_counter()
+        results = [runner.measure(wn, wp) for wn, wp in points]
+        dt = time.perf_counter() - t0
+    finally:
+        runner.close()
+    return dt / len(points), results
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-n", type=int, default=50, help="number of (wn, wp) points")
+    args = ap.parse_args()
+    if backend_name() != "ngspice":
+        raise SystemExit(f"bench_inv_char compares netlists: needs ngspice, not the {backend_name()} backend")
+
+    rng = np.random.default_rng(0)
+    points = [(rng.uniform(0.24, 5.0), rng.uniform(0.48, 10.0)) for _ in range(args.n)]
+
+    t_old, old = bench(LEGACY_NETLIST, points)
+    t_new, new = bench(INV_CHAR_NETLIST, points)
+
+    print(f"legacy  : {t_old * 1e3:8.2f} ms / measure")
+    print(f"current : {t_new * 1e3:8.2f} ms / measure  (x{t_old / t_new:.2f})")
+    for m in ("tpavg", "pstatic"):
+        rel = [abs(b[m] / a[m] - 1.0) for a, b in zip(old, new) if a[m] != 0.0]
+        print(f"{m:8s}: max rel. diff {max(rel):.3e}, median {float(np.median(rel)):.3e}")
+    # note: legacy pstatic only sees the in=0 state, current one averages in=0 and in=vdd
+
+
+if __name__ == "__main__":
+    main()
@@ -3,13 +3,20 @@ from __future__ import annotations
 import queue
 import threading
 import time
+from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import streamlit as st
 
+from main.checkpoint import DEFAULT_CHECKPOINT_PATH
 from main.optimize_inv import TrainingSnapshot, optimize_inverter
+from main.pareto import DEFAULT_ARCHIVE_PATH, ParetoArchive
+from main.quarantine import DEFAULT_QUARANTINE_PATH
+from main.reweight import reweight
+from main.sim_cache import DEFAULT_CACHE_PATH
 
 st.set_page_config(page_title="Standard Cell Optimizer", layout="wide")
 
@@ -65,6 +72,22 @@ def render_live(df: pd.DataFrame) -> Tuple[Optional[float], Optional[float], Opt
     return best_reward, float(last["step"]), float(last["elapsed_s"])
 
 
+@st.cache_data(show_spinner=False)
+def load_archive_points(path: str, mtime_ns: int) -> Dict[str, np.ndarray]:
+    # mtime_ns only keys the cache: reloaded when a run appends points
+    archive = ParetoArchive(path)
+    try:
+        return archive.points()
+    finally:
+        archive.close()
+
+
+def archive_mtime_ns(path: Path) -> int:
+    # WAL mode: new rows land in the -wal file first
+    stamps = [p.stat().st_mtime_ns for p in (path, path.with_name(path.name + "-wal")) if p.exists()]
+    return max(stamps, default=0)
+
+
 # ---------- Sidebar ----------
 
 with st.sidebar:
@@ -74,14 +97,35 @@ with st.sidebar:
     w_area = st.slider("Area weight", 0.0, 1.0, 0.2, 0.05)
 
     st.header("RL settings")
+    method = st.selectbox(
+        "Optimizer",
+        ["ppo", "bo", "cmaes"],
+        index=0,
+        help="bo: batch Bayesian optimisation (few SPICE calls), cmaes: one parallel generation per step",
+    )
     total_timesteps = st.number_input("Total timesteps", 200, 50000, 4000, 200)
     max_steps = st.number_input("Max steps per episode", 5, 200, 40, 5)
 
-    # IMPORTANT: keep n_envs=1 for now (stable with PyngsWorker)
-    n_envs = 1
-    st.caption("Parallel envs: locked to 1 (PyngsWorker stability).")
+    # parallel envs run batched on a shared simulator pool (no per-env process)
+    n_envs = st.number_input("Parallel envs", 1, 64, 8, 1)
+    n_sim_workers = st.number_input("Simulator processes", 1, 32, 4, 1)
 
     snapshot_interval = st.number_input("Snapshot interval (timesteps)", 50, 5000, 400, 50)
+    use_cache = st.checkbox("Reuse cached simulations", value=True)
+    use_archive = st.checkbox("Record Pareto archive", value=True)
+    use_quarantine = st.checkbox(
+        "Quarantine failing points",
+        value=True,
+        help="Points near known ngspice failures get the failure penalty without a simulation (re-probed now and then)",
+    )
+    # PPO only: a Streamlit restart or ngspice crash can continue from the last checkpoint
+    use_checkpoint = st.checkbox("Checkpoint PPO runs", value=True)
+    resume_run = st.checkbox(
+        "Resume last checkpoint",
+        value=False,
+        disabled=not Path(DEFAULT_CHECKPOINT_PATH).exists(),
+        help="Continues the interrupted run (model, best point, history); same envs/weights expected",
+    )
 
     st.header("Early stopping")
     min_delta = st.number_input("Min improvement (min_delta)", value=1e-3, format="%.4g")
@@ -92,7 +136,51 @@ with st.sidebar:
 
     refresh_s = st.slider("UI refresh (seconds)", 0.2, 2.0, 0.5, 0.1)
 
-run = st.button("Lancer l'optimisation", type="primary")
+# ---------- Re-weighting from the archive (no simulation) ----------
+
+points = load_archive_points(str(DEFAULT_ARCHIVE_PATH), archive_mtime_ns(DEFAULT_ARCHIVE_PATH))
+if len(points["tpavg"]):
+    t_rw = time.perf_counter()
+    rw = reweight(points, float(w_delay), float(w_power), float(w_area))
+    dt_ms = (time.perf_counter() - t_rw) * 1e3
+    rw_best = rw["best"]
+
+    st.subheader("Meilleur point archivé pour ces poids")
+    st.caption(f"{len(points['tpavg'])} points simulés re-classés en {dt_ms:.1f} ms, sans SPICE.")
+    c1, c2, c3, c4, c5 = st.columns(5)
+    c1.metric("Wn", f"{rw_best['wn_um']:.3f} µm")
+    c2.metric("Wp", f"{rw_best['wp_um']:.3f} µm")
+    c3.metric("tpavg", f"{rw_best['ppa']['tpavg'] * 1e12:.2f} ps")
+    c4.metric("Pstatic", f"{rw_best['ppa']['pstatic'] * 1e12:.6f} pW")
+    c5.metric("Reward", f"{rw_best['reward']:.6f}")
+
+    top_idx = rw["top"]
+    st.dataframe(
+        pd.DataFrame(
+            {
+                "reward": rw["rewards"][top_idx],
+                "wn_um": points["wn_um"][top_idx],
+                "wp_um": points["wp_um"][top_idx],
+                "tpavg_ps": points["tpavg"][top_idx] * 1e12,
+                "pstatic_pW": points["pstatic"][top_idx] * 1e12,
+                "area_um": points["area_um"][top_idx],
+            }
+        ),
+        use_container_width=True,
+    )
+    if rw["covered"]:
+        st.success(f"Région bien couverte ({rw['support']} points voisins) : pas besoin de relancer un entraînement.")
+    else:
+        st.warning(
+            f"Région peu explorée ({rw['support']} points voisins) : "
+            "lancer une optimisation pour confirmer ce point."
+        )
+    offer_training = not rw["covered"]
+else:
+    st.info("Archive vide : lancez une première optimisation.")
+    offer_training = True
+
+run = st.button("Lancer l'optimisation", type="primary" if offer_training else "secondary")
 
 # ---------- Training (live) ----------
 
@@ -126,6 +214,14 @@ if run and not st.session_state.training_running:
                 max_walltime_s=(int(max_walltime_min) * 60 if int(max_walltime_min) > 0 else None),
                 target_reward=(float(target_reward) if target_reward.strip() else None),
                 on_snapshot=on_snapshot,
+                cache_path=(str(DEFAULT_CACHE_PATH) if use_cache else None),
+                vec_env="batched",
+                n_sim_workers=int(n_sim_workers),
+                method=method,
+                archive_path=(str(DEFAULT_ARCHIVE_PATH) if use_archive else None),
+                quarantine_path=(str(DEFAULT_QUARANTINE_PATH) if use_quarantine else None),
+                checkpoint_path=(str(DEFAULT_CHECKPOINT_PATH) if use_checkpoint and method == "ppo" else None),
+                resume_from=(str(DEFAULT_CHECKPOINT_PATH) if resume_run and method == "ppo" else None),
             )
             result_holder["summary"] = tr
         except Exception as e:
@@ -204,3 +300,21 @@ if run and not st.session_state.training_running:
         st.metric("tpavg", f"{ppa.get('tpavg', float('nan')) * 1e12:.2f} ps")
         st.metric("Pstatic", f"{ppa.get('pstatic', float('nan')) * 1e12:.6f} pW")
         st.metric("Area*", f"{ppa.get('area_um', float('nan')):.6f} µm (wn + wp)")
+
+    front = summary.get("pareto_front")
+    if front:
+        st.subheader(f"Pareto front ({len(front)} points, all runs)")
+        df_front = pd.DataFrame(front)
+        df_front["tpavg_ps"] = df_front["tpavg"] * 1e12
+        df_front["pstatic_pW"] = df_front["pstatic"] * 1e12
+        fig_front = px.scatter(
+            df_front,
+            x="tpavg_ps",
+            y="pstatic_pW",
+            color="area_um",
+            hover_data=["wn_um", "wp_um"],
+            title="tpavg vs Pstatic (color = area)",
+        )
+        fig_front.update_layout(height=350, margin=dict(l=10, r=10, t=40, b=10))
+        st.plotly_chart(fig_front, use_container_width=True)
+        st.dataframe(df_front[["wn_um", "wp_um", "tpavg_ps", "pstatic_pW", "area_um"]], use_container_width=True)